@@ -6,13 +6,17 @@ Multi-language document Q&A system
 import warnings
 warnings.filterwarnings('ignore')
 
+import atexit
+
 import streamlit as st
-from pathlib import Path
 
-from src.document_processor import DocumentProcessor
+from src.config import config
 from src.embeddings_hf import EmbeddingGenerator
+from src.ingestion_jobs import IngestionJobQueue
 from src.vector_store import VectorStore
+from src.answer_cache import AnswerCache
 from src.generator import ResponseGenerator
+from src.reranker import Reranker
 
 # Page config
 st.set_page_config(
@@ -68,32 +72,80 @@ st.markdown("""
 st.title("📚 RAG ststem")
 st.markdown("Upload documents and ask questions in English or Arabic")
 
+VECTOR_STORE_PATH = "vector_store"
+
+
+# Process-wide resources: loaded once and shared by every session
+@st.cache_resource(show_spinner="Loading embedding model...")
+def get_embedder() -> EmbeddingGenerator:
+    embedder = EmbeddingGenerator(model_name=config.EMBEDDING_MODEL)
+    # Persist cached query embeddings periodically and on shutdown
+    embedder.autosave_query_cache()
+    atexit.register(embedder.flush_cache)
+    return embedder
+
+
+@st.cache_resource
+def get_generator() -> ResponseGenerator:
+    return ResponseGenerator(answer_cache=AnswerCache())
+
+
+@st.cache_resource(show_spinner="Loading reranker...")
+def get_reranker() -> Reranker:
+    return Reranker()
+
+
+@st.cache_resource(show_spinner="Loading vector database...")
+def get_vector_store(path: str) -> VectorStore:
+    """Read-only store; the index is memory-mapped so its pages are shared"""
+    vector_store = VectorStore(dimension=config.EMBEDDING_DIMENSION)
+    vector_store.load(path, mmap=config.INDEX_MMAP)
+    return vector_store
+
+
+@st.cache_resource
+def get_ingestion_queue() -> IngestionJobQueue:
+    """Background worker appending uploads to the store; sessions reopen it once a job publishes"""
+    return IngestionJobQueue(VECTOR_STORE_PATH, get_embedder(), on_publish=get_vector_store.clear)
+
+
+@st.fragment(run_every=2)
+def show_ingestion_jobs():
+    """Progress of upload jobs, refreshed every two seconds"""
+    jobs = get_ingestion_queue().jobs()
+    for job in jobs[-3:]:
+        st.caption(", ".join(job.file_names))
+        st.markdown(job.describe())
+    
+    # A job published a new store version: rerun the page so it reopens the store
+    published = {job.id for job in jobs if job.published}
+    if published - st.session_state.published_jobs:
+        st.session_state.published_jobs |= published
+        st.session_state.documents_loaded = True
+        st.rerun()
+
+
 # Initialize session state
-if 'vector_store' not in st.session_state:
-    st.session_state.vector_store = None
-if 'embedder' not in st.session_state:
-    st.session_state.embedder = None
-if 'generator' not in st.session_state:
-    st.session_state.generator = None
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'documents_loaded' not in st.session_state:
     st.session_state.documents_loaded = False
+if 'published_jobs' not in st.session_state:
+    st.session_state.published_jobs = set()
 
 # Sidebar
 with st.sidebar:
     st.header("⚙️ Configuration")
     
     # Load existing database option
-    if Path("vector_store").exists():
+    if VectorStore.exists(VECTOR_STORE_PATH):
         if st.button("📂 Load Existing Database"):
             with st.spinner("Loading vector database..."):
-                st.session_state.vector_store = VectorStore(dimension=1024)
-                st.session_state.vector_store.load("vector_store")
-                st.session_state.embedder = EmbeddingGenerator(model_name="intfloat/multilingual-e5-large")
-                st.session_state.generator = ResponseGenerator()
+                vector_store = get_vector_store(VECTOR_STORE_PATH)
+                get_embedder()
+                get_generator()
                 st.session_state.documents_loaded = True
-                st.success(f"✅ Loaded {len(st.session_state.vector_store.texts)} documents")
+                st.success(f"✅ Loaded {len(vector_store)} documents")
     
     st.markdown("---")
     
@@ -106,57 +158,55 @@ with st.sidebar:
     )
     
     if uploaded_files and st.button("Process Documents"):
-        with st.spinner("Processing documents..."):
-            # Save uploaded files
-            upload_dir = Path("temp_uploads")
-            upload_dir.mkdir(exist_ok=True)
-            
-            file_paths = []
-            for uploaded_file in uploaded_files:
-                file_path = upload_dir / uploaded_file.name
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                file_paths.append(str(file_path))
-            
-            # Process documents
-            processor = DocumentProcessor()
-            chunks = processor.load_documents(file_paths)
-            
-            # Generate embeddings
-            st.info("Generating embeddings...")
-            embedder = EmbeddingGenerator(model_name="intfloat/multilingual-e5-large")
-            texts, embeddings, metadatas = embedder.embed_documents(chunks)
-            
-            # Build vector store
-            st.info("Building vector store...")
-            vector_store = VectorStore(dimension=1024)
-            vector_store.add_documents(texts, embeddings, metadatas)
-            
-            # Save
-            vector_store.save("vector_store")
-            
-            # Store in session
-            st.session_state.vector_store = vector_store
-            st.session_state.embedder = embedder
-            st.session_state.generator = ResponseGenerator()
-            st.session_state.documents_loaded = True
-            
-            st.success(f"✅ Processed {len(chunks)} chunks from {len(uploaded_files)} documents")
+        # Ingest in the background; questions keep using the current store meanwhile
+        job = get_ingestion_queue().submit([(f.name, f.getvalue()) for f in uploaded_files])
+        st.session_state.uploaded = True
+        if job is None:
+            st.info("These files are already being processed")
+        else:
+            st.success(f"📥 Queued {len(job.file_paths)} file(s); they become searchable when the job finishes")
+    
+    if st.session_state.get('uploaded'):
+        show_ingestion_jobs()
     
     st.markdown("---")
     
     # Settings
     st.header("🔧 Settings")
     top_k = st.slider("Number of relevant chunks", 1, 10, 3)
+    hybrid = st.toggle("Keyword + semantic search", value=config.HYBRID_SEARCH,
+                       help="Fuse BM25 keyword matches with vector search (finds exact terms and names)")
+    rerank = st.toggle("Rerank with cross-encoder", value=config.RERANK,
+                       help=f"Retrieve {config.RERANK_CANDIDATES} chunks and keep the best ones")
+    
+    # Restrict retrieval to some documents / one language
+    filters = {}
+    if st.session_state.documents_loaded:
+        selected_files = st.multiselect("📑 Search only in", get_vector_store(VECTOR_STORE_PATH).sources(),
+                                        placeholder="All documents")
+        if selected_files:
+            filters['source_file'] = selected_files
+        language = st.radio("Language", ["All", "Arabic", "English"], horizontal=True)
+        if language != "All":
+            filters['language'] = {"Arabic": "ar", "English": "en"}[language]
     
     if st.button("🗑️ Clear Chat History"):
         st.session_state.chat_history = []
         st.rerun()
+    
+    if st.session_state.documents_loaded:
+        cache_stats = get_generator().answer_cache.stats()
+        st.caption(f"⚡ Answer cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                   f"({cache_stats['hit_rate']:.0%})")
 
 # Main area
 if not st.session_state.documents_loaded:
     st.info("👆 Upload documents or load existing database from the sidebar to get started")
 else:
+    vector_store = get_vector_store(VECTOR_STORE_PATH)
+    embedder = get_embedder()
+    generator = get_generator()
+    
     # Display chat history
     for message in st.session_state.chat_history:
         with st.chat_message(message["role"]):
@@ -165,6 +215,8 @@ else:
                 with st.expander("📄 View Sources"):
                     for i, source in enumerate(message["sources"], 1):
                         st.markdown(f"**Source {i}:** {source['file']} (Page {source['page']})")
+                        if source.get('also_in'):
+                            st.caption("Also in: " + ", ".join(f"{f} (Page {p})" for f, p in source['also_in']))
                         st.caption(f"Distance: {source['distance']:.4f}")
                         st.text(source['text'][:200] + "...")
                         st.markdown("---")
@@ -183,18 +235,26 @@ else:
         with st.chat_message("assistant"):
             with st.spinner("Searching documents..."):
                 # Retrieve
-                query_emb = st.session_state.embedder.generate_embedding(query)
-                results = st.session_state.vector_store.search(query_emb, k=top_k)
+                query_emb = embedder.generate_embedding(query)
+                fetch_k = max(top_k, config.RERANK_CANDIDATES) if rerank else top_k
+                if hybrid:
+                    results = vector_store.hybrid_search(query, query_emb, k=fetch_k, filters=filters)
+                else:
+                    results = vector_store.search(query_emb, k=fetch_k, filters=filters)
+                if rerank:
+                    results = get_reranker().rerank(query, results, top_n=top_k)
                 
             # Generate with streaming
             response_placeholder = st.empty()
             full_response = ""
             
             # Stream the response
-            for chunk in st.session_state.generator.generate_stream(
+            for chunk in generator.generate_stream(
                 query, 
                 results, 
-                chat_history=st.session_state.chat_history[:-1]  # Exclude current question
+                chat_history=st.session_state.chat_history[:-1],  # Exclude current question
+                query_embedding=query_emb,
+                index_version=vector_store.version
             ):
                 full_response += chunk
                 response_placeholder.markdown(full_response + "▌")
@@ -208,6 +268,8 @@ else:
                 sources.append({
                     'file': result['metadata']['source_file'],
                     'page': result['metadata']['page'],
+                    'also_in': [(ref.get('source_file'), ref.get('page'))
+                                for ref in result['metadata'].get('duplicates', [])],
                     'distance': result['distance'],
                     'text': result['text']
                 })
@@ -215,6 +277,8 @@ else:
             with st.expander("📄 View Sources"):
                 for i, source in enumerate(sources, 1):
                     st.markdown(f"**Source {i}:** {source['file']} (Page {source['page']})")
+                    if source['also_in']:
+                        st.caption("Also in: " + ", ".join(f"{f} (Page {p})" for f, p in source['also_in']))
                     st.caption(f"Distance: {source['distance']:.4f}")
                     #st.text(source['text'][:200] + "...")
                     st.markdown("---")
@@ -0,0 +1,534 @@
+"""
+RAG Pipeline Benchmarks
+Measures ingestion and retrieval performance against the sample_docs corpus
+
+Usage:
+    python benchmark.py extract [--workers 1 2 4 8]
+    python benchmark.py index [--k 5] [--queries test_cases|chunks] [--tolerance 0.02]
+    python benchmark.py pca [--dims 0 128 256 384 512 768] [--index-type flat]
+    python benchmark.py embed [--backends onnx onnx-int8] [--num-texts 256]
+    python benchmark.py generate [--concurrency 1 4 8 16] [--latency 0.5] [--rate-limit 0.05]
+    python benchmark.py batching [--slice 64]
+    python benchmark.py service [--clients 16] [--max-batch 32] [--max-wait-ms 5]
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+
+SAMPLE_DOCS = sorted(str(p) for p in Path("sample_docs").glob("*.pdf"))
+
+# Search-time knob swept for each index type
+INDEX_SWEEPS = {
+    "flat": ("-", [None]),
+    "ivf": ("nprobe", [1, 4, 16, 64]),
+    "hnsw": ("ef_search", [16, 32, 64, 128]),
+    "ivfpq": ("nprobe", [1, 4, 16, 64]),
+    "sq8": ("rescore", [1, 2, 4, 8]),
+    "fp16": ("rescore", [1, 2, 4]),
+    "binary": ("rescore", [4, 8, 16, 32, 64]),
+}
+
+
+def load_store_vectors(store_path: str):
+    """Load a saved store and its vectors (stored floats, or reconstructed from the index)"""
+    from src.vector_store import VectorStore
+
+    store = VectorStore()
+    store.load(store_path)
+    ids = store.live_ids()
+    return store, store.vectors_for_ids(ids)
+
+
+def load_queries(source: str, vectors: np.ndarray, num_queries: int) -> np.ndarray:
+    """Query vectors from test_cases.py (needs the model) or sampled chunks"""
+    if source == "test_cases":
+        from src.embeddings_hf import EmbeddingGenerator
+        from test_cases import create_test_cases
+
+        embedder = EmbeddingGenerator(cache_path=None)
+        queries = [tc["query"] for tc in create_test_cases()]
+        return np.array([embedder.generate_embedding(q) for q in queries], dtype="float32")
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    return vectors[rows]
+
+
+def recall_at_k(retrieved: List[List[int]], truth: np.ndarray, k: int) -> float:
+    """Mean fraction of the exact top-k found by an approximate search"""
+    hits = [len(set(r[:k]) & set(t[:k].tolist())) / k for r, t in zip(retrieved, truth)]
+    return float(np.mean(hits))
+
+
+def benchmark_extraction(file_paths: List[str], worker_counts: List[int], backends: List[str]):
+    """Time PDF extraction + chunking per backend and worker count, then a cached re-run"""
+    import shutil
+    import tempfile
+    from src.document_processor import DocumentProcessor
+
+    print("=" * 70)
+    print("BENCHMARK: PDF EXTRACTION")
+    print("=" * 70)
+    print(f"Files: {len(file_paths)}, CPU cores: {os.cpu_count()}")
+
+    timings = {}
+    for backend in backends:
+        processor = DocumentProcessor(pdf_backend=backend, cache_path=None)
+        for workers in worker_counts:
+            start = time.perf_counter()
+            chunks = processor.load_documents(file_paths, workers=workers)
+            timings[(backend, workers)] = time.perf_counter() - start
+            print(f"\n   {backend} workers={workers}: {timings[(backend, workers)]:.2f}s ({len(chunks)} chunks)")
+
+    # Second pass over a warm page cache, as on a rebuild of an unchanged corpus
+    cache_dir = tempfile.mkdtemp(prefix="page_cache_")
+    try:
+        processor = DocumentProcessor(pdf_backend=backends[0], cache_path=cache_dir)
+        processor.load_documents(file_paths, workers=worker_counts[0])
+        start = time.perf_counter()
+        chunks = processor.load_documents(file_paths, workers=worker_counts[0])
+        timings[("cached", worker_counts[0])] = time.perf_counter() - start
+        cache_mb = processor.cache_stats()['size_mb']
+        processor.page_cache.close()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    baseline = timings[(backends[0], worker_counts[0])]
+    print("\n" + "-" * 70)
+    print("EXTRACTION SUMMARY:")
+    print("-" * 70)
+    for (backend, workers), elapsed in timings.items():
+        print(f"{backend:<11} workers={workers:<3} {elapsed:8.2f}s   speedup {baseline / elapsed:.2f}x")
+    print(f"\nPage cache: {cache_mb:.1f} MB for {len(file_paths)} file(s)")
+
+
+def index_bytes(index) -> int:
+    """Serialized size of a FAISS index, i.e. what it keeps in memory"""
+    import faiss
+
+    if isinstance(index, faiss.IndexBinary):
+        return faiss.serialize_index_binary(index).nbytes
+    return faiss.serialize_index(index).nbytes
+
+
+def benchmark_index(store_path: str, k: int, query_source: str, num_queries: int,
+                    index_types: List[str], tolerance: float):
+    """Recall@k, latency and resident size of each index type against exact search"""
+    import faiss
+    from src.vector_store import VectorStore
+
+    print("=" * 70)
+    print("BENCHMARK: INDEX RECALL VS LATENCY")
+    print("=" * 70)
+
+    store, vectors = load_store_vectors(store_path)
+    queries = load_queries(query_source, vectors, num_queries)
+    ids = store.live_ids()
+    print(f"Vectors: {len(vectors)}, queries: {len(queries)}, k={k}")
+
+    # Ground truth from an exact scan
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    truth = ids[exact.search(queries, k)[1]]
+
+    rows = []
+    for index_type in index_types:
+        candidate = VectorStore(dimension=vectors.shape[1], index_type=index_type)
+        start = time.perf_counter()
+        candidate.add_documents(store.texts, vectors, store.metadatas, verbose=False)
+        candidate.train()
+        build_seconds = time.perf_counter() - start
+        bytes_per_vector = index_bytes(candidate.index) / len(vectors)
+
+        knob, values = INDEX_SWEEPS[index_type]
+        for value in values:
+            if knob == "nprobe":
+                candidate.set_search_params(nprobe=value)
+            elif knob == "ef_search":
+                candidate.set_search_params(ef_search=value)
+            elif knob == "rescore":
+                candidate.set_search_params(rescore_factor=value)
+
+            start = time.perf_counter()
+            retrieved = [[r["id"] for r in candidate.search(q, k=k)] for q in queries]
+            latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+            rows.append((index_type, f"{knob}={value}" if value else "-",
+                         recall_at_k(retrieved, truth, k), latency_ms, build_seconds, bytes_per_vector))
+
+    # Exact float32 storage: 4 bytes per dimension plus the 8-byte chunk ID
+    flat_bytes = 4 * vectors.shape[1] + 8
+    print("\n" + "-" * 70)
+    print(f"INDEX SUMMARY (within tolerance: recall@{k} >= {1 - tolerance:.3f}):")
+    print("-" * 70)
+    print(f"{'index':<8}{'setting':<16}{'recall@' + str(k):>10}{'ms/query':>12}{'build s':>10}"
+          f"{'bytes/vec':>11}{'vs flat':>9}{'ok':>4}")
+    for index_type, setting, recall, latency_ms, build_seconds, bytes_per_vector in rows:
+        ok = "✅" if recall >= 1 - tolerance else "❌"
+        print(f"{index_type:<8}{setting:<16}{recall:>10.3f}{latency_ms:>12.3f}{build_seconds:>10.2f}"
+              f"{bytes_per_vector:>11.1f}{flat_bytes / bytes_per_vector:>8.1f}x{ok:>4}")
+
+
+def benchmark_pca(store_path: str, dims: List[int], index_type: str, k: int, repeats: int):
+    """Index size, latency and test_cases.py Precision/MRR per PCA target dimension"""
+    from src.embeddings_hf import EmbeddingGenerator
+    from src.vector_store import VectorStore
+    from test import RAGEvaluator
+    from test_cases import create_test_cases
+
+    print("=" * 70)
+    print("BENCHMARK: PCA DIMENSION SWEEP")
+    print("=" * 70)
+
+    store, vectors = load_store_vectors(store_path)
+    test_cases = [tc for tc in create_test_cases() if tc.get("expected_source")]
+    embedder = EmbeddingGenerator(cache_path=None)
+    queries = embedder.generate_query_embeddings([tc["query"] for tc in test_cases])
+    expected = [tc["expected_source"] for tc in test_cases]
+    print(f"Vectors: {len(vectors)}, queries: {len(queries)}, index: {index_type}, k={k}")
+
+    rows = []
+    for dim in dims:
+        candidate = VectorStore(dimension=vectors.shape[1], index_type=index_type,
+                                index_params={'pca_dim': dim})
+        start = time.perf_counter()
+        candidate.add_documents(store.texts, vectors, store.metadatas, verbose=False)
+        candidate.train()
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            results = candidate.search_batch(queries, k=k)
+        latency_ms = (time.perf_counter() - start) / (repeats * len(queries)) * 1000
+
+        # Same relevance as test.py: a hit counts when it comes from the expected source
+        relevance = np.zeros((len(results), k), dtype=bool)
+        for i, (hits, source) in enumerate(zip(results, expected)):
+            for j, hit in enumerate(hits[:k]):
+                relevance[i, j] = source in (hit["metadata"].get("source_file") or "")
+        precision = float(RAGEvaluator.calculate_precision_at_k(relevance, k).mean())
+        mrr = float(RAGEvaluator.calculate_mrr(relevance).mean())
+        rows.append((dim or vectors.shape[1], index_bytes(candidate.index) / 2 ** 20,
+                     latency_ms, precision, mrr, build_seconds))
+
+    print("\n" + "-" * 70)
+    print("PCA SUMMARY:")
+    print("-" * 70)
+    print(f"{'dims':<7}{'index MB':>10}{'ms/query':>10}{'P@' + str(k):>8}{'MRR':>8}{'build s':>9}")
+    for dim, size_mb, latency_ms, precision, mrr, build_seconds in rows:
+        print(f"{dim:<7}{size_mb:>10.1f}{latency_ms:>10.3f}{precision:>8.3f}{mrr:>8.3f}{build_seconds:>9.2f}")
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity of two embedding matrices"""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def benchmark_embedding(store_path: str, backends: List[str], num_texts: int, k: int):
+    """Parity and throughput of alternative embedding backends against torch"""
+    from src.embeddings_hf import EmbeddingGenerator
+    from src.vector_store import VectorStore
+    from test_cases import create_test_cases
+
+    print("=" * 70)
+    print("BENCHMARK: EMBEDDING BACKENDS")
+    print("=" * 70)
+
+    store = VectorStore()
+    store.load(store_path)
+    passages = ["passage: " + t for t in store.texts[:num_texts]]
+    queries = [tc["query"] for tc in create_test_cases()]
+    print(f"Passages: {len(passages)}, queries: {len(queries)}, k={k}")
+
+    results = {}
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        embedder = EmbeddingGenerator(cache_path=None, query_cache_size=0, backend=backend)
+        embedder.generate_embeddings_batch(passages[:8])  # warm-up
+
+        start = time.perf_counter()
+        passage_vectors = np.array(embedder.generate_embeddings_batch(passages), dtype="float32")
+        passages_per_second = len(passages) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        query_vectors = np.array([embedder.generate_embedding(q) for q in queries], dtype="float32")
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        retrieved = [[r["id"] for r in hits] for hits in store.search_batch(query_vectors, k=k)]
+        results[backend] = (passage_vectors, query_vectors, retrieved, passages_per_second, query_ms)
+        del embedder
+
+    reference = results["torch"]
+    print("\n" + "-" * 70)
+    print("EMBEDDING SUMMARY (parity measured against torch):")
+    print("-" * 70)
+    print(f"{'backend':<11}{'passages/s':>11}{'ms/query':>10}{'cos mean':>10}{'cos min':>9}{'overlap@' + str(k):>12}")
+    for backend, (passage_vectors, query_vectors, retrieved, passages_per_second, query_ms) in results.items():
+        cosines = np.concatenate([
+            cosine_rows(passage_vectors, reference[0]),
+            cosine_rows(query_vectors, reference[1])
+        ])
+        overlap = recall_at_k(retrieved, np.array(reference[2]), k)
+        print(f"{backend:<11}{passages_per_second:>11.1f}{query_ms:>10.1f}"
+              f"{cosines.mean():>10.4f}{cosines.min():>9.4f}{overlap:>12.3f}")
+
+
+def benchmark_batching(file_paths: List[str], slice_size: int, fixed_batch_size: int, token_budget: int):
+    """Fixed-size batches vs token-budget length-bucketed batches on real chunks"""
+    from src.document_processor import DocumentProcessor
+    from src.config import config
+    from src.embeddings_hf import EmbeddingGenerator, token_lengths
+
+    config.EMBEDDING_TOKEN_BUDGET = token_budget
+
+    print("=" * 70)
+    print("BENCHMARK: EMBEDDING BATCHING")
+    print("=" * 70)
+
+    chunks = DocumentProcessor().load_documents(file_paths)
+    texts = ["passage: " + chunk.page_content for chunk in chunks]
+    embedder = EmbeddingGenerator(cache_path=None, query_cache_size=0)
+    lengths = token_lengths(embedder.model, texts)
+    print(f"Chunks: {len(texts)}, tokens: {lengths.sum()} "
+          f"(min {lengths.min()}, median {int(np.median(lengths))}, max {lengths.max()})")
+    embedder.generate_embeddings_batch(texts[:8])  # warm-up
+
+    # Texts arrive in slices, as the ingestion pipeline hands them over
+    slices = [range(i, min(i + slice_size, len(texts))) for i in range(0, len(texts), slice_size)]
+
+    def fixed(batch_texts):
+        return embedder.model.encode(batch_texts, batch_size=fixed_batch_size,
+                                     show_progress_bar=False, convert_to_numpy=True)
+
+    def fixed_padding(rows):
+        # SentenceTransformer sorts each call by character length before batching
+        rows = sorted(rows, key=lambda i: -len(texts[i]))
+        return sum(max(lengths[rows[j:j + fixed_batch_size]]) * len(rows[j:j + fixed_batch_size])
+                   for j in range(0, len(rows), fixed_batch_size))
+
+    results = {}
+    for label in (f"fixed-{fixed_batch_size}", "token-budget"):
+        vectors = np.zeros((len(texts), embedder.dimension), dtype=np.float32)
+        embedder.padded_tokens = 0
+        start = time.perf_counter()
+        for rows in slices:
+            batch_texts = [texts[i] for i in rows]
+            if label == "token-budget":
+                vectors[rows.start:rows.stop] = embedder._encode(batch_texts, verbose=False)
+            else:
+                vectors[rows.start:rows.stop] = fixed(batch_texts)
+        elapsed = time.perf_counter() - start
+        padded = embedder.padded_tokens if label == "token-budget" else sum(fixed_padding(list(r)) for r in slices)
+        results[label] = (vectors, elapsed, padded)
+
+    reference, baseline, _ = results[f"fixed-{fixed_batch_size}"]
+    print("\n" + "-" * 70)
+    print(f"BATCHING SUMMARY (slices of {slice_size} chunks):")
+    print("-" * 70)
+    print(f"{'batching':<14}{'seconds':>9}{'chunks/s':>10}{'padding':>9}{'speedup':>9}{'cos min':>9}")
+    for label, (vectors, elapsed, padded) in results.items():
+        padding = 1 - lengths.sum() / padded
+        print(f"{label:<14}{elapsed:>9.2f}{len(texts) / elapsed:>10.1f}{padding:>9.1%}"
+              f"{baseline / elapsed:>8.2f}x{cosine_rows(vectors, reference).min():>9.4f}")
+
+
+class FakeGeminiModels:
+    """Offline stand-in for client.aio.models: fixed latency, random 429s"""
+
+    def __init__(self, latency: float, rate_limit: float, seed: int = 0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _call(self):
+        from google.genai import errors
+
+        self.calls += 1
+        if self.rng.random() < self.rate_limit:
+            self.rate_limited += 1
+            raise errors.ClientError(429, {"error": {"message": "Resource exhausted"}})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+    async def generate_content(self, model: str, contents: str):
+        await self._call()
+        return SimpleNamespace(text=f"answer ({len(contents)} prompt chars)")
+
+    async def generate_content_stream(self, model: str, contents: str):
+        await self._call()
+
+        async def chunks():
+            for word in ("streamed", "answer"):
+                yield SimpleNamespace(text=word + " ")
+        return chunks()
+
+
+def benchmark_generation(num_questions: int, concurrency_levels: List[int], latency: float,
+                         rate_limit: float):
+    """Batch answering throughput against a fake Gemini client"""
+    from src.generator import ResponseGenerator
+
+    print("=" * 70)
+    print("BENCHMARK: ASYNC GENERATION (fake client)")
+    print("=" * 70)
+    print(f"Questions: {num_questions}, latency: {latency}s, 429 rate: {rate_limit:.0%}")
+
+    chunks = [{'text': "context " * 100, 'metadata': {'source_file': 'doc.pdf', 'page': 1}, 'distance': 0.1}]
+    queries = [f"question {i}" for i in range(num_questions)]
+
+    rows = []
+    for concurrency in concurrency_levels:
+        models = FakeGeminiModels(latency, rate_limit)
+        generator = ResponseGenerator(client=SimpleNamespace(aio=SimpleNamespace(models=models)),
+                                      max_concurrency=concurrency, backoff=latency / 4)
+        start = time.perf_counter()
+        answers = generator.batch_generate(queries, [chunks] * num_questions)
+        elapsed = time.perf_counter() - start
+        failed = sum(isinstance(a, Exception) for a in answers)
+        rows.append((concurrency, elapsed, num_questions / elapsed, models.rate_limited,
+                     models.max_in_flight, failed))
+
+    print("\n" + "-" * 70)
+    print("GENERATION SUMMARY:")
+    print("-" * 70)
+    print(f"{'concurrency':<13}{'seconds':>9}{'q/s':>8}{'429s':>7}{'peak':>7}{'failed':>8}")
+    for concurrency, elapsed, throughput, rate_limited, peak, failed in rows:
+        print(f"{concurrency:<13}{elapsed:>9.2f}{throughput:>8.2f}{rate_limited:>7}{peak:>7}{failed:>8}")
+
+
+def benchmark_service(store_path: str, num_clients: int, max_batch: int, max_wait_ms: float,
+                      requests_per_client: int):
+    """Concurrent retrieval throughput with and without cross-request micro-batching"""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.embeddings_hf import EmbeddingGenerator
+    from src.query_service import QueryService
+    from src.vector_store import VectorStore
+    from test_cases import create_test_cases
+
+    print("=" * 70)
+    print("BENCHMARK: QUERY SERVICE MICRO-BATCHING")
+    print("=" * 70)
+
+    store = VectorStore()
+    store.load(store_path, mmap=True)
+    # No query cache, so every request really gets embedded
+    embedder = EmbeddingGenerator(cache_path=None, query_cache_size=0)
+    queries = [tc["query"] for tc in create_test_cases()]
+    embedder.generate_query_embeddings(queries[:4])  # warm-up
+    print(f"Clients: {num_clients}, requests/client: {requests_per_client}, store: {len(store)} chunks")
+
+    rows = []
+    for label, batch_size in (("unbatched", 1), ("batched", max_batch)):
+        service = QueryService(store, embedder, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+
+        def client(offset: int) -> List[float]:
+            latencies = []
+            for i in range(requests_per_client):
+                start = time.perf_counter()
+                service.retrieve(queries[(offset + i) % len(queries)], hybrid=False)
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=num_clients) as pool:
+            latencies = np.concatenate(list(pool.map(client, range(num_clients)))) * 1000
+        elapsed = time.perf_counter() - start
+        rows.append((label, len(latencies) / elapsed, np.percentile(latencies, 50),
+                     np.percentile(latencies, 99), service.batcher.stats()["mean_batch_size"]))
+
+    print("\n" + "-" * 70)
+    print("SERVICE SUMMARY:")
+    print("-" * 70)
+    print(f"{'mode':<11}{'q/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'batch':>8}")
+    for label, throughput, p50, p99, mean_batch in rows:
+        print(f"{label:<11}{throughput:>9.1f}{p50:>9.1f}{p99:>9.1f}{mean_batch:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    extract_parser = subparsers.add_parser("extract", help="PDF extraction speedup")
+    extract_parser.add_argument("--workers", type=int, nargs="+",
+                                default=[1, 2, 4, os.cpu_count() or 1])
+    extract_parser.add_argument("--backends", nargs="+", default=["pdfplumber", "pypdfium2"])
+    extract_parser.add_argument("--files", nargs="+", default=SAMPLE_DOCS)
+
+    index_parser = subparsers.add_parser("index", help="ANN recall vs latency")
+    index_parser.add_argument("--store", default="vector_store")
+    index_parser.add_argument("--k", type=int, default=5)
+    index_parser.add_argument("--queries", choices=["test_cases", "chunks"], default="chunks")
+    index_parser.add_argument("--num-queries", type=int, default=200)
+    index_parser.add_argument("--types", nargs="+", default=list(INDEX_SWEEPS))
+    index_parser.add_argument("--tolerance", type=float, default=0.02,
+                              help="Largest acceptable recall loss against exact search")
+
+    pca_parser = subparsers.add_parser("pca", help="PCA target dimension vs size, latency and quality")
+    pca_parser.add_argument("--store", default="vector_store")
+    pca_parser.add_argument("--dims", type=int, nargs="+", default=[0, 128, 256, 384, 512, 768],
+                            help="Target dimensions (0 = no projection)")
+    pca_parser.add_argument("--index-type", default="flat")
+    pca_parser.add_argument("--k", type=int, default=5)
+    pca_parser.add_argument("--repeats", type=int, default=20)
+
+    embed_parser = subparsers.add_parser("embed", help="ONNX backend parity and throughput")
+    embed_parser.add_argument("--store", default="vector_store")
+    embed_parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    embed_parser.add_argument("--num-texts", type=int, default=256)
+    embed_parser.add_argument("--k", type=int, default=5)
+
+    generate_parser = subparsers.add_parser("generate", help="Async generation throughput (offline)")
+    generate_parser.add_argument("--questions", type=int, default=64)
+    generate_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    generate_parser.add_argument("--latency", type=float, default=0.5)
+    generate_parser.add_argument("--rate-limit", type=float, default=0.05)
+
+    batching_parser = subparsers.add_parser("batching", help="Token-budget embedding batches vs fixed size")
+    batching_parser.add_argument("--files", nargs="+", default=SAMPLE_DOCS)
+    batching_parser.add_argument("--slice", type=int, default=64, help="Chunks per embed call")
+    batching_parser.add_argument("--fixed-batch", type=int, default=32)
+    batching_parser.add_argument("--token-budget", type=int, default=16384, help="Padded tokens per batch")
+
+    service_parser = subparsers.add_parser("service", help="Micro-batched retrieval under concurrent load")
+    service_parser.add_argument("--store", default="vector_store")
+    service_parser.add_argument("--clients", type=int, default=16)
+    service_parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    service_parser.add_argument("--max-batch", type=int, default=32)
+    service_parser.add_argument("--max-wait-ms", type=float, default=5.0)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "extract":
+        benchmark_extraction(args.files, sorted(set(args.workers)), args.backends)
+    elif args.benchmark == "index":
+        benchmark_index(args.store, args.k, args.queries, args.num_queries, args.types, args.tolerance)
+    elif args.benchmark == "pca":
+        benchmark_pca(args.store, args.dims, args.index_type, args.k, args.repeats)
+    elif args.benchmark == "embed":
+        benchmark_embedding(args.store, args.backends, args.num_texts, args.k)
+    elif args.benchmark == "generate":
+        benchmark_generation(args.questions, args.concurrency, args.latency, args.rate_limit)
+    elif args.benchmark == "batching":
+        benchmark_batching(args.files, args.slice, args.fixed_batch, args.token_budget)
+    elif args.benchmark == "service":
+        benchmark_service(args.store, args.clients, args.max_batch, args.max_wait_ms, args.requests)
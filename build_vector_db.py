@@ -1,61 +1,172 @@
-"""Build and save vector database from your PDFs"""
+"""Build and save vector database from your PDFs
+
+Only files whose content hash changed since the last build are extracted,
+chunked and embedded; everything else is kept from the existing store.
+"""
 
 import warnings
 warnings.filterwarnings('ignore')
 
-from src.document_processor import DocumentProcessor
+import argparse
+from pathlib import Path
+
+from src.config import config
+from src.deduplication import ChunkDeduplicator
+from src.document_processor import PDF_BACKENDS, DocumentProcessor, compute_file_hash
 from src.embeddings_hf import EmbeddingGenerator
+from src.ingestion import IngestionPipeline
 from src.vector_store import VectorStore
 
-print("=" * 60)
-print("🏗️  Building Vector Database")
-print("=" * 60)
-
-# Step 1: Load documents
-print("\n📚 STEP 1: Loading PDFs")
-print("-" * 60)
-
-processor = DocumentProcessor()
-file_paths = [
+SAVE_PATH = "vector_store"
+FILE_PATHS = [
     "sample_docs/RAND_RR487z1_english.pdf",
     "sample_docs/RAND_RR1562z1.arabic.pdf",
     "sample_docs/RAND_RR1681z1.arabic.pdf",
     "sample_docs/RAND_RRA3540-1_english.pdf",
-    
+
 ]
 
-chunks = processor.load_documents(file_paths)
-print(f"✅ Loaded {len(chunks)} chunks")
-
-# Step 2: Generate embeddings
-print("\n🧮 STEP 2: Generating Embeddings")
-print("-" * 60)
-
-embedder = EmbeddingGenerator()
-texts, embeddings, metadatas = embedder.embed_documents(chunks)
-print(f"✅ Generated {len(embeddings)} embeddings")
-
-# Step 3: Build vector store
-print("\n💾 STEP 3: Building Vector Store")
-print("-" * 60)
-
-vector_store = VectorStore(dimension=1024)
-vector_store.add_documents(texts, embeddings, metadatas)
-
-# Step 4: Save to disk
-print("\n💿 STEP 4: Saving to Disk")
-print("-" * 60)
-
-save_path = "vector_store"
-vector_store.save(save_path)
-
-print("\n" + "=" * 60)
-print("✅ Vector Database Built & Saved!")
-print("=" * 60)
-print(f"📂 Location: {save_path}/")
-print(f"📊 Total documents: {len(chunks)}")
-print(f"📐 Dimension: 384")
-print(f"💾 Files created:")
-print(f"   - {save_path}/index.faiss")
-print(f"   - {save_path}/data.pkl")
-print("=" * 60)
\ No newline at end of file
+
+def change_pca_dim(vector_store: VectorStore, pca_dim: int):
+    """Refit the store's PCA projection (0 = none) on its full-dimensional embeddings
+
+    Vectors read back through an existing projection have lost the
+    discarded components, so they are taken from the embedding cache
+    (re-encoding any chunk it misses) unless the store keeps exact ones.
+    """
+    print(f"   📉 PCA dimensions: {vector_store.index_params['pca_dim'] or 'off'} → {pca_dim or 'off'}")
+    vectors = None
+    if not vector_store.lossless_vectors():
+        ids = vector_store.live_ids()
+        print(f"   💾 Reading {len(ids)} embeddings from the embedding cache")
+        vectors = EmbeddingGenerator().embed_passages(vector_store.texts_for_ids(ids), verbose=False)
+    vector_store.index_params['pca_dim'] = pca_dim
+    vector_store.rebuild(vectors)
+
+
+def main(args):
+    save_path = SAVE_PATH
+    file_paths = FILE_PATHS
+
+    print("=" * 60)
+    print("🏗️  Building Vector Database")
+    print("=" * 60)
+
+    # Step 1: Find changed files
+    print("\n🔍 STEP 1: Checking for changed files")
+    print("-" * 60)
+
+    pca_dim = config.PCA_DIM if args.pca_dim is None else args.pca_dim
+    vector_store = VectorStore(dimension=1024, index_params={'pca_dim': pca_dim})
+    if not args.rebuild and VectorStore.exists(save_path):
+        vector_store.load(save_path)
+        # The projection is stored with the index; only an explicit --pca-dim changes it
+        if args.pca_dim is not None and vector_store.index_params['pca_dim'] != args.pca_dim:
+            change_pca_dim(vector_store, args.pca_dim)
+
+    changed = {}
+    for file_path in file_paths:
+        if not Path(file_path).exists():
+            print(f"   ❌ Missing: {file_path}")
+            continue
+        content_hash = compute_file_hash(file_path)
+        if vector_store.is_current(Path(file_path).name, content_hash):
+            print(f"   ⏭️  Unchanged: {Path(file_path).name}")
+        else:
+            print(f"   🔄 Changed: {Path(file_path).name}")
+            changed[file_path] = content_hash
+
+    if args.prune:
+        listed = {Path(file_path).name for file_path in file_paths}
+        for source_file in list(vector_store.sources()):
+            if source_file not in listed:
+                vector_store.remove_source(source_file)
+
+    # Step 2: Stream changed documents through extract → chunk → embed → index
+    print(f"\n📚 STEP 2: Ingesting {len(changed)} changed file(s)")
+    print("-" * 60)
+
+    stats = {'chunks': 0}
+    if changed:
+        processor = DocumentProcessor(workers=args.workers, pdf_backend=args.pdf_backend,
+                                      cache_path=args.page_cache or None)
+        embedder = EmbeddingGenerator()
+        batch_size = args.batch_size
+        if args.embed_workers > 1:
+            embedder.start_pool(args.embed_workers, args.embed_threads)
+            # Each batch should give every worker at least one full shard
+            batch_size = max(batch_size, args.embed_workers * config.EMBEDDING_POOL_SHARD)
+        deduplicator = ChunkDeduplicator() if args.dedup else None
+        pipeline = IngestionPipeline(processor, embedder, vector_store, batch_size=batch_size,
+                                     deduplicator=deduplicator)
+        try:
+            stats = pipeline.run(list(changed), content_hashes=changed)
+        finally:
+            embedder.stop_pool()
+
+        for pid, worker in sorted(embedder.pool_stats().items()):
+            print(f"   ⚙️  Worker {pid}: {worker['texts']} chunks in {worker['seconds']:.1f}s "
+                  f"({worker['texts_per_second']:.1f} chunks/s)")
+
+        if deduplicator is not None:
+            checked = stats['chunks'] + stats['duplicates']
+            print(f"🧬 Duplicates: {stats['duplicates']} of {checked} chunks dropped "
+                  f"({stats['duplicates'] / max(checked, 1) * 100:.1f}%: "
+                  f"{stats['duplicates_exact']} exact, {stats['duplicates_near']} near, "
+                  f"{stats['duplicates_embedding']} by embedding)")
+
+        page_stats = processor.cache_stats()
+        if page_stats:
+            print(f"📑 Page cache: {page_stats['hits']} pages reused / {page_stats['misses']} extracted "
+                  f"({page_stats['hit_rate']*100:.1f}% hit rate, {page_stats['size_mb']:.1f} MB on disk)")
+
+        cache_stats = embedder.cache_stats()
+        if cache_stats:
+            print(f"💾 Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                  f"({cache_stats['hit_rate']*100:.1f}% hit rate, "
+                  f"~{cache_stats['estimated_seconds_saved']:.1f}s encode time saved)")
+
+    # Step 3: Save to disk
+    print("\n💿 STEP 3: Saving to Disk")
+    print("-" * 60)
+
+    version_path = vector_store.save(save_path)
+
+    print("\n" + "=" * 60)
+    print("✅ Vector Database Built & Saved!")
+    print("=" * 60)
+    print(f"📂 Location: {save_path}/")
+    print(f"📊 Total documents: {len(vector_store)} ({stats['chunks']} re-embedded)")
+    print(f"📐 Dimension: {vector_store.dimension}")
+    print(f"💾 Files created:")
+    print(f"   - {version_path}/index.faiss")
+    print(f"   - {version_path}/store.json")
+    print(f"   - {version_path}/texts.bin + *.npy (memory-mapped chunk store)")
+    print(f"   - {save_path}/CURRENT (points at the version above)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the vector database")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignore the existing store and re-ingest every file")
+    parser.add_argument("--prune", action="store_true",
+                        help="Remove files from the store that are no longer listed")
+    parser.add_argument("--workers", type=int, default=config.EXTRACTION_WORKERS,
+                        help="Processes used for PDF extraction")
+    parser.add_argument("--pdf-backend", choices=list(PDF_BACKENDS), default=config.PDF_BACKEND,
+                        help="PDF text extraction library (pdfplumber is the fallback for failed pages)")
+    parser.add_argument("--page-cache", default=config.PAGE_CACHE_PATH,
+                        help="Directory of the extracted page text cache (\"\" disables it)")
+    parser.add_argument("--embed-workers", type=int, default=config.EMBEDDING_WORKERS,
+                        help="Processes used for embedding (1 = in-process)")
+    parser.add_argument("--embed-threads", type=int, default=None,
+                        help="torch threads per embedding process (default: cores / processes)")
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE,
+                        help="Chunks per embedding batch")
+    parser.add_argument("--pca-dim", type=int, default=None,
+                        help="Project embeddings to this many dimensions with PCA (0 = full 1024; unvalidated, "
+                             "see benchmark.py pca). Default: keep the store's setting, else PCA_DIM")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false", default=config.DEDUP,
+                        help="Keep duplicate chunks instead of dropping them")
+    main(parser.parse_args())
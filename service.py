@@ -0,0 +1,186 @@
+"""
+RAG Query Service
+Local HTTP API over a once-loaded vector store, embedding model and generator
+
+Usage:
+    python service.py [--port 8000] [--store vector_store] [--no-generator]
+
+Endpoints:
+    GET  /health                     store size and version
+    GET  /stats                      micro-batching and cache statistics
+    POST /retrieve  {"query", "k", "hybrid", "filters"}           -> JSON results
+    POST /answer    {"query", "k", "hybrid", "filters", "chat_history", "stream"}
+                    -> streamed text (default) or JSON {"answer", "sources"}
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.config import config
+from src.embeddings_hf import EmbeddingGenerator
+from src.query_service import QueryService, check_request
+from src.vector_store import VectorStore
+
+
+def _public(result: dict) -> dict:
+    """JSON-safe view of a search result"""
+    return {key: value for key, value in result.items() if key in ('id', 'text', 'metadata', 'distance', 'score')}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over a shared QueryService"""
+
+    protocol_version = "HTTP/1.1"
+    service: QueryService = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            store = self.service.vector_store
+            self._send_json({"status": "ok", "documents": len(store), "version": store.version})
+        elif self.path == "/stats":
+            self._send_json(self.service.stats())
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+            if not isinstance(body, dict):
+                raise ValueError("body must be a JSON object")
+            query = body["query"]
+            if not isinstance(query, str):
+                raise ValueError("query must be a string")
+            k = body.get("k", config.TOP_K_RESULTS)
+            hybrid = bool(body.get("hybrid", config.HYBRID_SEARCH))
+            filters = body.get("filters")
+            chat_history = body.get("chat_history")
+            check_request(k, filters, chat_history)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json({"error": f"bad request: {e}"}, status=400)
+            return
+
+        if self.path == "/retrieve":
+            try:
+                results, _ = self.service.retrieve(query, k, hybrid, filters)
+            except Exception as e:
+                self._send_json({"error": f"retrieval failed: {e}"}, status=500)
+                return
+            self._send_json({"results": [_public(r) for r in results]})
+        elif self.path == "/answer":
+            if self.service.generator is None:
+                self._send_json({"error": "answering is disabled"}, status=503)
+                return
+            try:
+                stream, results = self.service.answer_stream(query, k, hybrid, chat_history, filters)
+            except Exception as e:
+                self._send_json({"error": f"retrieval failed: {e}"}, status=500)
+                return
+            if body.get("stream", True):
+                self._send_stream(stream)
+                return
+            try:
+                answer = "".join(stream)
+            except Exception as e:
+                self._send_json({"error": f"generation failed: {e}"}, status=500)
+                return
+            self._send_json({"answer": answer, "sources": [_public(r) for r in results]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: dict, status: int = 200):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, pieces):
+        """Send text pieces as they are generated (chunked transfer encoding)
+
+        The first piece is generated before the headers are sent, so a
+        generation failing right away still gets a 500. A later failure
+        ends the stream with an error line and the terminating chunk.
+        """
+        pieces = iter(pieces)
+        try:
+            first = next(pieces, "")
+        except Exception as e:
+            self._send_json({"error": f"generation failed: {e}"}, status=500)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._send_chunk(first)
+        while True:
+            try:
+                piece = next(pieces)
+            except StopIteration:
+                break
+            except Exception as e:
+                self._send_chunk(f"\n\n[error: generation failed: {e}]")
+                break
+            self._send_chunk(piece)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_chunk(self, piece: str):
+        data = piece.encode("utf-8")
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(args):
+    print("=" * 60)
+    print("🚀 Starting RAG query service")
+    print("=" * 60)
+
+    vector_store = VectorStore(dimension=config.EMBEDDING_DIMENSION)
+    vector_store.load(args.store, mmap=config.INDEX_MMAP)
+    embedder = EmbeddingGenerator(model_name=config.EMBEDDING_MODEL)
+
+    generator = None
+    if not args.no_generator:
+        from src.answer_cache import AnswerCache
+        from src.generator import ResponseGenerator
+        generator = ResponseGenerator(answer_cache=AnswerCache())
+
+    QueryHandler.service = QueryService(vector_store, embedder, generator,
+                                        max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+    print(f"✅ Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        embedder.flush_cache()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG query service")
+    parser.add_argument("--host", default=config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    parser.add_argument("--store", default="vector_store")
+    parser.add_argument("--max-batch", type=int, default=config.MICRO_BATCH_MAX_SIZE,
+                        help="Most queries per encode/search batch")
+    parser.add_argument("--max-wait-ms", type=float, default=config.MICRO_BATCH_MAX_WAIT_MS,
+                        help="How long a batch waits for more queries")
+    parser.add_argument("--no-generator", action="store_true",
+                        help="Serve retrieval only (no Gemini client)")
+    main(parser.parse_args())
@@ -0,0 +1,146 @@
+"""
+Answer Cache Module
+Reuse generated answers for near-identical questions over the same chunks
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from src.config import config
+
+
+class AnswerCache:
+    """
+    In-memory cache of LLM answers, looked up by query-embedding similarity
+
+    An entry is reused only when all of these hold:
+        - cosine similarity of the query embeddings >= threshold
+        - the same set of chunk IDs was retrieved as context
+        - the same chat history was sent with the question
+        - the vector store version is unchanged
+
+    Entries expire after ttl_seconds and the least recently used are
+    evicted beyond max_entries. When a different store version shows up,
+    every entry is dropped, since chunk IDs of the old version may no
+    longer mean the same thing.
+    """
+
+    def __init__(self, threshold: float = config.ANSWER_CACHE_THRESHOLD,
+                 ttl_seconds: float = config.ANSWER_CACHE_TTL_SECONDS,
+                 max_entries: int = config.ANSWER_CACHE_SIZE):
+        """
+        Args:
+            threshold: Minimum cosine similarity between query embeddings
+            ttl_seconds: Lifetime of an entry
+            max_entries: Maximum number of cached answers
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._version = None
+        self._entries = OrderedDict()   # entry ID -> dict
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def context_key(context_chunks: List[Dict], chat_history: Optional[List[Dict]] = None) -> str:
+        """Identity of the retrieved chunk set plus the chat history"""
+        chunk_ids = sorted(chunk['id'] for chunk in context_chunks)
+        history = [(msg["role"], msg["content"]) for msg in (chat_history or [])[-6:]]
+        return hashlib.sha256(repr((chunk_ids, history)).encode("utf-8")).hexdigest()
+
+    def get(self, query_embedding, context_key: str, version: str) -> Optional[str]:
+        """Cached answer for a similar query over the same context, or None"""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+
+            best_id, best_score = None, self.threshold
+            for entry_id, entry in self._entries.items():
+                if entry['context_key'] != context_key:
+                    continue
+                score = float(entry['vector'] @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id]['answer']
+
+    def put(self, query_embedding, context_key: str, version: str, answer: str):
+        """Remember an answer"""
+        with self._lock:
+            self._check_version(version)
+            self._entries[self._next_id] = {
+                'vector': self._normalize(query_embedding),
+                'context_key': context_key,
+                'answer': answer,
+                'created_at': time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss statistics"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    @staticmethod
+    def replay(answer: str) -> Iterator[str]:
+        """Yield a cached answer in word-sized pieces, like a streamed response"""
+        for piece in re.findall(r"\s*\S+|\s+$", answer):
+            yield piece
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry['created_at'] < cutoff]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        self.evictions += len(expired)
@@ -0,0 +1,194 @@
+"""
+Chunk Store Module
+Memory-mapped columnar storage for chunk texts and metadata
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from src.metadata_columns import MetadataBuilder, MetadataColumns
+from src.text_utils import detect_language
+
+
+class ChunkStore(MetadataColumns):
+    """Read-only, memory-mapped columnar storage of chunk texts and metadata
+
+    Layout (one directory):
+        chunk_ids.npy      int64  chunk ID per row, ascending
+        text_offsets.npy   int64  byte offsets into texts.bin (rows + 1)
+        texts.bin                 UTF-8 chunk texts, concatenated
+        source_ids.npy     int32  row -> index into sources.json (-1 = none)
+        pages.npy          int32  page number (-1 = none)
+        start_indices.npy  int32  start_index of the chunk (-1 = none)
+        language_ids.npy   int8   row -> index into languages.json (-1 = none)
+        extra_offsets.npy  int64  byte offsets into extra.bin (rows + 1)
+        extra.bin                 JSON of any other metadata keys (empty = none)
+        sources.json              [source, source_file] pairs
+        languages.json            language codes
+        vectors.npy        float32  embedding per row (compressed index types only)
+
+    Opening only maps the files, so it costs the same regardless of corpus
+    size, and processes opening the same store share the page cache. Texts
+    and metadata dicts are decoded on demand, one row at a time.
+    """
+
+    IDS_FILE = "chunk_ids.npy"
+    TEXT_OFFSETS_FILE = "text_offsets.npy"
+    TEXTS_FILE = "texts.bin"
+    SOURCE_IDS_FILE = "source_ids.npy"
+    PAGES_FILE = "pages.npy"
+    START_INDICES_FILE = "start_indices.npy"
+    EXTRA_OFFSETS_FILE = "extra_offsets.npy"
+    EXTRA_FILE = "extra.bin"
+    SOURCES_FILE = "sources.json"
+    LANGUAGE_IDS_FILE = "language_ids.npy"
+    LANGUAGES_FILE = "languages.json"
+    VECTORS_FILE = "vectors.npy"
+    FILES = (IDS_FILE, TEXT_OFFSETS_FILE, TEXTS_FILE, SOURCE_IDS_FILE, PAGES_FILE, START_INDICES_FILE,
+             EXTRA_OFFSETS_FILE, EXTRA_FILE, SOURCES_FILE, LANGUAGE_IDS_FILE, LANGUAGES_FILE, VECTORS_FILE)
+
+    def __init__(self, path: str):
+        """Map a chunk store directory"""
+        self.path = Path(path)
+        self.ids = np.load(self.path / self.IDS_FILE, mmap_mode='r')
+        self.text_offsets = np.load(self.path / self.TEXT_OFFSETS_FILE, mmap_mode='r')
+        self.source_ids = np.load(self.path / self.SOURCE_IDS_FILE, mmap_mode='r')
+        self.pages = np.load(self.path / self.PAGES_FILE, mmap_mode='r')
+        self.extra_offsets = np.load(self.path / self.EXTRA_OFFSETS_FILE, mmap_mode='r')
+        self._texts = self._map_blob(self.path / self.TEXTS_FILE)
+        self._extra_blob = self._map_blob(self.path / self.EXTRA_FILE)
+
+        with open(self.path / self.SOURCES_FILE, encoding="utf-8") as f:
+            self.sources = [tuple(pair) for pair in json.load(f)]
+
+        # Stores written before these columns existed keep the keys in extra.bin
+        self.start_indices = self._load_optional(self.START_INDICES_FILE, np.int32)
+        if (self.path / self.LANGUAGE_IDS_FILE).exists():
+            self.language_ids = np.load(self.path / self.LANGUAGE_IDS_FILE, mmap_mode='r')
+            with open(self.path / self.LANGUAGES_FILE, encoding="utf-8") as f:
+                self.languages = json.load(f)
+        else:
+            self._backfill_languages()
+
+        self.vectors = None
+        if (self.path / self.VECTORS_FILE).exists():
+            self.vectors = np.load(self.path / self.VECTORS_FILE, mmap_mode='r')
+
+    def _backfill_languages(self):
+        """Fill the language column of a store saved before it existed
+
+        Rows take the language kept in extra.bin, else detect_language() of
+        their text, as ingestion does now. The column is written next to
+        the others when the directory allows it, so this runs once.
+        """
+        builder = MetadataBuilder()
+        for row in range(len(self)):
+            language = (self._extra(row) or {}).get('language')
+            builder.append({'language': language if isinstance(language, str) else detect_language(self.text(row))})
+        self.language_ids = builder.language_ids.copy()
+        self.languages = builder.languages
+        print(f"🌐 Detected chunk languages for {len(self)} rows of {self.path}")
+
+        languages_tmp = self.path / f"{self.LANGUAGES_FILE}.tmp"
+        ids_tmp = self.path / f"{self.LANGUAGE_IDS_FILE}.tmp.npy"
+        try:
+            with open(languages_tmp, "w", encoding="utf-8") as f:
+                json.dump(self.languages, f, ensure_ascii=False)
+            np.save(ids_tmp, self.language_ids)
+            # languages.json first: language_ids.npy marks the column as present
+            os.replace(languages_tmp, self.path / self.LANGUAGES_FILE)
+            os.replace(ids_tmp, self.path / self.LANGUAGE_IDS_FILE)
+        except OSError as e:
+            print(f"⚠️ Could not save the language column ({e}); it is kept in memory")
+            for tmp in (languages_tmp, ids_tmp):
+                tmp.unlink(missing_ok=True)
+
+    def _load_optional(self, file_name: str, dtype) -> np.ndarray:
+        if (self.path / file_name).exists():
+            return np.load(self.path / file_name, mmap_mode='r')
+        return np.full(len(self.ids), -1, dtype=dtype)
+
+    @staticmethod
+    def _map_blob(path: Path):
+        if path.stat().st_size == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode='r')
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return (Path(path) / cls.IDS_FILE).exists()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def text(self, row: int) -> str:
+        """Decode the text of one row"""
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return self._texts[start:end].tobytes().decode("utf-8")
+
+    def _extra(self, row: int) -> Optional[dict]:
+        start, end = self.extra_offsets[row], self.extra_offsets[row + 1]
+        if end > start:
+            return json.loads(self._extra_blob[start:end].tobytes().decode("utf-8"))
+        return None
+
+    def find_rows(self, ids: np.ndarray) -> np.ndarray:
+        """Rows holding the given chunk IDs (-1 where absent)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        rows = np.searchsorted(self.ids, ids)
+        rows = np.minimum(rows, len(self.ids) - 1)
+        return np.where(self.ids[rows] == ids, rows, -1)
+
+    @classmethod
+    def write(cls, path: str, ids: Iterable[int], texts: Iterable[str], metadatas: Iterable[dict]):
+        """Write rows (ids ascending) to a chunk store directory"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        ids_out = []
+        text_offsets, extra_offsets = [0], [0]
+        columns = MetadataBuilder()
+
+        with open(path / cls.TEXTS_FILE, "wb") as texts_file, open(path / cls.EXTRA_FILE, "wb") as extra_file:
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                ids_out.append(chunk_id)
+
+                encoded = text.encode("utf-8")
+                texts_file.write(encoded)
+                text_offsets.append(text_offsets[-1] + len(encoded))
+
+                columns.append(metadata)
+                extra = columns.extras[-1]
+                extra = json.dumps(extra, ensure_ascii=False).encode("utf-8") if extra else b""
+                extra_file.write(extra)
+                extra_offsets.append(extra_offsets[-1] + len(extra))
+
+        np.save(path / cls.IDS_FILE, np.array(ids_out, dtype=np.int64))
+        np.save(path / cls.TEXT_OFFSETS_FILE, np.array(text_offsets, dtype=np.int64))
+        np.save(path / cls.SOURCE_IDS_FILE, columns.source_ids)
+        np.save(path / cls.PAGES_FILE, columns.pages)
+        np.save(path / cls.START_INDICES_FILE, columns.start_indices)
+        np.save(path / cls.EXTRA_OFFSETS_FILE, np.array(extra_offsets, dtype=np.int64))
+        np.save(path / cls.LANGUAGE_IDS_FILE, columns.language_ids)
+        with open(path / cls.SOURCES_FILE, "w", encoding="utf-8") as f:
+            json.dump([list(key) for key in columns.sources], f, ensure_ascii=False)
+        with open(path / cls.LANGUAGES_FILE, "w", encoding="utf-8") as f:
+            json.dump(columns.languages, f, ensure_ascii=False)
+
+    @classmethod
+    def write_vectors(cls, path: str, blocks: Iterable[np.ndarray], num_rows: int, dimension: int):
+        """Write float32 vectors, given as consecutive blocks of rows, to vectors.npy"""
+        vectors = np.lib.format.open_memmap(Path(path) / cls.VECTORS_FILE, mode='w+',
+                                            dtype=np.float32, shape=(num_rows, dimension))
+        start = 0
+        for block in blocks:
+            vectors[start:start + len(block)] = block
+            start += len(block)
+        vectors.flush()
+        del vectors
@@ -21,10 +21,23 @@ class Config:
     LLM_MODEL: str = "gemini-3-flash-preview"
     EMBEDDING_DIMENSION: int = 1024
     
+    # LLM Request Settings (HARDCODED)
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_RETRIES: int = 4
+    LLM_BACKOFF_SECONDS: float = 1.0
+    
+    # Answer Cache Settings (HARDCODED)
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_TTL_SECONDS: float = 24 * 3600
+    ANSWER_CACHE_THRESHOLD: float = 0.97  # cosine similarity of query embeddings
+    
     # RAG Parameters (HARDCODED)
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     TOP_K_RESULTS: int = 3
+    CONTEXT_TOKEN_BUDGET: int = 3000  # estimated prompt tokens for document context
+    HISTORY_TOKEN_BUDGET: int = 800   # estimated prompt tokens for chat history
     
     # Generation Settings (HARDCODED)
     TEMPERATURE: float = 0.7
@@ -32,6 +45,91 @@ class Config:
     
     # Vector Store Settings (HARDCODED)
     VECTOR_STORE_PATH: str = "./vector_store"
+    INDEX_TYPE: str = "flat"          # flat, ivf, hnsw, ivfpq, sq8, fp16 or binary
+    IVF_NLIST: int = 1024
+    IVF_NPROBE: int = 16
+    HNSW_M: int = 32
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    PQ_M: int = 64
+    PQ_NBITS: int = 8
+    # sq8, fp16 and binary and their rescore factors are not yet validated on
+    # the real corpus; compare recall@k with 'python benchmark.py index' first
+    SQ_TRAIN_SIZE: int = 4096         # vectors buffered before training sq8 ranges
+    # PCA is not yet validated on the real corpus; sweep target dimensions
+    # with 'python benchmark.py pca' before turning it on
+    PCA_DIM: int = 0                  # > 0 projects vectors to this many dimensions (PCA)
+    PCA_TRAIN_SIZE: int = 8192        # vectors buffered before fitting the projection
+    RESCORE_FACTOR: int = 4           # sq8/fp16: candidates per result rescored on float vectors
+    BINARY_RESCORE_FACTOR: int = 32   # the same for binary codes
+    INDEX_MMAP: bool = True           # app maps index.faiss read-only instead of reading it
+    FILTER_EXACT_MAX: int = 4096      # filtered subsets up to this size are searched exactly
+    FILTER_CACHE_SIZE: int = 64       # ID selectors kept per store version
+    
+    # Hybrid Search Settings (HARDCODED)
+    HYBRID_SEARCH: bool = True        # app default for BM25 + vector fusion
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    HYBRID_CANDIDATES: int = 50       # dense and lexical hits fused per query
+    RRF_K: int = 60                   # reciprocal rank fusion constant
+    
+    # Embedding Backend Settings (HARDCODED)
+    EMBEDDING_BACKEND: str = "torch"  # torch, onnx or onnx-int8
+    ONNX_EXPORT_DIR: str = "./onnx_models"
+    ONNX_QUANTIZATION: str = "avx2"   # arm64, avx2, avx512 or avx512_vnni
+    EMBEDDING_BATCH_SIZE: int = 32        # texts per encode batch when not budgeting tokens
+    # Token-budget batching (e.g. 16384 padded tokens per batch) is not yet
+    # validated on the real corpus; measure with 'python benchmark.py batching'
+    EMBEDDING_TOKEN_BUDGET: int = 0       # padded tokens per encode batch (0 = fixed batches)
+    EMBEDDING_MAX_BATCH: int = 256        # cap on texts per batch, however short
+    EMBEDDING_WORKERS: int = 1            # processes for bulk embedding (1 = in-process)
+    EMBEDDING_POOL_MIN_TEXTS: int = 128   # smaller inputs are encoded in-process
+    EMBEDDING_POOL_SHARD: int = 64        # texts per worker task
+    
+    # Reranker Settings (HARDCODED)
+    RERANK: bool = False              # app default for the optional cross-encoder stage
+    RERANKER_MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    RERANKER_MAX_LENGTH: int = 512
+    RERANK_CANDIDATES: int = 20       # chunks retrieved before reranking
+    RERANK_BUDGET_MS: float = 400.0
+    RERANK_CACHE_SIZE: int = 10_000
+    
+    # Embedding Cache Settings (HARDCODED)
+    EMBEDDING_CACHE_PATH: str = "./embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    EMBEDDING_CACHE_DTYPE: str = "float16"
+    QUERY_CACHE_SIZE: int = 1024
+    QUERY_CACHE_PATH: str = "./embedding_cache/queries.npz"   # "" keeps it in memory only
+    QUERY_CACHE_SAVE_SECONDS: float = 300.0   # how often the app saves new query embeddings
+    
+    # Extraction Settings (HARDCODED)
+    EXTRACTION_WORKERS: int = max(1, min(4, (os.cpu_count() or 1) // 2))   # leaves cores for embedding
+    EXTRACTION_PAGES_PER_TASK: int = 8
+    # pypdfium2 is faster but its text output is not yet validated against
+    # pdfplumber on the real corpus; compare with 'python benchmark.py extract'
+    # and the test cases before switching
+    PDF_BACKEND: str = "pdfplumber"           # pdfplumber or pypdfium2; pdfplumber is the per-page fallback
+    PAGE_CACHE_PATH: str = "./page_cache"     # extracted page text ("" disables the cache)
+    
+    # Ingestion Pipeline Settings (HARDCODED)
+    INGEST_BATCH_SIZE: int = 64
+    INGEST_QUEUE_BATCHES: int = 4
+    UPLOAD_DIR: str = "temp_uploads"  # where the app writes uploaded files
+    INGEST_JOB_HISTORY: int = 20      # finished app ingestion jobs kept for display
+    
+    # Deduplication Settings (HARDCODED)
+    DEDUP: bool = True
+    DEDUP_THRESHOLD: float = 0.85         # estimated Jaccard similarity of word shingles
+    DEDUP_NUM_PERM: int = 64
+    DEDUP_BANDS: int = 16
+    DEDUP_SHINGLE_SIZE: int = 5
+    DEDUP_EMBEDDING_THRESHOLD: float = 0.0   # > 0 also drops chunks this cosine-similar within a batch
+    
+    # Service Settings (HARDCODED)
+    MICRO_BATCH_MAX_SIZE: int = 32
+    MICRO_BATCH_MAX_WAIT_MS: float = 5.0
+    SERVICE_HOST: str = "127.0.0.1"
+    SERVICE_PORT: int = 8000
     
     # Supported file types (HARDCODED)
     SUPPORTED_FILE_TYPES: list = [".pdf", ".docx", ".txt"]
@@ -54,6 +152,8 @@ class Config:
             "chunk_overlap": cls.CHUNK_OVERLAP,
             "top_k": cls.TOP_K_RESULTS,
             "temperature": cls.TEMPERATURE,
+            "index_type": cls.INDEX_TYPE,
+            "embedding_backend": cls.EMBEDDING_BACKEND,
         }
 
 
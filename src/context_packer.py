@@ -0,0 +1,143 @@
+"""
+Context Packer Module
+Merge overlapping retrieved chunks and fit them into a token budget
+"""
+
+from typing import Dict, List, Optional
+
+from src.config import config
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 UTF-8 bytes per token; Arabic letters take 2 bytes)"""
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def merge_overlapping(first: str, second: str, min_overlap: int = 20,
+                      max_overlap: int = 2 * config.CHUNK_OVERLAP) -> Optional[str]:
+    """
+    Join two texts whose end and start overlap (as CHUNK_OVERLAP produces)
+
+    Returns the merged text, the longer text if one contains the other,
+    or None if the texts don't overlap.
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for size in range(min(len(first), len(second), max_overlap), min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+
+class ContextPacker:
+    """
+    Turn retrieved chunks into a compact, token-budgeted prompt context
+
+    Chunks from the same source file and page are put in reading order
+    (by the splitter's start_index when present) and neighbours whose text
+    overlaps are merged, so the CHUNK_OVERLAP span is sent once. Passages
+    are then added best-first until the token budget is used up; one that
+    doesn't fit is skipped in favour of smaller, less relevant ones.
+    """
+
+    def __init__(self, token_budget: int = config.CONTEXT_TOKEN_BUDGET,
+                 history_budget: int = config.HISTORY_TOKEN_BUDGET):
+        """
+        Args:
+            token_budget: Estimated tokens available for document context
+            history_budget: Estimated tokens available for chat history
+        """
+        self.token_budget = token_budget
+        self.history_budget = history_budget
+
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def pack(self, context_chunks: List[Dict]) -> List[Dict]:
+        """
+        Merge and budget retrieved chunks (given best first)
+
+        Returns:
+            Passages in relevance order, in the same format as search results;
+            merged passages list their chunk IDs under 'ids'
+        """
+        passages = self._merge(context_chunks)
+
+        packed = []
+        remaining = self.token_budget
+        for passage in passages:
+            tokens = estimate_tokens(passage['text'])
+            if tokens <= remaining:
+                packed.append(passage)
+                remaining -= tokens
+            elif not packed and remaining > 0:
+                # Never send an empty context: cut the best passage to fit
+                passage['text'] = self._truncate(passage['text'], remaining)
+                packed.append(passage)
+                remaining = 0
+
+        self.tokens_in += sum(estimate_tokens(chunk['text']) for chunk in context_chunks)
+        self.tokens_out += sum(estimate_tokens(passage['text']) for passage in packed)
+        return packed
+
+    def pack_history(self, chat_history: Optional[List[Dict]], max_messages: int = 6) -> List[Dict]:
+        """Most recent messages (up to max_messages) that fit the history budget"""
+        kept = []
+        remaining = self.history_budget
+        for message in reversed((chat_history or [])[-max_messages:]):
+            tokens = estimate_tokens(message["content"])
+            if tokens > remaining:
+                break
+            kept.append(message)
+            remaining -= tokens
+        return kept[::-1]
+
+    def stats(self) -> dict:
+        """Return estimated tokens before and after packing"""
+        return {
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "saved_ratio": 1 - self.tokens_out / self.tokens_in if self.tokens_in else 0.0,
+        }
+
+    def _merge(self, context_chunks: List[Dict]) -> List[Dict]:
+        """Merge overlapping chunks of the same page, keeping the best rank of each group"""
+        groups = {}
+        for rank, chunk in enumerate(context_chunks):
+            metadata = chunk.get('metadata') or {}
+            key = (metadata.get('source_file'), metadata.get('page'))
+            groups.setdefault(key, []).append((rank, chunk))
+
+        passages = []
+        for members in groups.values():
+            members.sort(key=lambda m: (m[1].get('metadata', {}).get('start_index', 0), m[0]))
+            current_rank, current = members[0]
+            current = self._passage(current)
+            for rank, chunk in members[1:]:
+                merged = merge_overlapping(current['text'], chunk['text']) \
+                    or merge_overlapping(chunk['text'], current['text'])
+                if merged is None:
+                    passages.append((current_rank, current))
+                    current_rank, current = rank, self._passage(chunk)
+                    continue
+                current['text'] = merged
+                current['ids'].append(chunk['id'])
+                current['distance'] = min(current['distance'], chunk['distance'])
+                current_rank = min(current_rank, rank)
+            passages.append((current_rank, current))
+
+        passages.sort(key=lambda p: p[0])
+        return [passage for _, passage in passages]
+
+    @staticmethod
+    def _passage(chunk: Dict) -> Dict:
+        return {**chunk, 'ids': [chunk['id']]}
+
+    @staticmethod
+    def _truncate(text: str, tokens: int) -> str:
+        """Cut text to about `tokens` tokens at a word boundary"""
+        encoded = text.encode("utf-8")[:tokens * 4]
+        cut = encoded.decode("utf-8", errors="ignore")
+        return cut.rsplit(" ", 1)[0] if " " in cut else cut
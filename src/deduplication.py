@@ -0,0 +1,352 @@
+"""
+Deduplication Module
+Exact and near-duplicate chunk detection (MinHash LSH) for ingestion
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import config
+from src.text_utils import WHITESPACE, normalize_for_matching
+
+# Largest prime below 2**32: with factors and inputs reduced below it,
+# a * x + b stays under 2**64
+_PRIME = 4294967291
+# Odd multiplier folding a band's signature values into one uint64 key
+_BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+MINHASH_FORMAT_VERSION = 1
+
+
+def canonical_text(text: str) -> str:
+    """Text as compared for duplicates: normalised, whitespace collapsed"""
+    return WHITESPACE.sub(" ", normalize_for_matching(text)).strip()
+
+
+def band_hashes(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """uint64 key of each LSH band of each signature (rows x bands)"""
+    signatures = np.asarray(signatures, dtype=np.uint32)
+    rows_per_band = signatures.shape[1] // bands
+    values = signatures.reshape(len(signatures), bands, rows_per_band).astype(np.uint64)
+    keys = np.zeros(values.shape[:2], dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for i in range(rows_per_band):
+            keys = keys * _BAND_MULTIPLIER + values[:, :, i] + np.uint64(1)
+    return keys
+
+
+class MinHashColumns:
+    """Memory-mapped MinHash signatures of the rows of a ChunkStore
+
+    Layout (next to the chunk store files):
+        minhash.json                        parameters the signatures were made with
+        minhash.npy              uint32     signature per row
+        minhash_digests.npy      S16        digests of the canonical texts, sorted
+        minhash_digest_rows.npy  int64      row of each sorted digest
+        minhash_bands.npy        uint64     band keys, sorted per band (bands x rows)
+        minhash_band_rows.npy    int64      row of each sorted band key
+
+    Lookups are binary searches over the sorted columns, so a store is
+    deduplicated against without decoding or re-hashing its texts.
+    """
+
+    PARAMS_FILE = "minhash.json"
+    SIGNATURES_FILE = "minhash.npy"
+    DIGESTS_FILE = "minhash_digests.npy"
+    DIGEST_ROWS_FILE = "minhash_digest_rows.npy"
+    BANDS_FILE = "minhash_bands.npy"
+    BAND_ROWS_FILE = "minhash_band_rows.npy"
+    FILES = (PARAMS_FILE, SIGNATURES_FILE, DIGESTS_FILE, DIGEST_ROWS_FILE, BANDS_FILE, BAND_ROWS_FILE)
+
+    def __init__(self, path: str):
+        """Map the MinHash columns of a chunk store directory"""
+        self.path = Path(path)
+        with open(self.path / self.PARAMS_FILE, encoding="utf-8") as f:
+            self.params = json.load(f)
+        self.signatures = np.load(self.path / self.SIGNATURES_FILE, mmap_mode='r')
+        self.sorted_digests = np.load(self.path / self.DIGESTS_FILE, mmap_mode='r')
+        self.digest_rows = np.load(self.path / self.DIGEST_ROWS_FILE, mmap_mode='r')
+        self.sorted_bands = np.load(self.path / self.BANDS_FILE, mmap_mode='r')
+        self.band_rows = np.load(self.path / self.BAND_ROWS_FILE, mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return all((Path(path) / name).exists() for name in cls.FILES)
+
+    @classmethod
+    def write(cls, path: str, signatures: np.ndarray, digests: np.ndarray, params: dict):
+        """Write the columns for rows with these signatures and digests (row order)"""
+        path = Path(path)
+        signatures = np.ascontiguousarray(signatures, dtype=np.uint32).reshape(len(digests), params['num_perm'])
+        digests = np.asarray(digests, dtype='S16')
+
+        digest_rows = np.argsort(digests, kind='stable')
+        keys = band_hashes(signatures, params['bands']).T
+        band_rows = np.argsort(keys, axis=1, kind='stable')
+
+        np.save(path / cls.SIGNATURES_FILE, signatures)
+        np.save(path / cls.DIGESTS_FILE, digests[digest_rows])
+        np.save(path / cls.DIGEST_ROWS_FILE, digest_rows.astype(np.int64))
+        np.save(path / cls.BANDS_FILE, np.take_along_axis(keys, band_rows, axis=1))
+        np.save(path / cls.BAND_ROWS_FILE, band_rows.astype(np.int64))
+        with open(path / cls.PARAMS_FILE, "w", encoding="utf-8") as f:
+            json.dump(params, f)
+
+    def digests(self) -> np.ndarray:
+        """Digest per row"""
+        digests = np.empty(len(self), dtype='S16')
+        digests[self.digest_rows] = self.sorted_digests
+        return digests
+
+    def exact_rows(self, digest: bytes) -> np.ndarray:
+        """Rows whose canonical text has this digest, ascending"""
+        lo = int(np.searchsorted(self.sorted_digests, digest, side='left'))
+        hi = int(np.searchsorted(self.sorted_digests, digest, side='right'))
+        return np.sort(self.digest_rows[lo:hi])
+
+    def band_candidates(self, band: int, key: int) -> np.ndarray:
+        """Rows with this key in a band, ascending"""
+        keys = self.sorted_bands[band]
+        lo = int(np.searchsorted(keys, np.uint64(key), side='left'))
+        hi = int(np.searchsorted(keys, np.uint64(key), side='right'))
+        return np.sort(self.band_rows[band, lo:hi])
+
+
+class ChunkDeduplicator:
+    """
+    Find chunks whose text repeats one seen before
+
+    Exact duplicates are found by a hash of the canonical text. Near
+    duplicates (re-issued reports, boilerplate pages with small changes)
+    by MinHash over word shingles: signatures are split into bands, chunks
+    sharing any band become candidates, and a candidate is accepted when
+    the fraction of equal signature values (the estimated Jaccard
+    similarity of the shingle sets) reaches `threshold`.
+
+    Kept chunks are registered and get an integer handle. A handle can be
+    given a key (the chunk ID) once one is known, or made an alias of
+    another handle when its chunk is dropped after all. The chunks of a
+    saved store can be seeded from its MinHashColumns instead, as handles
+    0..rows-1 keyed by their chunk IDs.
+    """
+
+    def __init__(self, threshold: float = config.DEDUP_THRESHOLD,
+                 num_perm: int = config.DEDUP_NUM_PERM,
+                 bands: int = config.DEDUP_BANDS,
+                 shingle_size: int = config.DEDUP_SHINGLE_SIZE,
+                 seed: int = 1):
+        """
+        Args:
+            threshold: Minimum estimated Jaccard similarity for a near duplicate
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm must divide evenly)
+            shingle_size: Words per shingle
+            seed: Seed of the MinHash permutations
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+        # Universal hashing (a * x + b) mod p; p must be close to the input
+        # range so the products wrap and each permutation orders differently
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+        self._exact: Dict[bytes, int] = {}
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+        self._keys: List[Optional[Hashable]] = []
+        self._aliases: Dict[int, int] = {}
+
+        # Seeded rows of a saved store: handles 0..len(stored)-1
+        self._stored: Optional[MinHashColumns] = None
+        self._stored_keys: Optional[np.ndarray] = None
+        self._stored_eligible: Optional[np.ndarray] = None
+        self._num_stored = 0
+
+        self.checked = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def __len__(self) -> int:
+        return self._num_stored + len(self._signatures)
+
+    def params(self) -> dict:
+        """Parameters stored signatures must match to be seeded from"""
+        return {
+            'format_version': MINHASH_FORMAT_VERSION,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'shingle_size': self.shingle_size,
+            'seed': self.seed,
+        }
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (uint32) of a canonical text's word shingles"""
+        words = text.split()
+        size = min(self.shingle_size, max(len(words), 1))
+        shingles = {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+             for s in shingles),
+            dtype=np.uint64, count=len(shingles)
+        ) % np.uint64(_PRIME)
+        permuted = (hashes[:, None] * self._a + self._b) % np.uint64(_PRIME)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def fingerprint(self, text: str) -> Tuple[bytes, np.ndarray]:
+        """Digest and MinHash signature of a text, as MinHashColumns stores them"""
+        canonical = canonical_text(text)
+        return self._digest(canonical), self.signature(canonical)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        return band_hashes(signature[None, :], self.bands)[0].tolist()
+
+    @staticmethod
+    def _digest(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def seed_stored(self, stored: MinHashColumns, keys: np.ndarray, eligible: np.ndarray):
+        """
+        Seed the rows of a saved store from its MinHash columns
+
+        Must come before any register(). Row i becomes handle i with key
+        keys[i]; rows not eligible (removed, or of sources being replaced)
+        are never matched.
+        """
+        if len(self._signatures):
+            raise RuntimeError("Stored rows must be seeded before registering chunks")
+        if stored.params != self.params():
+            raise ValueError(f"Stored signatures were made with {stored.params}, not {self.params()}")
+        self._stored = stored
+        self._stored_keys = np.asarray(keys)
+        self._stored_eligible = np.asarray(eligible, dtype=bool)
+        self._num_stored = len(stored)
+
+    def _handle_signature(self, handle: int) -> np.ndarray:
+        if handle < self._num_stored:
+            return self._stored.signatures[handle]
+        return self._signatures[handle - self._num_stored]
+
+    def resolve(self, handle: int) -> int:
+        """Follow aliases to the handle of the chunk actually kept"""
+        while handle in self._aliases:
+            handle = self._aliases[handle]
+        return handle
+
+    def key(self, handle: int) -> Optional[Hashable]:
+        """Key of the kept chunk a handle stands for"""
+        handle = self.resolve(handle)
+        if handle < self._num_stored:
+            return self._stored_keys[handle].item()
+        return self._keys[handle - self._num_stored]
+
+    def set_key(self, handle: int, key: Hashable):
+        self._keys[handle - self._num_stored] = key
+
+    def alias(self, handle: int, target: int):
+        """Make a registered chunk stand for another one (it was dropped later)"""
+        self._aliases[handle] = self.resolve(target)
+
+    def _exact_handle(self, digest: bytes) -> Optional[int]:
+        if self._stored is not None:
+            rows = self._stored.exact_rows(digest)
+            rows = rows[self._stored_eligible[rows]]
+            if len(rows):
+                return int(rows[0])
+        return self._exact.get(digest)
+
+    def _candidates(self, band: int, key: int) -> List[int]:
+        candidates = []
+        if self._stored is not None:
+            rows = self._stored.band_candidates(band, key)
+            candidates = rows[self._stored_eligible[rows]].tolist()
+        return candidates + self._buckets[band].get(key, [])
+
+    def find(self, text: str) -> Tuple[Optional[int], Optional[str], Optional[np.ndarray]]:
+        """
+        Look a text up among the registered chunks
+
+        Returns:
+            (handle of the chunk it duplicates or None, "exact"/"near" or None,
+             its MinHash signature for register())
+        """
+        self.checked += 1
+        canonical = canonical_text(text)
+        handle = self._exact_handle(self._digest(canonical))
+        if handle is not None:
+            self.exact_duplicates += 1
+            return self.resolve(handle), "exact", None
+
+        signature = self.signature(canonical)
+        best, best_score = None, self.threshold
+        seen = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            for candidate in self._candidates(band, band_key):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = float(np.mean(self._handle_signature(candidate) == signature))
+                if score >= best_score:
+                    best, best_score = candidate, score
+        if best is not None:
+            self.near_duplicates += 1
+            return self.resolve(best), "near", signature
+        return None, None, signature
+
+    def register(self, text: str, signature: Optional[np.ndarray] = None,
+                 key: Optional[Hashable] = None) -> int:
+        """Remember a kept chunk, returning its handle"""
+        handle = len(self)
+        canonical = canonical_text(text)
+        self._exact.setdefault(self._digest(canonical), handle)
+        if signature is None:
+            signature = self.signature(canonical)
+        self._signatures.append(signature)
+        self._keys.append(key)
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(handle)
+        return handle
+
+    def stats(self) -> dict:
+        """Return how many chunks were checked and found duplicated"""
+        removed = self.exact_duplicates + self.near_duplicates
+        return {
+            "checked": self.checked,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "removed_ratio": removed / self.checked if self.checked else 0.0,
+        }
+
+
+def embedding_duplicates(embeddings: np.ndarray, threshold: float) -> Dict[int, int]:
+    """
+    Rows of a batch whose embedding nearly equals an earlier row's
+
+    Returns:
+        Mapping of duplicate row -> the earlier row it repeats
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, 1e-12)
+    similarity = np.triu(vectors @ vectors.T, k=1)
+
+    duplicates = {}
+    for earlier, later in zip(*np.nonzero(similarity >= threshold)):
+        earlier, later = int(earlier), int(later)
+        if later not in duplicates:
+            # Point at the first row of a chain, which is the one kept
+            duplicates[later] = duplicates.get(earlier, earlier)
+    return duplicates
@@ -6,7 +6,10 @@ Loads and chunks documents for the RAG pipeline
 import warnings
 warnings.filterwarnings('ignore')
 
-from typing import List
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 
 # Updated LangChain imports
@@ -15,82 +18,347 @@ from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from src.config import config
+from src.page_cache import PageTextCache
+from src.text_utils import detect_language
+
+
+def compute_file_hash(file_path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Bump when extraction or its post-processing changes, to invalidate cached page text
+EXTRACTOR_VERSION = 1
+
+
+def _pdfium_texts(file_path: str, page_nums: List[int]) -> List[Optional[str]]:
+    """Text of the given 0-based pages via pypdfium2, None for pages it failed on"""
+    import pypdfium2 as pdfium
+    texts = []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        for page_num in page_nums:
+            try:
+                page = pdf[page_num]
+                textpage = page.get_textpage()
+                texts.append(textpage.get_text_bounded().replace("\r\n", "\n").replace("\r", "\n"))
+                textpage.close()
+                page.close()
+            except Exception:
+                texts.append(None)
+    finally:
+        pdf.close()
+    return texts
+
+
+def _pdfplumber_texts(file_path: str, page_nums: List[int]) -> List[Optional[str]]:
+    """Text of the given 0-based pages via pdfplumber"""
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return [pdf.pages[page_num].extract_text() for page_num in page_nums]
+
+
+def _pdfium_count(file_path: str) -> int:
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def _pdfplumber_count(file_path: str) -> int:
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def _pdfium_version() -> str:
+    import pypdfium2 as pdfium
+    return str(pdfium.version.PYPDFIUM_INFO)
+
+
+def _pdfplumber_version() -> str:
+    import pdfplumber
+    return pdfplumber.__version__
+
+
+# PDF extraction backends: name -> (page text, page count, library version).
+# pdfplumber is the slow but robust fallback for pages other backends fail on.
+PDF_BACKENDS = {
+    "pypdfium2": (_pdfium_texts, _pdfium_count, _pdfium_version),
+    "pdfplumber": (_pdfplumber_texts, _pdfplumber_count, _pdfplumber_version),
+}
+FALLBACK_BACKEND = "pdfplumber"
+
+
+def extractor_key(backend: str) -> str:
+    """Cache key of a backend's output: name, library version and EXTRACTOR_VERSION"""
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unsupported PDF backend: {backend} (expected one of {tuple(PDF_BACKENDS)})")
+    return f"{backend}/{PDF_BACKENDS[backend][2]()}/v{EXTRACTOR_VERSION}"
+
+
+def _count_pdf_pages(file_path: str, backend: str = FALLBACK_BACKEND) -> int:
+    """Number of pages in a PDF"""
+    if backend != FALLBACK_BACKEND:
+        try:
+            return PDF_BACKENDS[backend][1](file_path)
+        except Exception:
+            pass
+    return PDF_BACKENDS[FALLBACK_BACKEND][1](file_path)
+
+
+def _extract_pdf_pages(file_path: str, start: int, end: int,
+                       backend: str = FALLBACK_BACKEND) -> List[Tuple[int, str]]:
+    """Extract (page number, text) for pages [start, end) of a PDF
+
+    Pages the backend fails on are re-extracted with the fallback backend.
+    Module-level so it can run in a worker process.
+    """
+    page_nums = list(range(start, end))
+    texts = [None] * len(page_nums)
+    if backend != FALLBACK_BACKEND:
+        try:
+            texts = PDF_BACKENDS[backend][0](file_path, page_nums)
+        except Exception:
+            pass  # could not open the document at all
+    failed = [i for i, text in enumerate(texts) if text is None]
+    if failed:
+        retried = PDF_BACKENDS[FALLBACK_BACKEND][0](file_path, [page_nums[i] for i in failed])
+        for i, text in zip(failed, retried):
+            texts[i] = text
+    return [(page_num + 1, text) for page_num, text in zip(page_nums, texts)]
 
 
 class DocumentProcessor:
     """Process documents into chunks for embedding"""
-    
-    def __init__(self):
-        """Initialize with text splitter"""
+
+    def __init__(self, workers: int = config.EXTRACTION_WORKERS,
+                 pages_per_task: int = config.EXTRACTION_PAGES_PER_TASK,
+                 pdf_backend: str = config.PDF_BACKEND,
+                 cache_path: Optional[str] = config.PAGE_CACHE_PATH):
+        """Initialize with text splitter
+
+        Args:
+            workers: Processes used by load_documents for PDF extraction (1 = sequential)
+            pages_per_task: Pages extracted per worker task
+            pdf_backend: One of PDF_BACKENDS, with pdfplumber as per-page fallback
+            cache_path: Directory of the extracted page text cache (None disables it)
+        """
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=config.CHUNK_SIZE,
             chunk_overlap=config.CHUNK_OVERLAP,
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True  # lets ContextPacker merge overlapping neighbours
         )
         self.supported_extensions = config.SUPPORTED_FILE_TYPES
-    
-    def load_document(self, file_path: str) -> List[Document]:
-        """Load and chunk a single document"""
-        file_path = Path(file_path)
-        
+        self.workers = max(1, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.failed_files = []
+
+        self.pdf_backend = pdf_backend
+        self.extractor = extractor_key(pdf_backend)
+        self.page_cache = PageTextCache(cache_path) if cache_path else None
+
+    def cache_stats(self) -> Optional[dict]:
+        """Page text cache hit/miss counts (None when the cache is disabled)"""
+        return self.page_cache.stats() if self.page_cache is not None else None
+
+    def _check_file(self, file_path: Path):
+        """Raise if a file is missing or of an unsupported type"""
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
-        
+
         file_extension = file_path.suffix.lower()
         if file_extension not in self.supported_extensions:
             raise ValueError(f"Unsupported file type: {file_extension}")
-        
-        print(f"📄 Loading: {file_path.name}")
-        
-        # Load based on file type
+
+    def _pages_to_documents(self, file_path: Path, pages: List[Tuple[int, str]]) -> List[Document]:
+        """Wrap extracted PDF pages into page-level documents"""
+        documents = []
+        for page_num, text in pages:
+            if text:
+                documents.append(Document(
+                    page_content=text,
+                    metadata={"page": page_num, "source": str(file_path)}
+                ))
+        return documents
+
+    def _split(self, file_path: Path, documents: List[Document]) -> List[Document]:
+        """Split page-level documents into chunks"""
+        chunks = self.text_splitter.split_documents(documents)
+
+        # Add filename and language to metadata
+        for chunk in chunks:
+            chunk.metadata['source_file'] = file_path.name
+            chunk.metadata['language'] = detect_language(chunk.page_content)
+
+        return chunks
+
+    def _content_hash(self, file_path: str, content_hashes: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Content hash a PDF is cached under (None when there is nothing to cache)"""
+        if self.page_cache is None or Path(file_path).suffix.lower() != ".pdf":
+            return None
+        if content_hashes and file_path in content_hashes:
+            return content_hashes[file_path]
+        return compute_file_hash(file_path)
+
+    def _plan_pdf(self, file_path: Path, content_hash: Optional[str]) -> Tuple[int, Dict[int, str], List[Tuple[int, int]]]:
+        """
+        Look a PDF up in the page cache
+
+        Returns:
+            (num_pages, cached, ranges): cached maps page numbers to text
+            already extracted, ranges lists the [start, end) page ranges
+            still to extract. A fully cached PDF is never opened.
+        """
+        num_pages, cached = None, {}
+        if self.page_cache is not None and content_hash:
+            num_pages = self.page_cache.num_pages(content_hash, self.extractor)
+            if num_pages is not None:
+                cached = self.page_cache.get_pages(content_hash, self.extractor)
+        if num_pages is None:
+            num_pages = _count_pdf_pages(str(file_path), self.pdf_backend)
+
+        ranges = []
+        for start in range(0, num_pages, self.pages_per_task):
+            end = min(start + self.pages_per_task, num_pages)
+            if any(page_num + 1 not in cached for page_num in range(start, end)):
+                ranges.append((start, end))
+        return num_pages, cached, ranges
+
+    def _iter_documents(self, file_path: Path, content_hash: Optional[str] = None,
+                        plan: Optional[tuple] = None) -> Iterator[List[Document]]:
+        """Yield page-level documents of a file, one page range at a time
+
+        `plan` is (num_pages, cached, futures) with futures mapping each
+        range start of _plan_pdf to a pending extraction in a process pool;
+        without it PDFs are extracted in this process.
+        Extracted pages are written to the page cache under content_hash.
+        """
+        file_extension = file_path.suffix.lower()
+
         if file_extension == ".pdf":
-            import pdfplumber
-            documents = []
-            with pdfplumber.open(str(file_path)) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    text = page.extract_text()
-                    if text:
-                        doc = Document(
-                            page_content=text,
-                            metadata={"page": page_num + 1, "source": str(file_path)}
-                        )
-                        documents.append(doc)
-        
+            if plan is None:
+                num_pages, cached, ranges = self._plan_pdf(file_path, content_hash)
+                pending = {start: None for start, _ in ranges}
+            else:
+                num_pages, cached, pending = plan
+
+            # Page ranges are walked in order, so page order stays deterministic
+            for start in range(0, num_pages, self.pages_per_task):
+                end = min(start + self.pages_per_task, num_pages)
+                if start not in pending:
+                    pages = [(page_num + 1, cached[page_num + 1]) for page_num in range(start, end)]
+                    if self.page_cache is not None:
+                        self.page_cache.record(hits=len(pages), misses=0)
+                else:
+                    future = pending[start]
+                    pages = future.result() if future is not None else \
+                        _extract_pdf_pages(str(file_path), start, end, self.pdf_backend)
+                    if self.page_cache is not None and content_hash:
+                        self.page_cache.put_pages(content_hash, self.extractor, num_pages, pages)
+                        self.page_cache.record(hits=0, misses=len(pages))
+                yield self._pages_to_documents(file_path, pages)
+
         elif file_extension == ".docx":
             loader = Docx2txtLoader(str(file_path))
-            documents = loader.load()
-        
+            yield loader.load()
+
         elif file_extension == ".txt":
             loader = TextLoader(str(file_path), encoding='utf-8')
-            documents = loader.load()
-        
-        # Split into chunks
-        chunks = self.text_splitter.split_documents(documents)
-        
-        # Add filename to metadata
-        for chunk in chunks:
-            chunk.metadata['source_file'] = file_path.name
-        
+            yield loader.load()
+
+    def load_document(self, file_path: str) -> List[Document]:
+        """Load and chunk a single document"""
+        file_path = Path(file_path)
+        self._check_file(file_path)
+
+        print(f"📄 Loading: {file_path.name}")
+
+        chunks = []
+        for documents in self._iter_documents(file_path, self._content_hash(str(file_path))):
+            chunks.extend(self._split(file_path, documents))
+
         print(f"   ✅ {len(chunks)} chunks")
         return chunks
-    
-    def load_documents(self, file_paths: List[str]) -> List[Document]:
+
+    def iter_chunks(self, file_paths: List[str], workers: Optional[int] = None,
+                    content_hashes: Optional[Dict[str, str]] = None) -> Iterator[Document]:
+        """Lazily load and chunk multiple documents, file by file
+
+        Chunks are yielded as each page range is extracted, so memory stays
+        bounded by the consumer rather than the corpus. With more than one
+        worker, PDF page ranges of all files are extracted ahead in a
+        process pool. Pages found in the page cache (keyed by content_hashes,
+        computed when not given) are not extracted again. Files that fail
+        are reported and recorded in failed_files; chunks already yielded
+        for them should be discarded.
+        """
+        workers = self.workers if workers is None else max(1, workers)
+        self.failed_files = []
+        pool = None
+        if workers > 1:
+            # spawn: callers may have initialised torch or started threads, which fork copies unsafely
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        plans, file_hashes = {}, {}
+
+        try:
+            if pool is not None:
+                for file_path in file_paths:
+                    path = Path(file_path)
+                    if path.exists() and path.suffix.lower() == ".pdf":
+                        try:
+                            file_hashes[file_path] = self._content_hash(file_path, content_hashes)
+                            num_pages, cached, ranges = self._plan_pdf(path, file_hashes[file_path])
+                        except Exception:
+                            continue  # reported below when the file is loaded
+                        plans[file_path] = (num_pages, cached, {
+                            start: pool.submit(_extract_pdf_pages, str(path), start, end, self.pdf_backend)
+                            for start, end in ranges
+                        })
+                print(f"⚡ Extracting PDF pages with {workers} workers")
+
+            for file_path in file_paths:
+                path = Path(file_path)
+                try:
+                    self._check_file(path)
+                    print(f"📄 Loading: {path.name}")
+
+                    num_chunks = 0
+                    content_hash = file_hashes.pop(file_path, None) or self._content_hash(file_path, content_hashes)
+                    for documents in self._iter_documents(path, content_hash, plans.pop(file_path, None)):
+                        chunks = self._split(path, documents)
+                        num_chunks += len(chunks)
+                        yield from chunks
+
+                    print(f"   ✅ {num_chunks} chunks")
+                except Exception as e:
+                    print(f"   ❌ Failed: {file_path} - {str(e)}")
+                    self.failed_files.append(file_path)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def load_documents(self, file_paths: List[str], workers: Optional[int] = None) -> List[Document]:
         """Load and chunk multiple documents"""
-        all_chunks = []
-        
         print(f"\n📚 Loading {len(file_paths)} document(s)...")
         print("=" * 60)
-        
-        for file_path in file_paths:
-            try:
-                chunks = self.load_document(file_path)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                print(f"   ❌ Failed: {file_path} - {str(e)}")
-                continue
-        
+
+        all_chunks = list(self.iter_chunks(file_paths, workers=workers))
+
+        # Drop partial output of files that failed midway
+        failed = {str(Path(file_path)) for file_path in self.failed_files}
+        if failed:
+            all_chunks = [chunk for chunk in all_chunks if chunk.metadata.get('source') not in failed]
+
         print("=" * 60)
         print(f"✅ Total chunks: {len(all_chunks)}")
-        
-        return all_chunks
\ No newline at end of file
+
+        return all_chunks
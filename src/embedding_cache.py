@@ -0,0 +1,439 @@
+"""
+Embedding Cache Module
+Persistent, content-addressed cache of passage embeddings and an LRU cache
+of query embeddings
+"""
+
+import json
+import hashlib
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.text_utils import normalize_query
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by (model name, prefix, text hash)
+
+    Vectors live in a memory-mapped file of fixed-size slots, and a small
+    index maps each SHA-256 key to its slot. When the cache is full the
+    least recently used slots are evicted and reused.
+
+    The key owning each slot is also written next to its vector, and every
+    read checks it: the index is only persisted by flush(), so after a
+    crash or while another process reuses slots it may point at vectors
+    that now belong to other texts. Only one process writes at a time;
+    a cache locked by another process is opened read-only.
+    """
+
+    META_FILE = "cache.json"
+    VECTORS_FILE = "vectors.bin"
+    KEYS_FILE = "keys.bin"
+    INDEX_FILE = "index.npz"
+    LOCK_FILE = "cache.lock"
+
+    def __init__(self, path: str, model_name: str, dimension: int,
+                 max_entries: int = 200_000, dtype: str = "float16"):
+        """
+        Open (or create) a cache directory
+
+        Args:
+            path: Directory holding the cache files
+            model_name: Embedding model the vectors belong to
+            dimension: Embedding dimension
+            max_entries: Maximum number of cached vectors before eviction
+            dtype: Storage dtype for vectors ("float16" or "float32")
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self.writable = self._acquire_lock()
+        self._vectors = None
+        self._slot_keys = None    # memmap: key currently stored in each slot
+        self._capacity = 0
+        self._slots = {}          # key (bytes) -> slot
+        self._keys = np.zeros((0, 32), dtype=np.uint8)
+        self._ticks = np.zeros(0, dtype=np.int64)   # 0 marks a free slot
+        self._free = []
+        self._tick = 0
+
+        self._open()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def make_key(self, text: str, prefix: str = "") -> bytes:
+        """Content address of a text for this model and prefix"""
+        payload = f"{self.model_name}\x00{prefix}\x00{text}".encode("utf-8")
+        return hashlib.sha256(payload).digest()
+
+    def get_many(self, texts: List[str], prefix: str = "") -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up cached embeddings
+
+        Returns:
+            (embeddings, missing) where embeddings is a float32 array with
+            rows filled for hits and missing lists the indices to encode
+        """
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        missing = []
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self.make_key(text, prefix)
+                slot = self._slots.get(key)
+                if slot is not None:
+                    # Vector first, then its key: a writer invalidates the key before rewriting
+                    embeddings[i] = self._vectors[slot]
+                if slot is None or self._slot_keys[slot].tobytes() != key:
+                    embeddings[i] = 0
+                    missing.append(i)
+                    continue
+                self._tick += 1
+                self._ticks[slot] = self._tick
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        return embeddings, missing
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray, prefix: str = ""):
+        """Store embeddings for texts, evicting old entries if needed"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(texts) == 0 or not self.writable:
+            return
+
+        with self._lock:
+            keys = [self.make_key(text, prefix) for text in texts]
+            new_keys = [k for k in dict.fromkeys(keys) if k not in self._slots]
+
+            # Touch entries already present so eviction cannot pick them
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is not None:
+                    self._tick += 1
+                    self._ticks[slot] = self._tick
+            self._reserve(len(new_keys))
+
+            for key, vector in zip(keys, embeddings):
+                slot = self._slots.get(key)
+                if slot is None:
+                    slot = self._free.pop()
+                    self._slots[key] = slot
+                    self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                # Invalidate the slot while its vector is rewritten
+                self._slot_keys[slot] = 0
+                self._vectors[slot] = vector.astype(self.dtype)
+                self._slot_keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self._tick += 1
+                self._ticks[slot] = self._tick
+
+    def flush(self):
+        """Persist the slot index and flush vectors to disk"""
+        if not self.writable:
+            return
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._slot_keys.flush()
+            np.savez(self.path / self.INDEX_FILE, keys=self._keys, ticks=self._ticks)
+
+    def clear(self):
+        """Drop every cached vector"""
+        with self._lock:
+            self._vectors = None
+            self._slot_keys = None
+            if not self.writable:
+                self._capacity = 0
+                self._slots = {}
+                return
+            for name in (self.VECTORS_FILE, self.KEYS_FILE, self.INDEX_FILE):
+                (self.path / name).unlink(missing_ok=True)
+            self._capacity = 0
+            self._slots = {}
+            self._keys = np.zeros((0, 32), dtype=np.uint8)
+            self._ticks = np.zeros(0, dtype=np.int64)
+            self._free = []
+            self._tick = 0
+            self._write_meta()
+
+    def stats(self) -> dict:
+        """Return hit/miss statistics"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "size_mb": self._capacity * self.dimension * self.dtype.itemsize / 1e6,
+        }
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def close(self):
+        """Flush and release the writer lock"""
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self.writable = False
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _acquire_lock(self) -> bool:
+        """Take the single-writer lock; False if another process holds it"""
+        if fcntl is None:
+            return True
+        self._lock_file = open(self.path / self.LOCK_FILE, "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            print(f"⚠️ Embedding cache at {self.path} is in use by another process, opening it read-only")
+            return False
+
+    def _meta(self) -> dict:
+        return {
+            "model_name": self.model_name,
+            "dimension": self.dimension,
+            "dtype": self.dtype.name,
+        }
+
+    def _write_meta(self):
+        with open(self.path / self.META_FILE, "w", encoding="utf-8") as f:
+            json.dump(self._meta(), f)
+
+    def _open(self):
+        """Load an existing cache, or reset it if it belongs to another model"""
+        meta_path = self.path / self.META_FILE
+        index_path = self.path / self.INDEX_FILE
+        vectors_path = self.path / self.VECTORS_FILE
+        keys_path = self.path / self.KEYS_FILE
+
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta != self._meta():
+                print(f"⚠️ Embedding cache at {self.path} belongs to another model, resetting")
+                self.clear()
+                return
+        elif self.writable:
+            self._write_meta()
+
+        if not (index_path.exists() and vectors_path.exists()):
+            return
+        if not keys_path.exists():
+            # Written before slot keys existed: its index cannot be verified
+            print(f"⚠️ Embedding cache at {self.path} has no slot keys, resetting")
+            self.clear()
+            return
+
+        data = np.load(index_path)
+        self._keys = data["keys"].astype(np.uint8).reshape(-1, 32)
+        self._ticks = data["ticks"].astype(np.int64)
+        self._capacity = len(self._keys)
+        self._map(self._capacity)
+
+        # Slots reused after the index was saved no longer hold its vectors
+        stale = (self._ticks > 0) & np.any(self._slot_keys[:self._capacity] != self._keys, axis=1)
+        if stale.any():
+            print(f"⚠️ Embedding cache at {self.path}: dropping {int(stale.sum())} entries "
+                  f"overwritten since the last flush")
+            self._keys[stale] = 0
+            self._ticks[stale] = 0
+
+        for slot in range(self._capacity - 1, -1, -1):
+            if self._ticks[slot] > 0:
+                self._slots[self._keys[slot].tobytes()] = slot
+            else:
+                self._free.append(slot)
+        self._tick = int(self._ticks.max()) if len(self._ticks) else 0
+
+        # Respect a max_entries lowered since the cache was written
+        if len(self._slots) > self.max_entries:
+            self._evict(len(self._slots) - self.max_entries)
+
+    def _map(self, capacity: int):
+        """(Re)map the vectors and slot keys files to hold `capacity` slots"""
+        vectors_path = self.path / self.VECTORS_FILE
+        keys_path = self.path / self.KEYS_FILE
+
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._slot_keys.flush()
+            self._vectors = None
+            self._slot_keys = None
+
+        if self.writable:
+            # Files only grow, so a reader's smaller mapping stays valid
+            for path, size in ((vectors_path, capacity * self.dimension * self.dtype.itemsize),
+                               (keys_path, capacity * 32)):
+                if not path.exists() or path.stat().st_size < size:
+                    with open(path, "ab") as f:
+                        f.truncate(size)
+
+        if capacity:
+            mode = "r+" if self.writable else "r"
+            self._vectors = np.memmap(vectors_path, dtype=self.dtype, mode=mode,
+                                      shape=(capacity, self.dimension))
+            self._slot_keys = np.memmap(keys_path, dtype=np.uint8, mode=mode, shape=(capacity, 32))
+
+    def _reserve(self, count: int):
+        """Make sure `count` free slots are available"""
+        if count <= len(self._free):
+            return
+
+        # Grow geometrically up to max_entries, then evict
+        needed = count - len(self._free)
+        target = min(self.max_entries, max(self._capacity * 2, self._capacity + needed, 1024))
+        if target > self._capacity:
+            grow = target - self._capacity
+            self._keys = np.concatenate([self._keys, np.zeros((grow, 32), dtype=np.uint8)])
+            self._ticks = np.concatenate([self._ticks, np.zeros(grow, dtype=np.int64)])
+            self._free.extend(range(self._capacity + grow - 1, self._capacity - 1, -1))
+            self._capacity = target
+            self._map(target)
+
+        if count > len(self._free):
+            # Evict a little more than needed so eviction isn't paid per batch
+            self._evict(min(len(self._slots), count - len(self._free) + self.max_entries // 10))
+
+        if count > len(self._free):
+            raise ValueError(f"Cannot cache {count} embeddings with max_entries={self.max_entries}")
+
+    def _evict(self, count: int):
+        """Evict the `count` least recently used entries"""
+        if count <= 0:
+            return
+        occupied = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        oldest = occupied[np.argsort(self._ticks[occupied], kind="stable")[:count]]
+
+        for slot in oldest.tolist():
+            del self._slots[self._keys[slot].tobytes()]
+            self._keys[slot] = 0
+            self._ticks[slot] = 0
+            self._free.append(slot)
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU cache of query embeddings keyed by normalised query text
+
+    Keys go through normalize_query(), so repeats that only differ in
+    whitespace, case, Arabic diacritics/tatweel or Unicode form share one
+    entry. If a path is given the cache is loaded from and saved to a
+    single .npz file.
+    """
+
+    def __init__(self, model_name: str, capacity: int = 1024, path: Optional[str] = None):
+        """
+        Args:
+            model_name: Embedding model the vectors belong to
+            capacity: Maximum number of cached queries
+            path: Optional .npz file the cache is persisted to
+        """
+        self.model_name = model_name
+        self.capacity = capacity
+        self.path = Path(path) if path else None
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # normalised query -> float32 vector
+        self.changed = False            # entries added since the last save
+
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Cached embedding of a query, or None"""
+        key = normalize_query(query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, query: str, vector: np.ndarray):
+        """Cache the embedding of a query, evicting the least recently used"""
+        if self.capacity <= 0:
+            return
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = np.asarray(vector, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            self.changed = True
+
+    def save(self):
+        """Persist the cache (no-op without a path)"""
+        if self.path is None:
+            return
+        with self._lock:
+            self.changed = False
+            queries = list(self._entries)
+            vectors = np.stack(list(self._entries.values())) if queries else np.zeros((0, 0), np.float32)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "wb") as f:
+            np.savez(f, model_name=self.model_name, queries=np.array(queries, dtype=str), vectors=vectors)
+
+    def clear(self):
+        """Drop every cached query"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss statistics"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        data = np.load(self.path)
+        if str(data["model_name"]) != self.model_name:
+            print(f"⚠️ Query cache at {self.path} belongs to another model, ignoring it")
+            return
+        # Saved oldest first, so the most recent entries survive a smaller capacity
+        for query, vector in zip(data["queries"].tolist(), data["vectors"]):
+            self._entries[query] = vector
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
@@ -6,50 +6,432 @@ Generate embeddings using local HuggingFace models (FREE, no API limits)
 import warnings
 warnings.filterwarnings('ignore')
 
-from typing import List
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from src.config import config
+from src.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from src.text_utils import normalize_query
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def _backend_path(path: Optional[str], backend: str) -> Optional[str]:
+    """Keep caches of different backends apart, since their vectors differ slightly"""
+    if not path or backend == "torch":
+        return path
+    path = Path(path)
+    return str(path.with_name(f"{path.stem}_{backend}{path.suffix}"))
+
+
+def load_model(model_name: str, backend: str = "torch") -> SentenceTransformer:
+    """
+    Load a SentenceTransformer on the given backend
+
+    torch:     the model as published
+    onnx:      exported to ONNX once (under ONNX_EXPORT_DIR) and run with ONNX Runtime
+    onnx-int8: the ONNX export with dynamic int8 quantization (ONNX_QUANTIZATION)
+
+    The ONNX backends need the optional onnxruntime/optimum dependencies
+    (pip install "sentence-transformers[onnx]").
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported embedding backend: {backend} (expected one of {BACKENDS})")
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    export_dir = Path(config.ONNX_EXPORT_DIR) / model_name.replace("/", "__")
+    if not (export_dir / "onnx" / "model.onnx").exists():
+        print(f"📦 Exporting {model_name} to ONNX at {export_dir}")
+        SentenceTransformer(model_name, backend="onnx").save_pretrained(str(export_dir))
+
+    if backend == "onnx":
+        return SentenceTransformer(str(export_dir), backend="onnx")
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    quantization = config.ONNX_QUANTIZATION
+    file_name = f"onnx/model_qint8_{quantization}.onnx"
+    if not (export_dir / file_name).exists():
+        print(f"📦 Quantizing ONNX model to int8 ({quantization})")
+        export_dynamic_quantized_onnx_model(
+            SentenceTransformer(str(export_dir), backend="onnx"), quantization, str(export_dir)
+        )
+    return SentenceTransformer(str(export_dir), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def token_budget_batches(lengths, token_budget: int,
+                         max_batch_size: int = config.EMBEDDING_MAX_BATCH) -> List[np.ndarray]:
+    """
+    Group text indices into batches of similar length
+
+    Texts are taken longest first, and a batch grows while its padded size
+    (longest length x batch size) stays within token_budget, so short texts
+    go in large batches and long ones in small batches with little padding.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(-lengths, kind="stable")
+
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, min(max_batch_size, token_budget // longest))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def token_lengths(model: SentenceTransformer, texts: List[str]) -> np.ndarray:
+    """Tokenized length of each text, as the model will truncate it"""
+    if not texts:
+        return np.zeros(0, dtype=np.int64)
+    encoded = model.tokenizer(
+        texts,
+        truncation=True,
+        max_length=model.max_seq_length,
+        return_attention_mask=False,
+        return_token_type_ids=False
+    )
+    return np.fromiter((len(ids) for ids in encoded["input_ids"]), dtype=np.int64, count=len(texts))
+
+
+def encode_by_token_budget(model: SentenceTransformer, texts: List[str], token_budget: int,
+                           max_batch_size: int = config.EMBEDDING_MAX_BATCH) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Encode texts in token-budget batches (see token_budget_batches)
+
+    Returns:
+        (float32 embeddings in input order, token lengths, padded tokens)
+    """
+    embeddings = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    lengths = token_lengths(model, texts)
+    padded_tokens = 0
+    for batch in token_budget_batches(lengths, token_budget, max_batch_size=max_batch_size):
+        embeddings[batch] = model.encode(
+            [texts[i] for i in batch],
+            batch_size=len(batch),
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        padded_tokens += int(lengths[batch[0]]) * len(batch)
+    return embeddings, lengths, padded_tokens
+
+
+def encode_batched(model: SentenceTransformer, texts: List[str],
+                   max_batch_size: int = config.EMBEDDING_MAX_BATCH) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Encode texts by token budget, or in fixed-size batches when
+    EMBEDDING_TOKEN_BUDGET is 0 (no tokenizing, so no token counts)
+
+    Returns:
+        (float32 embeddings in input order, token lengths, padded tokens)
+    """
+    if config.EMBEDDING_TOKEN_BUDGET > 0:
+        return encode_by_token_budget(model, texts, config.EMBEDDING_TOKEN_BUDGET, max_batch_size=max_batch_size)
+    embeddings = model.encode(
+        texts,
+        batch_size=min(max_batch_size, config.EMBEDDING_BATCH_SIZE),
+        show_progress_bar=False,
+        convert_to_numpy=True
+    )
+    return embeddings.astype(np.float32, copy=False), np.zeros(0, dtype=np.int64), 0
+
+
+# Model of an embedding worker process (see EmbeddingGenerator.start_pool)
+_worker_model = None
+
+
+def _init_worker(model_name: str, backend: str, threads: int):
+    """Pin the worker's thread count, then load its copy of the model"""
+    global _worker_model
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    _worker_model = load_model(model_name, backend)
+
+
+def _encode_shard(texts: List[str]) -> Tuple[np.ndarray, int, float, np.ndarray, int]:
+    """Encode one shard in a worker process
+
+    Returns (embeddings, worker pid, seconds, token lengths, padded tokens).
+    """
+    start = time.perf_counter()
+    embeddings, lengths, padded_tokens = encode_batched(_worker_model, texts)
+    return embeddings, os.getpid(), time.perf_counter() - start, lengths, padded_tokens
+
 
 class EmbeddingGenerator:
     """Generate embeddings using HuggingFace models"""
-    
-    def __init__(self, model_name: str = "intfloat/multilingual-e5-large"):
+
+    def __init__(self, model_name: str = "intfloat/multilingual-e5-large",
+                 cache_path: Optional[str] = config.EMBEDDING_CACHE_PATH,
+                 query_cache_size: int = config.QUERY_CACHE_SIZE,
+                 query_cache_path: Optional[str] = config.QUERY_CACHE_PATH,
+                 backend: str = config.EMBEDDING_BACKEND):
         """Initialize embedding generator
-        used models but did not work: all-MiniLM-L6-v2, multilingual-e5-small, gemini embeding model.  
+        used models but did not work: all-MiniLM-L6-v2, multilingual-e5-small, gemini embeding model.
+
+        Args:
+            model_name: SentenceTransformer model to load
+            cache_path: Directory of the passage embedding cache (None disables it)
+            query_cache_size: Queries kept in the LRU query cache (0 disables it)
+            query_cache_path: File the query cache is persisted to (None keeps it in memory)
+            backend: One of BACKENDS (see load_model)
         """
-        print(f"📥 Loading model: {model_name}")
-        
-        self.model = SentenceTransformer(model_name)
+        print(f"📥 Loading model: {model_name} (backend: {backend})")
+
+        self.model_name = model_name
+        self.backend = backend
+        self.model = load_model(model_name, backend)
         self.dimension = self.model.get_sentence_embedding_dimension()
-        
+
+        self.cache = None
+        if cache_path:
+            self.cache = EmbeddingCache(
+                _backend_path(cache_path, backend),
+                model_name=model_name,
+                dimension=self.dimension,
+                max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+                dtype=config.EMBEDDING_CACHE_DTYPE
+            )
+
+        self.query_cache = QueryEmbeddingCache(
+            model_name, capacity=query_cache_size, path=_backend_path(query_cache_path, backend) or None
+        )
+
+        # Running encode timings, used to estimate time saved by the cache
+        self.encoded_texts = 0
+        self.encode_seconds = 0.0
+        self.encoded_tokens = 0
+        self.padded_tokens = 0
+
+        # Optional worker processes for bulk encoding (see start_pool)
+        self._pool = None
+        self.pool_workers = 0
+        self.worker_stats: Dict[int, Dict[str, float]] = {}
+
+        # One generator may be shared by several app sessions (threads); the
+        # fast tokenizer and the embedding cache aren't safe to use concurrently
+        self._encode_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
         print(f"✅ Model loaded (dimension: {self.dimension})")
-    
-    def generate_embedding(self, text: str) -> List[float]:
+
+    def generate_embedding(self, text: str, use_cache: bool = True) -> List[float]:
         """Generate embedding for a single text"""
-        text = "query: " + text
-        embedding = self.model.encode(text, convert_to_numpy=True)
+        embedding = self.query_cache.get(text) if use_cache else None
+        if embedding is None:
+            with self._encode_lock:
+                embedding = self.model.encode("query: " + text, convert_to_numpy=True)
+            if use_cache:
+                self.query_cache.put(text, embedding)
         return embedding.tolist()
-    
-    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+
+    def generate_query_embeddings(self, queries: List[str], batch_size: int = 32) -> np.ndarray:
+        """Generate embeddings for many queries at once
+
+        Applies the "query: " prefix and returns a float32 matrix that can
+        be passed straight to VectorStore.search_batch. Queries found in the
+        query cache skip the model.
+        """
+        embeddings = np.zeros((len(queries), self.dimension), dtype=np.float32)
+        missing = {}   # normalised query -> rows, so repeats in one batch encode once
+        for i, query in enumerate(queries):
+            cached = self.query_cache.get(query)
+            if cached is None:
+                missing.setdefault(normalize_query(query), []).append(i)
+            else:
+                embeddings[i] = cached
+
+        if missing:
+            to_encode = [queries[rows[0]] for rows in missing.values()]
+            with self._encode_lock:
+                encoded = self.model.encode(
+                    ["query: " + q for q in to_encode],
+                    batch_size=batch_size,
+                    convert_to_numpy=True
+                )
+            for query, rows, embedding in zip(to_encode, missing.values(), encoded):
+                embeddings[rows] = embedding
+                self.query_cache.put(query, embedding)
+        return embeddings
+
+    def generate_embeddings_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
         """Generate embeddings for multiple texts (batched for speed)"""
-        print(f"\n🔄 Generating embeddings for {len(texts)} texts...")
-        
-        embeddings = self.model.encode(
-            texts,
-            batch_size=batch_size,
-            show_progress_bar=True,
-            convert_to_numpy=True
+        return self._encode(texts, batch_size).tolist()
+
+    def start_pool(self, workers: int, threads_per_worker: Optional[int] = None):
+        """
+        Encode large inputs in worker processes, each with its own model copy
+
+        torch intra-op threading stops scaling after a handful of threads,
+        so on many-core machines several processes with a few pinned
+        threads each get more out of the CPU than one big encode call.
+        Inputs of fewer than EMBEDDING_POOL_MIN_TEXTS texts stay in-process.
+        Each worker holds a full copy of the model in memory.
+
+        Args:
+            workers: Worker processes (<= 1 disables the pool)
+            threads_per_worker: torch threads per worker (default: cores / workers)
+        """
+        self.stop_pool()
+        if workers <= 1:
+            return
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        print(f"⚡ Starting {workers} embedding workers ({threads} threads each)")
+        # spawn: forking a process that already initialised torch is unsafe
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.backend, threads)
         )
-        
-        print(f"✅ Generated {len(embeddings)} embeddings")
-        return embeddings.tolist()
-    
-    def embed_documents(self, chunks):
-        """Generate embeddings for document chunks"""
+        self.pool_workers = workers
+        self.worker_stats = {}
+
+    def stop_pool(self):
+        """Shut down the worker processes, if any"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self.pool_workers = 0
+
+    def pool_stats(self) -> Dict[int, dict]:
+        """Texts, seconds and texts/second per worker process"""
+        return {
+            pid: {**stats, "texts_per_second": stats["texts"] / stats["seconds"] if stats["seconds"] else 0.0}
+            for pid, stats in self.worker_stats.items()
+        }
+
+    def _encode(self, texts: List[str], batch_size: Optional[int] = None, verbose: bool = True) -> np.ndarray:
+        """Encode texts into a float32 matrix, recording throughput
+
+        With EMBEDDING_TOKEN_BUDGET set, texts are batched by token budget
+        (see token_budget_batches); otherwise in fixed batches of
+        EMBEDDING_BATCH_SIZE. batch_size, when given, caps the texts per batch.
+        Large inputs go to the worker pool when one is running.
+        """
+        if verbose:
+            print(f"\n🔄 Generating embeddings for {len(texts)} texts...")
+
+        if self._pool is not None and len(texts) >= config.EMBEDDING_POOL_MIN_TEXTS:
+            return self._encode_in_pool(texts, verbose)
+
+        with self._encode_lock:
+            start = time.perf_counter()
+            embeddings, lengths, padded_tokens = encode_batched(
+                self.model, texts, max_batch_size=batch_size or config.EMBEDDING_MAX_BATCH
+            )
+            self.encode_seconds += time.perf_counter() - start
+            self.encoded_texts += len(texts)
+            self.encoded_tokens += int(lengths.sum())
+            self.padded_tokens += padded_tokens
+
+        if verbose:
+            print(f"✅ Generated {len(embeddings)} embeddings")
+        return embeddings
+
+    def _encode_in_pool(self, texts: List[str], verbose: bool = True) -> np.ndarray:
+        """Shard texts across the worker pool and collect the results in order"""
+        shard_size = max(1, min(config.EMBEDDING_POOL_SHARD, -(-len(texts) // self.pool_workers)))
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        start = time.perf_counter()
+        offset = 0
+        for encoded, pid, seconds, lengths, padded_tokens in self._pool.map(_encode_shard, shards):
+            embeddings[offset:offset + len(encoded)] = encoded
+            offset += len(encoded)
+            worker = self.worker_stats.setdefault(pid, {"texts": 0, "seconds": 0.0})
+            worker["texts"] += len(encoded)
+            worker["seconds"] += seconds
+            self.encoded_tokens += int(lengths.sum())
+            self.padded_tokens += padded_tokens
+        self.encode_seconds += time.perf_counter() - start
+        self.encoded_texts += len(texts)
+
+        if verbose:
+            print(f"✅ Generated {len(embeddings)} embeddings in {len(shards)} shards")
+        return embeddings
+
+    def embed_documents(self, chunks, verbose: bool = True, flush_cache: bool = True):
+        """Generate embeddings for document chunks
+
+        Args:
+            chunks: Documents to embed
+            verbose: Print progress
+            flush_cache: Persist the embedding cache after encoding; streaming
+                callers pass False and call flush_cache() once at the end
+
+        Returns:
+            (texts, embeddings, metadatas) with embeddings as a float32 matrix
+        """
         texts = [chunk.page_content for chunk in chunks]
         metadatas = [chunk.metadata for chunk in chunks]
+        return texts, self.embed_passages(texts, verbose, flush_cache), metadatas
+
+    def embed_passages(self, texts: List[str], verbose: bool = True, flush_cache: bool = True) -> np.ndarray:
+        """Embed passage texts as a float32 matrix, through the embedding cache"""
+        prefix = "passage: "
+        if self.cache is None:
+            return self._encode([prefix + t for t in texts], verbose=verbose)
+
+        # Only encode chunks whose (model, prefix, text) isn't cached yet
+        with self._cache_lock:
+            embeddings, missing = self.cache.get_many(texts, prefix=prefix)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = self._encode([prefix + t for t in missing_texts], verbose=verbose)
+            embeddings[missing] = encoded
+            with self._cache_lock:
+                self.cache.put_many(missing_texts, encoded, prefix=prefix)
+                if flush_cache:
+                    self.cache.flush()
+
+        if verbose:
+            print(f"💾 Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        return embeddings
+
+    def flush_cache(self):
+        """Persist the embedding and query caches to disk"""
+        if self.cache is not None:
+            with self._cache_lock:
+                self.cache.flush()
+        self.query_cache.save()
+
+    def autosave_query_cache(self, interval_seconds: float = config.QUERY_CACHE_SAVE_SECONDS):
+        """Save the query cache every interval_seconds when it changed (daemon thread)
+
+        For long-running processes such as the app, where nothing else
+        flushes the caches before shutdown.
+        """
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                if self.query_cache.changed:
+                    self.query_cache.save()
+
+        threading.Thread(target=run, name="query-cache-autosave", daemon=True).start()
+
+    def cache_stats(self) -> dict:
+        """Return embedding cache statistics, including estimated time saved"""
+        if self.cache is None:
+            return {}
+
+        stats = self.cache.stats()
+        seconds_per_text = self.encode_seconds / self.encoded_texts if self.encoded_texts else 0.0
+        stats["estimated_seconds_saved"] = stats["hits"] * seconds_per_text
+        return stats
 
-        prefixed_texts = ["passage: " + t for t in texts]
-        embeddings = self.generate_embeddings_batch(prefixed_texts)
-        
-        return texts, embeddings, metadatas
\ No newline at end of file
+    def query_cache_stats(self) -> dict:
+        """Return query cache hit/miss statistics"""
+        return self.query_cache.stats()
@@ -6,18 +6,70 @@ Generate answers using Google Gemini based on retrieved context
 import warnings
 warnings.filterwarnings('ignore')
 
+import asyncio
+import random
+import weakref
+
 from google import genai
+from google.genai import types
+from src.answer_cache import AnswerCache
 from src.config import config
-from typing import List, Dict, Generator as Gen
+from src.context_packer import ContextPacker
+from typing import AsyncIterator, List, Dict, Optional, Tuple, Generator as Gen
+
+# Rate limiting and transient server errors are retried with backoff
+RETRYABLE_CODES = (429, 500, 503)
+NOT_FOUND_MESSAGE = "⚠️ I cannot find relevant information about this question in the provided documents. The available documents may not cover this topic."
+
+
+def is_retryable(error: Exception) -> bool:
+    return getattr(error, "code", None) in RETRYABLE_CODES
 
 
 class ResponseGenerator:
-    """Generate responses using Google Gemini"""
+    """Generate responses using Google Gemini
+
+    Besides the blocking generate/generate_stream there are async
+    counterparts on the SDK's async client (client.aio). They share one
+    client, run at most max_concurrency requests at a time, give every
+    attempt a deadline and retry rate-limit/server errors with exponential
+    backoff. Pass a client to run against a fake instead of the API.
+
+    With an AnswerCache, callers that pass query_embedding and
+    index_version get a previous answer back for a near-identical question
+    over the same retrieved chunks, without calling the LLM.
+    """
     
-    def __init__(self):
-        """Initialize generator"""
-        self.client = genai.Client(api_key=config.GOOGLE_API_KEY)
+    def __init__(self, client=None,
+                 max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+                 timeout: float = config.LLM_TIMEOUT_SECONDS,
+                 max_retries: int = config.LLM_MAX_RETRIES,
+                 backoff: float = config.LLM_BACKOFF_SECONDS,
+                 answer_cache: Optional[AnswerCache] = None,
+                 packer: Optional[ContextPacker] = None):
+        """Initialize generator
+        
+        Args:
+            client: genai.Client-compatible client (defaults to a real one)
+            max_concurrency: Async requests in flight at once
+            timeout: Deadline in seconds for each request attempt
+            max_retries: Retries of rate-limited / failed requests
+            backoff: First retry delay in seconds, doubled on each retry
+            answer_cache: Optional cache of previous answers
+            packer: Context packer for prompts (defaults to a ContextPacker)
+        """
+        self.client = client or genai.Client(
+            api_key=config.GOOGLE_API_KEY,
+            http_options=types.HttpOptions(timeout=int(timeout * 1000))
+        )
         self.model = config.LLM_MODEL
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.answer_cache = answer_cache
+        self.packer = packer or ContextPacker()
+        self._semaphores = weakref.WeakKeyDictionary()   # event loop -> semaphore
         print(f"✅ Generator model: {self.model}")
     
     def check_relevance(self, context_chunks: List[Dict], threshold: float = 0.5) -> bool:
@@ -34,13 +86,17 @@ class ResponseGenerator:
         if not context_chunks:
             return False
         
-        # Check if best result is below threshold
-        best_distance = context_chunks[0].get('distance', 1.0)
+        # Gate on the closest chunk in any position: hybrid (RRF) and
+        # reranked results are not ordered by vector distance
+        best_distance = min(chunk.get('distance', 1.0) for chunk in context_chunks)
         
         return best_distance < threshold
 
     def create_prompt(self, query: str, context_chunks: List[Dict], chat_history: List[Dict] = None) -> str:
         """Create prompt with context and chat history"""
+        # Merge overlapping chunks and fit them into the token budget
+        context_chunks = self.packer.pack(context_chunks)
+        
         # Build context from chunks
         context_parts = []
         for i, chunk in enumerate(context_chunks, 1):
@@ -56,9 +112,10 @@ class ResponseGenerator:
         
         # Build conversation history
         history_text = ""
+        chat_history = self.packer.pack_history(chat_history)
         if chat_history and len(chat_history) > 0:
             history_text = "Previous conversation:\n"
-            for msg in chat_history[-6:]:  # Last 3 exchanges (6 messages)
+            for msg in chat_history:  # Last 3 exchanges (6 messages), within the history budget
                 role = "User" if msg["role"] == "user" else "Assistant"
                 content = msg["content"]
                 history_text += f"{role}: {content}\n"
@@ -89,11 +146,24 @@ Answer:"""
         
         return prompt
     
-    def generate(self, query: str, context_chunks: List[Dict], chat_history: List[Dict] = None) -> str:
+    def _cached_answer(self, context_chunks: List[Dict], chat_history: Optional[List[Dict]],
+                       query_embedding, index_version: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """(cached answer, cache key); the key is None when caching doesn't apply"""
+        if self.answer_cache is None or query_embedding is None or index_version is None:
+            return None, None
+        key = AnswerCache.context_key(context_chunks, chat_history)
+        return self.answer_cache.get(query_embedding, key, index_version), key
+
+    def generate(self, query: str, context_chunks: List[Dict], chat_history: List[Dict] = None,
+                 query_embedding=None, index_version: Optional[str] = None) -> str:
         """Generate non-streaming response"""
 
         if not self.check_relevance(context_chunks, threshold=0.6):
-            return "⚠️ I cannot find relevant information about this question in the provided documents. The available documents may not cover this topic."
+            return NOT_FOUND_MESSAGE
+
+        cached, cache_key = self._cached_answer(context_chunks, chat_history, query_embedding, index_version)
+        if cached is not None:
+            return cached
 
         prompt = self.create_prompt(query, context_chunks, chat_history)
         
@@ -102,15 +172,23 @@ Answer:"""
             contents=prompt
         )
         
+        if cache_key is not None:
+            self.answer_cache.put(query_embedding, cache_key, index_version, response.text)
         return response.text
     
-    def generate_stream(self, query: str, context_chunks: List[Dict], chat_history: List[Dict] = None) -> Gen[str, None, None]:
+    def generate_stream(self, query: str, context_chunks: List[Dict], chat_history: List[Dict] = None,
+                        query_embedding=None, index_version: Optional[str] = None) -> Gen[str, None, None]:
         """Generate streaming response"""
         
         if not self.check_relevance(context_chunks, threshold=0.39):
             yield "⚠️ I cannot find relevant information..."
             return
 
+        cached, cache_key = self._cached_answer(context_chunks, chat_history, query_embedding, index_version)
+        if cached is not None:
+            yield from AnswerCache.replay(cached)
+            return
+
         prompt = self.create_prompt(query, context_chunks, chat_history)
         
         response = self.client.models.generate_content_stream(
@@ -118,6 +196,119 @@ Answer:"""
             contents=prompt
         )
         
+        parts = []
         for chunk in response:
             if chunk.text:
-                yield chunk.text
\ No newline at end of file
+                parts.append(chunk.text)
+                yield chunk.text
+
+        # Only complete answers are cached
+        if cache_key is not None:
+            self.answer_cache.put(query_embedding, cache_key, index_version, "".join(parts))
+
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limit of the running event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _backoff(self, attempt: int, error: Exception):
+        delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+        print(f"⏳ Gemini error {getattr(error, 'code', '')}, retrying in {delay:.1f}s "
+              f"({attempt + 1}/{self.max_retries})")
+        await asyncio.sleep(delay)
+
+    async def agenerate(self, query: str, context_chunks: List[Dict], chat_history: List[Dict] = None,
+                        query_embedding=None, index_version: Optional[str] = None) -> str:
+        """Async generate(): bounded concurrency, per-attempt deadline, retries"""
+        if not self.check_relevance(context_chunks, threshold=0.6):
+            return NOT_FOUND_MESSAGE
+
+        cached, cache_key = self._cached_answer(context_chunks, chat_history, query_embedding, index_version)
+        if cached is not None:
+            return cached
+
+        prompt = self.create_prompt(query, context_chunks, chat_history)
+
+        async with self._semaphore():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(model=self.model, contents=prompt),
+                        timeout=self.timeout
+                    )
+                    if cache_key is not None:
+                        self.answer_cache.put(query_embedding, cache_key, index_version, response.text)
+                    return response.text
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    await self._backoff(attempt, e)
+
+    async def agenerate_stream(self, query: str, context_chunks: List[Dict],
+                               chat_history: List[Dict] = None,
+                               query_embedding=None, index_version: Optional[str] = None) -> AsyncIterator[str]:
+        """Async generate_stream()
+
+        The deadline applies to each wait for the next chunk. A failed
+        stream is only retried if nothing was yielded yet.
+        """
+        if not self.check_relevance(context_chunks, threshold=0.39):
+            yield "⚠️ I cannot find relevant information..."
+            return
+
+        cached, cache_key = self._cached_answer(context_chunks, chat_history, query_embedding, index_version)
+        if cached is not None:
+            for piece in AnswerCache.replay(cached):
+                yield piece
+            return
+
+        prompt = self.create_prompt(query, context_chunks, chat_history)
+
+        async with self._semaphore():
+            for attempt in range(self.max_retries + 1):
+                yielded = False
+                parts = []
+                try:
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content_stream(model=self.model, contents=prompt),
+                        timeout=self.timeout
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                        except StopAsyncIteration:
+                            # Only complete answers are cached
+                            if cache_key is not None:
+                                self.answer_cache.put(query_embedding, cache_key, index_version, "".join(parts))
+                            return
+                        if chunk.text:
+                            yielded = True
+                            parts.append(chunk.text)
+                            yield chunk.text
+                except Exception as e:
+                    if yielded or attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    await self._backoff(attempt, e)
+
+    async def abatch_generate(self, queries: List[str], contexts: List[List[Dict]],
+                              return_exceptions: bool = True) -> List[str]:
+        """Answer many questions concurrently (at most max_concurrency at a time)
+
+        Answers come back in input order; with return_exceptions a failed
+        question yields its exception instead of cancelling the batch.
+        """
+        tasks = [self.agenerate(query, chunks) for query, chunks in zip(queries, contexts)]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    def batch_generate(self, queries: List[str], contexts: List[List[Dict]],
+                       return_exceptions: bool = True) -> List[str]:
+        """Blocking wrapper around abatch_generate for scripts"""
+        return asyncio.run(self.abatch_generate(queries, contexts, return_exceptions))
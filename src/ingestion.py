@@ -0,0 +1,277 @@
+"""
+Ingestion Pipeline Module
+Streaming extract → chunk → embed → index pipeline with bounded memory
+"""
+
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import config
+from src.deduplication import embedding_duplicates
+
+_DONE = object()
+
+
+class IngestionPipeline:
+    """Stream chunks from a DocumentProcessor through an EmbeddingGenerator into a VectorStore
+
+    Documents are parsed in a producer thread and handed to the consumer in
+    fixed-size chunk batches through a bounded queue, so PDF extraction
+    overlaps with model inference and at most queue_batches + 1 batches are
+    in memory at once. Embeddings go straight from the model into the index
+    as float32 matrices.
+
+    With a ChunkDeduplicator, chunks repeating one already stored or seen
+    earlier in the run are not embedded; they are recorded as back-references
+    on the kept chunk (VectorStore.add_duplicates).
+    """
+
+    def __init__(self, processor, embedder, vector_store,
+                 batch_size: int = config.INGEST_BATCH_SIZE,
+                 queue_batches: int = config.INGEST_QUEUE_BATCHES,
+                 deduplicator=None,
+                 embedding_threshold: float = config.DEDUP_EMBEDDING_THRESHOLD):
+        """
+        Args:
+            processor: DocumentProcessor producing chunks
+            embedder: EmbeddingGenerator encoding chunk batches
+            vector_store: VectorStore receiving the embeddings
+            batch_size: Chunks per embedding batch
+            queue_batches: Batches the producer may run ahead of the consumer
+            deduplicator: ChunkDeduplicator, or None to keep every chunk
+            embedding_threshold: Cosine similarity above which chunks of the
+                same batch are also duplicates (0 = off; needs a deduplicator)
+        """
+        self.processor = processor
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.queue_batches = queue_batches
+        self.deduplicator = deduplicator
+        self.embedding_threshold = embedding_threshold
+
+    def _register_stored(self, chunk_ids: np.ndarray) -> int:
+        """Register chunks already in the store with the deduplicator"""
+        rows = self.vector_store._rows_for_ids(chunk_ids)
+        for chunk_id, row in zip(chunk_ids.tolist(), rows.tolist()):
+            if row >= 0:
+                self.deduplicator.register(self.vector_store._text(row), key=chunk_id)
+        return int(np.sum(rows >= 0))
+
+    def _seed_deduplicator(self, skip_sources: set):
+        """Register the stored chunks of sources this run leaves alone
+
+        Chunks of replaced sources are registered only if other sources
+        repeat them, since those survive the replacement. Saved rows are
+        seeded from the store's MinHash columns when it has them; only
+        rows added since the last save are hashed from their text.
+        """
+        ids = self.vector_store.live_ids()
+        keep = np.array([name not in skip_sources for name in self.vector_store.source_files_of(ids)], dtype=bool)
+        keep |= np.isin(ids, np.fromiter(self.vector_store.duplicates, dtype=np.int64))
+        ids = ids[keep]
+
+        seeded = 0
+        stored = self.vector_store.stored_minhashes(self.deduplicator.params())
+        if stored is not None:
+            minhashes, stored_ids = stored
+            eligible = np.isin(stored_ids, ids)
+            self.deduplicator.seed_stored(minhashes, stored_ids, eligible)
+            seeded = int(eligible.sum())
+            ids = ids[~np.isin(ids, stored_ids)]
+        seeded += self._register_stored(ids)
+        if seeded:
+            print(f"🧬 Deduplicating against {seeded} stored chunks")
+
+    def _deduplicate(self, chunks: list, stats: dict) -> Tuple[list, List[int], Dict[int, List[dict]]]:
+        """
+        Split a batch into chunks to keep and back-references
+
+        Returns:
+            (kept chunks, their deduplicator handles,
+             handle of a kept chunk -> metadata of the chunks dropped for it)
+        """
+        kept, handles, refs = [], [], {}
+        for chunk in chunks:
+            handle, kind, signature = self.deduplicator.find(chunk.page_content)
+            if handle is None:
+                handles.append(self.deduplicator.register(chunk.page_content, signature))
+                kept.append(chunk)
+            else:
+                stats[f'duplicates_{kind}'] += 1
+                refs.setdefault(handle, []).append(dict(chunk.metadata))
+        return kept, handles, refs
+
+    def run(self, file_paths: List[str], content_hashes: Optional[Dict[str, str]] = None,
+            workers: Optional[int] = None,
+            progress: Optional[Callable[[str, dict], None]] = None) -> dict:
+        """
+        Ingest files, replacing any chunks previously stored for the same source files
+
+        Args:
+            file_paths: Files to ingest
+            content_hashes: Content hash per file path, recorded in the store manifest
+            workers: Extraction processes (defaults to the processor's setting)
+            progress: Called with the current stage ("extracting", "embedding"
+                or "indexing") and a copy of the stats whenever it changes
+
+        Returns:
+            Dictionary of chunk counts and per-stage timings
+        """
+        content_hashes = content_hashes or {}
+        batches = queue.Queue(maxsize=self.queue_batches)
+        stop = threading.Event()
+        stats = {
+            'files': len(file_paths),
+            'chunks': 0,
+            'extract_seconds': 0.0,
+            'embed_seconds': 0.0,
+            'index_seconds': 0.0,
+            'duplicates_exact': 0,
+            'duplicates_near': 0,
+            'duplicates_embedding': 0,
+        }
+        started = set()
+        previous = {}   # source file -> (chunk IDs, detached back-references) of its stored version
+
+        def report(stage: str):
+            if progress is not None:
+                progress(stage, {**stats, 'files_started': len(started)})
+
+        if self.deduplicator is not None:
+            self._seed_deduplicator({Path(file_path).name for file_path in file_paths})
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def produce():
+            try:
+                chunks = self.processor.iter_chunks(file_paths, workers=workers, content_hashes=content_hashes)
+                batch = []
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    chunk = next(chunks, None)
+                    stats['extract_seconds'] += time.perf_counter() - start
+                    if chunk is None:
+                        break
+                    batch.append(chunk)
+                    if len(batch) >= self.batch_size:
+                        put(batch)
+                        batch = []
+                if batch:
+                    put(batch)
+                put(_DONE)
+            except BaseException as e:
+                put(e)
+
+        print(f"\n🚚 Streaming {len(file_paths)} file(s) in batches of {self.batch_size}")
+        wall_start = time.perf_counter()
+        producer = threading.Thread(target=produce, name="ingestion-producer", daemon=True)
+        producer.start()
+
+        report("extracting")
+        try:
+            while True:
+                item = batches.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+
+                # The previous version of a source is removed once the whole
+                # file made it in; until then only its back-references are set aside
+                for chunk in item:
+                    source_file = chunk.metadata.get('source_file')
+                    if source_file not in started:
+                        started.add(source_file)
+                        previous[source_file] = (self.vector_store.source_ids(source_file),
+                                                 self.vector_store.detach_duplicates(source_file))
+
+                chunks, handles, refs = item, [], {}
+                if self.deduplicator is not None:
+                    chunks, handles, refs = self._deduplicate(item, stats)
+
+                texts, embeddings, metadatas = [], np.zeros((0, self.vector_store.dimension), 'float32'), []
+                if chunks:
+                    report("embedding")
+                    start = time.perf_counter()
+                    texts, embeddings, metadatas = self.embedder.embed_documents(
+                        chunks, verbose=False, flush_cache=False
+                    )
+                    stats['embed_seconds'] += time.perf_counter() - start
+
+                if handles and self.embedding_threshold > 0:
+                    # Drop chunks whose embedding repeats an earlier one of the batch
+                    duplicates = embedding_duplicates(embeddings, self.embedding_threshold)
+                    for row, earlier in duplicates.items():
+                        self.deduplicator.alias(handles[row], handles[earlier])
+                        refs.setdefault(handles[earlier], []).append(dict(metadatas[row]))
+                        refs[handles[earlier]].extend(refs.pop(handles[row], []))
+                    keep = [row for row in range(len(texts)) if row not in duplicates]
+                    texts = [texts[row] for row in keep]
+                    embeddings = np.asarray(embeddings)[keep]
+                    metadatas = [metadatas[row] for row in keep]
+                    handles = [handles[row] for row in keep]
+                    stats['duplicates_embedding'] += len(duplicates)
+
+                report("indexing")
+                start = time.perf_counter()
+                ids = self.vector_store.add_documents(texts, embeddings, metadatas, verbose=False) if texts else []
+                for handle, chunk_id in zip(handles, ids):
+                    self.deduplicator.set_key(handle, chunk_id)
+                for handle, chunk_refs in refs.items():
+                    self.vector_store.add_duplicates(self.deduplicator.key(handle), chunk_refs)
+                stats['index_seconds'] += time.perf_counter() - start
+
+                stats['chunks'] += len(texts)
+                print(f"   🔄 {stats['chunks']} chunks indexed")
+                report("extracting")
+        finally:
+            stop.set()
+            producer.join()
+            self.embedder.flush_cache()
+
+        # Failed files keep their previous version: drop their partial output first
+        failed = set(self.processor.failed_files)
+        for file_path in file_paths:
+            source_file = Path(file_path).name
+            if file_path in failed and source_file in started:
+                print(f"⚠️ Discarding partial chunks of {source_file}, keeping its previous version")
+                old_ids, old_refs = previous[source_file]
+                self.vector_store.detach_duplicates(source_file)
+                new_ids = self.vector_store.source_ids(source_file)
+                self.vector_store.remove_chunks(new_ids[~np.isin(new_ids, old_ids)])
+                self.vector_store.attach_duplicates(old_refs)
+
+        # Then replace the previous version of the rest and record them in the manifest
+        for file_path in file_paths:
+            source_file = Path(file_path).name
+            if file_path in failed:
+                continue
+            if source_file in started:
+                removed = self.vector_store.remove_chunks(previous[source_file][0])
+                if removed:
+                    print(f"🗑️ Replaced {removed} chunks of {source_file}")
+            else:
+                self.vector_store.remove_source(source_file)
+            if file_path in content_hashes:
+                self.vector_store.record_source(source_file, content_hashes[file_path])
+
+        stats['failed_files'] = len(failed)
+        stats['wall_seconds'] = time.perf_counter() - wall_start
+        stats['duplicates'] = stats['duplicates_exact'] + stats['duplicates_near'] + stats['duplicates_embedding']
+
+        print(f"✅ Ingested {stats['chunks']} chunks in {stats['wall_seconds']:.1f}s "
+              f"(extract {stats['extract_seconds']:.1f}s, embed {stats['embed_seconds']:.1f}s, "
+              f"index {stats['index_seconds']:.1f}s)")
+        return stats
@@ -0,0 +1,209 @@
+"""
+Ingestion Jobs Module
+Background ingestion of uploaded files into the on-disk vector store
+"""
+
+import hashlib
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config import config
+from src.deduplication import ChunkDeduplicator
+from src.document_processor import DocumentProcessor
+from src.ingestion import IngestionPipeline
+from src.vector_store import VectorStore
+
+
+class IngestionJob:
+    """One batch of uploaded files, updated by the worker and read by the UI
+
+    status is "queued", "running", "done" or "failed"; stage is the step a
+    running job is in: "checking", "extracting", "embedding", "indexing"
+    or "publishing".
+    """
+
+    def __init__(self, file_paths: List[str], content_hashes: Dict[str, str]):
+        self.id = uuid.uuid4().hex[:8]
+        self.file_paths = file_paths
+        self.content_hashes = content_hashes   # file path -> SHA-256 of its contents
+        self.status = "queued"
+        self.stage = "queued"
+        self.stats = {}
+        self.skipped: List[str] = []           # files whose content is already in the store
+        self.error: Optional[str] = None
+        self.published = False                 # saved a new store version
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def file_names(self) -> List[str]:
+        return [Path(file_path).name for file_path in self.file_paths]
+
+    def update(self, stage: str, stats: dict):
+        """Progress callback for IngestionPipeline.run"""
+        self.stage = stage
+        self.stats = stats
+
+    def describe(self) -> str:
+        """One-line status for display"""
+        if self.status == "queued":
+            return f"⏳ Queued: {len(self.file_paths)} file(s)"
+        if self.status == "failed":
+            return f"❌ Failed: {self.error}"
+        if self.status == "done":
+            added = self.stats.get('chunks', 0)
+            skipped = f", {len(self.skipped)} already stored" if self.skipped else ""
+            return f"✅ Added {added} chunks from {len(self.file_paths) - len(self.skipped)} file(s){skipped}"
+        files = f"{self.stats.get('files_started', 0)}/{len(self.file_paths) - len(self.skipped)} files"
+        return f"🔄 {self.stage.capitalize()}: {files}, {self.stats.get('chunks', 0)} chunks indexed"
+
+
+class IngestionJobQueue:
+    """Ingest uploads on a background thread, one job at a time
+
+    Each job reads the store from disk, appends its files with an
+    IngestionPipeline (files already stored with the same content are
+    skipped) and saves it. VectorStore.save() writes a new directory and
+    swaps it in, so sessions keep searching the previous version until
+    on_publish() tells them to reopen the store.
+    """
+
+    def __init__(self, store_path: str, embedder, on_publish: Optional[Callable[[], None]] = None,
+                 dimension: int = config.EMBEDDING_DIMENSION,
+                 upload_dir: str = config.UPLOAD_DIR,
+                 history: int = config.INGEST_JOB_HISTORY):
+        """
+        Args:
+            store_path: Vector store directory jobs append to
+            embedder: EmbeddingGenerator shared with query embedding
+            on_publish: Called after a job saved a new store version
+            dimension: Embedding dimension, for a store created from scratch
+            upload_dir: Where uploaded files are written
+            history: Finished jobs kept for display
+        """
+        self.store_path = Path(store_path)
+        self.embedder = embedder
+        self.on_publish = on_publish
+        self.dimension = dimension
+        self.upload_dir = Path(upload_dir)
+        self.history = history
+
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._pending_hashes: Dict[str, str] = {}   # content hash -> ID of the queued/running job
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="ingestion-jobs", daemon=True)
+        self._worker.start()
+
+    def submit(self, files: List[Tuple[str, bytes]]) -> Optional[IngestionJob]:
+        """
+        Queue uploaded files, given as (file name, contents)
+
+        Files with the same contents as one in this upload or in a job not
+        yet finished are dropped. Returns None when nothing is left to do.
+        """
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        file_paths, content_hashes = [], {}
+        with self._lock:
+            for name, data in files:
+                content_hash = hashlib.sha256(data).hexdigest()
+                if content_hash in self._pending_hashes or content_hash in content_hashes.values():
+                    print(f"⏭️ Already queued: {name}")
+                    continue
+                # One directory per content, so a queued job's file is never overwritten
+                file_dir = self.upload_dir / content_hash[:16]
+                file_dir.mkdir(exist_ok=True)
+                file_path = str(file_dir / Path(name).name)
+                with open(file_path, "wb") as f:
+                    f.write(data)
+                file_paths.append(file_path)
+                content_hashes[file_path] = content_hash
+            if not file_paths:
+                return None
+
+            job = IngestionJob(file_paths, content_hashes)
+            for content_hash in content_hashes.values():
+                self._pending_hashes[content_hash] = job.id
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        print(f"📥 Queued ingestion job {job.id}: {', '.join(job.file_names)}")
+        return job
+
+    def jobs(self) -> List[IngestionJob]:
+        """Queued, running and recently finished jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active(self) -> bool:
+        return any(job.active for job in self.jobs())
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.status = "running"
+            try:
+                self._process(job)
+                job.status = "done"
+            except Exception as e:
+                traceback.print_exc()
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self._finish(job)
+
+    def _finish(self, job: IngestionJob):
+        """Release a job's content hashes and trim the finished history"""
+        with self._lock:
+            for content_hash in job.content_hashes.values():
+                if self._pending_hashes.get(content_hash) == job.id:
+                    del self._pending_hashes[content_hash]
+            finished = [job_id for job_id, j in self._jobs.items() if not j.active]
+            for job_id in finished[:max(0, len(finished) - self.history)]:
+                del self._jobs[job_id]
+
+    def _load_store(self) -> VectorStore:
+        """A writable copy of the current store (a new, empty one if none was saved)"""
+        store = VectorStore(dimension=self.dimension)
+        if VectorStore.exists(str(self.store_path)):
+            store.load(str(self.store_path))
+        return store
+
+    def _process(self, job: IngestionJob):
+        job.stage = "checking"
+        store = self._load_store()
+
+        # Skip files whose content is already stored, under this or another name
+        stored_hashes = {entry['content_hash'] for entry in store.manifest.values()}
+        changed = {}
+        for file_path, content_hash in job.content_hashes.items():
+            if content_hash in stored_hashes:
+                job.skipped.append(Path(file_path).name)
+            else:
+                changed[file_path] = content_hash
+        if not changed:
+            print(f"⏭️ Job {job.id}: every file is already in the store")
+            return
+
+        deduplicator = ChunkDeduplicator() if config.DEDUP else None
+        pipeline = IngestionPipeline(DocumentProcessor(), self.embedder, store, deduplicator=deduplicator)
+        stats = pipeline.run(list(changed), content_hashes=changed, progress=job.update)
+        job.stats = stats
+        if stats['failed_files'] == len(changed):
+            raise RuntimeError("no file could be extracted")
+
+        job.stage = "publishing"
+        store.save(str(self.store_path))
+        job.published = True
+        if self.on_publish is not None:
+            self.on_publish()
@@ -0,0 +1,294 @@
+"""
+Lexical Index Module
+BM25 inverted index with Arabic-aware tokenisation
+"""
+
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import config
+from src.text_utils import normalize_for_matching
+
+TOKEN = re.compile(r"\w+")
+ARABIC_LETTERS = re.compile("[\u0621-\u064A]")
+
+# Light stemming in the style of Larkey et al.'s light10 (after letter folding)
+ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+ARABIC_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+
+
+def light_stem(token: str) -> str:
+    """Strip common Arabic prefixes/suffixes, keeping at least two letters"""
+    if not ARABIC_LETTERS.match(token):
+        return token
+    if len(token) > 3 and token.startswith("و"):
+        token = token[1:]
+    for prefix in ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            token = token[len(prefix):]
+            break
+    for suffix in ARABIC_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            token = token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalised, lightly stemmed word tokens of a text"""
+    return [light_stem(token) for token in TOKEN.findall(normalize_for_matching(text))]
+
+
+class LexicalIndex:
+    """
+    BM25 index over chunk texts, keyed by chunk ID
+
+    Postings are stored CSR-style: a sorted term table (UTF-8 blob plus
+    offsets), indptr per term and flat arrays of document positions and
+    term frequencies. Saved indexes are memory-mapped on load. Documents
+    added afterwards go to small in-memory postings and removals are
+    masked; save() merges both into fresh arrays.
+
+    Scoring walks only the postings of the query terms and accumulates
+    BM25 contributions into a dense score vector with numpy.
+    """
+
+    TERMS_FILE = "bm25_terms.bin"
+    TERM_OFFSETS_FILE = "bm25_term_offsets.npy"
+    INDPTR_FILE = "bm25_indptr.npy"
+    POSTING_DOCS_FILE = "bm25_docs.npy"
+    POSTING_TFS_FILE = "bm25_tfs.npy"
+    DOC_IDS_FILE = "bm25_doc_ids.npy"
+    DOC_LENGTHS_FILE = "bm25_doc_lengths.npy"
+    FILES = (TERMS_FILE, TERM_OFFSETS_FILE, INDPTR_FILE, POSTING_DOCS_FILE, POSTING_TFS_FILE,
+             DOC_IDS_FILE, DOC_LENGTHS_FILE)
+
+    def __init__(self, k1: float = config.BM25_K1, b: float = config.BM25_B):
+        self.k1 = k1
+        self.b = b
+
+        # Saved postings (memory-mapped after load)
+        self._terms = np.zeros(0, dtype=np.uint8)
+        self._term_offsets = np.zeros(1, dtype=np.int64)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._posting_docs = np.zeros(0, dtype=np.int32)
+        self._posting_tfs = np.zeros(0, dtype=np.float32)
+        self._doc_ids = np.zeros(0, dtype=np.int64)
+        self._doc_lengths = np.zeros(0, dtype=np.float32)
+
+        # Documents added since load
+        self._tail_terms = {}       # new term -> term ID
+        self._tail_postings = {}    # term ID -> [(doc position, tf)]
+        self._tail_doc_ids = []
+        self._tail_doc_lengths = []
+        self._tail_positions = {}   # chunk ID -> doc position
+
+        self._deleted = set()       # doc positions
+        self._term_cache = {}
+        self._arrays = None         # (doc_ids, doc_lengths, live) of all docs
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return (Path(path) / cls.INDPTR_FILE).exists()
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """Map a saved index"""
+        path = Path(path)
+        index = cls()
+        index._terms = np.memmap(path / cls.TERMS_FILE, dtype=np.uint8, mode='r') \
+            if (path / cls.TERMS_FILE).stat().st_size else np.zeros(0, dtype=np.uint8)
+        index._term_offsets = np.load(path / cls.TERM_OFFSETS_FILE, mmap_mode='r')
+        index._indptr = np.load(path / cls.INDPTR_FILE, mmap_mode='r')
+        index._posting_docs = np.load(path / cls.POSTING_DOCS_FILE, mmap_mode='r')
+        index._posting_tfs = np.load(path / cls.POSTING_TFS_FILE, mmap_mode='r')
+        index._doc_ids = np.load(path / cls.DOC_IDS_FILE, mmap_mode='r')
+        index._doc_lengths = np.load(path / cls.DOC_LENGTHS_FILE, mmap_mode='r')
+        return index
+
+    def __len__(self) -> int:
+        return self._num_docs() - len(self._deleted)
+
+    def add(self, chunk_ids: Iterable[int], texts: Iterable[str]):
+        """Index chunk texts (chunk IDs must be ascending and new)"""
+        for chunk_id, text in zip(chunk_ids, texts):
+            position = self._num_docs()
+            tokens = tokenize(text)
+            for term, tf in Counter(tokens).items():
+                term_id = self._term_id(term, create=True)
+                self._tail_postings.setdefault(term_id, []).append((position, tf))
+            self._tail_positions[int(chunk_id)] = position
+            self._tail_doc_ids.append(int(chunk_id))
+            self._tail_doc_lengths.append(len(tokens))
+        self._arrays = None
+
+    def remove(self, chunk_ids: Iterable[int]):
+        """Stop matching the given chunks"""
+        for chunk_id in chunk_ids:
+            position = self._tail_positions.get(int(chunk_id))
+            if position is None and len(self._doc_ids):
+                row = int(np.searchsorted(self._doc_ids, chunk_id))
+                if row < len(self._doc_ids) and self._doc_ids[row] == chunk_id:
+                    position = row
+            if position is not None:
+                self._deleted.add(position)
+        self._arrays = None
+
+    def search(self, query: str, k: int = 10,
+               allowed_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank chunks by BM25 against a query, optionally only among allowed_ids
+
+        Returns:
+            (chunk_ids, scores) of the best k matches, best first
+        """
+        doc_ids, doc_lengths, live = self._all_arrays()
+        num_live = int(live.sum())
+        if num_live == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        avg_length = float(doc_lengths[live].mean()) or 1.0
+
+        scores = np.zeros(len(doc_ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self._term_id(term)
+            if term_id is None:
+                continue
+            docs, tfs = self._postings(term_id)
+            if self._deleted:
+                keep = live[docs]
+                docs, tfs = docs[keep], tfs[keep]
+            if not len(docs):
+                continue
+
+            idf = math.log(1.0 + (num_live - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[docs] / avg_length)
+            scores[docs] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        if allowed_ids is not None:
+            scores[~np.isin(doc_ids, allowed_ids)] = 0.0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return doc_ids[matched], scores[matched]
+
+    def save(self, path: str):
+        """Write live postings as fresh CSR arrays"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        doc_ids, doc_lengths, live = self._all_arrays()
+
+        # All postings as (term, doc, tf) triples
+        num_base_terms = len(self._term_offsets) - 1
+        tail = [(term_id, doc, tf) for term_id, postings in self._tail_postings.items()
+                for doc, tf in postings]
+        tail = np.array(tail, dtype=np.int64).reshape(-1, 3)
+        terms = np.concatenate([
+            np.repeat(np.arange(num_base_terms, dtype=np.int64), np.diff(self._indptr)), tail[:, 0]
+        ])
+        docs = np.concatenate([np.asarray(self._posting_docs, dtype=np.int64), tail[:, 1]])
+        tfs = np.concatenate([np.asarray(self._posting_tfs, dtype=np.float32), tail[:, 2].astype(np.float32)])
+
+        # Drop removed documents and renumber the rest
+        keep = live[docs]
+        positions = np.cumsum(live) - 1
+        terms, docs, tfs = terms[keep], positions[docs[keep]], tfs[keep]
+
+        # Sort the vocabulary, dropping terms left without postings
+        vocabulary = [self._base_term(i) for i in range(num_base_terms)] + list(self._tail_terms)
+        used, terms = np.unique(terms, return_inverse=True)
+        words = [vocabulary[i] for i in used.tolist()]
+        word_order = sorted(range(len(words)), key=words.__getitem__)
+        rank = np.empty(len(words), dtype=np.int64)
+        rank[word_order] = np.arange(len(words))
+        terms = rank[terms]
+
+        order = np.lexsort((docs, terms))
+        indptr = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(words)), out=indptr[1:])
+
+        encoded = [words[i].encode("utf-8") for i in word_order]
+        term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(word) for word in encoded], out=term_offsets[1:])
+        with open(path / self.TERMS_FILE, "wb") as f:
+            f.write(b"".join(encoded))
+
+        np.save(path / self.TERM_OFFSETS_FILE, term_offsets)
+        np.save(path / self.INDPTR_FILE, indptr)
+        np.save(path / self.POSTING_DOCS_FILE, docs[order].astype(np.int32))
+        np.save(path / self.POSTING_TFS_FILE, tfs[order])
+        np.save(path / self.DOC_IDS_FILE, doc_ids[live])
+        np.save(path / self.DOC_LENGTHS_FILE, doc_lengths[live])
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _num_docs(self) -> int:
+        return len(self._doc_ids) + len(self._tail_doc_ids)
+
+    def _base_term(self, term_id: int) -> str:
+        start, end = self._term_offsets[term_id], self._term_offsets[term_id + 1]
+        return self._terms[start:end].tobytes().decode("utf-8")
+
+    def _term_id(self, term: str, create: bool = False) -> Optional[int]:
+        """Binary search the saved terms, then the in-memory ones"""
+        term_id = self._term_cache.get(term)
+        if term_id is not None:
+            return term_id
+
+        lo, hi = 0, len(self._term_offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._base_term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._term_offsets) - 1 and self._base_term(lo) == term:
+            term_id = lo
+        else:
+            term_id = self._tail_terms.get(term)
+            if term_id is None:
+                if not create:
+                    return None
+                term_id = len(self._term_offsets) - 1 + len(self._tail_terms)
+                self._tail_terms[term] = term_id
+
+        self._term_cache[term] = term_id
+        return term_id
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Document positions and term frequencies of a term"""
+        docs, tfs = [], []
+        if term_id < len(self._indptr) - 1:
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            docs.append(np.asarray(self._posting_docs[start:end], dtype=np.int64))
+            tfs.append(np.asarray(self._posting_tfs[start:end], dtype=np.float32))
+        tail = self._tail_postings.get(term_id)
+        if tail:
+            tail = np.array(tail, dtype=np.int64)
+            docs.append(tail[:, 0])
+            tfs.append(tail[:, 1].astype(np.float32))
+        return np.concatenate(docs), np.concatenate(tfs)
+
+    def _all_arrays(self):
+        """Chunk IDs, lengths and live mask of every document position"""
+        if self._arrays is None:
+            doc_ids = np.concatenate([self._doc_ids, np.array(self._tail_doc_ids, dtype=np.int64)])
+            doc_lengths = np.concatenate([
+                self._doc_lengths, np.array(self._tail_doc_lengths, dtype=np.float32)
+            ])
+            live = np.ones(len(doc_ids), dtype=bool)
+            if self._deleted:
+                live[list(self._deleted)] = False
+            self._arrays = (doc_ids, doc_lengths, live)
+        return self._arrays
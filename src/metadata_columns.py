@@ -0,0 +1,212 @@
+"""
+Metadata Columns Module
+Dictionary-encoded, columnar chunk metadata
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Integer metadata keys held as int32 columns (-1 = absent): key -> column
+INT_COLUMNS = {'page': 'pages', 'start_index': 'start_indices'}
+
+
+class MetadataColumns:
+    """Chunk metadata as typed arrays, one entry per row
+
+    Columns:
+        source_ids     int32  index into sources, (source, source_file) pairs (-1 = none)
+        language_ids   int8   index into languages (-1 = none)
+        pages          int32  page number (-1 = none)
+        start_indices  int32  character offset of the chunk in its page (-1 = none)
+    Any other keys are kept per row and returned by _extra(row).
+
+    Predicates and group-bys run on the arrays; a metadata dict is only
+    built by metadata(row), i.e. for rows that are actually returned.
+    """
+
+    sources: List[Tuple[Optional[str], Optional[str]]]
+    languages: List[str]
+    source_ids: np.ndarray
+    language_ids: np.ndarray
+    pages: np.ndarray
+    start_indices: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.source_ids)
+
+    def _extra(self, row: int) -> Optional[dict]:
+        """Metadata keys without a column"""
+        return None
+
+    def metadata(self, row: int) -> dict:
+        """Rebuild the metadata dict of one row"""
+        metadata = {}
+        for key, column in INT_COLUMNS.items():
+            value = int(getattr(self, column)[row])
+            if value >= 0:
+                metadata[key] = value
+
+        source_id = int(self.source_ids[row])
+        if source_id >= 0:
+            source, source_file = self.sources[source_id]
+            if source is not None:
+                metadata['source'] = source
+            if source_file is not None:
+                metadata['source_file'] = source_file
+
+        language_id = int(self.language_ids[row])
+        if language_id >= 0:
+            metadata['language'] = self.languages[language_id]
+
+        extra = self._extra(row)
+        if extra:
+            metadata.update(extra)
+        return metadata
+
+    def _source_codes(self, source_files: Iterable[str]) -> List[int]:
+        names = set(source_files)
+        return [i for i, (_, name) in enumerate(self.sources) if name in names]
+
+    def rows_for_source(self, source_file: str) -> np.ndarray:
+        """Rows whose metadata source_file matches"""
+        matching = self._source_codes([source_file])
+        if not matching:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.isin(self.source_ids, matching))
+
+    def filter_rows(self, source_files: Optional[List[str]] = None, languages: Optional[List[str]] = None,
+                    page_range: Optional[Tuple[Optional[int], Optional[int]]] = None) -> np.ndarray:
+        """Boolean mask of rows matching every given condition (page_range is inclusive)"""
+        mask = np.ones(len(self), dtype=bool)
+        if source_files is not None:
+            mask &= np.isin(self.source_ids, self._source_codes(source_files))
+        if languages is not None:
+            matching = [i for i, code in enumerate(self.languages) if code in languages]
+            mask &= np.isin(self.language_ids, matching)
+        if page_range is not None:
+            first, last = page_range
+            if first is not None:
+                mask &= self.pages >= first
+            if last is not None:
+                mask &= (self.pages <= last) & (self.pages >= 0)
+        return mask
+
+    def source_file_table(self) -> np.ndarray:
+        """source_file per source ID as an object array, with None appended for ID -1"""
+        return np.array([name for _, name in self.sources] + [None], dtype=object)
+
+    def source_files_of(self, rows: np.ndarray) -> np.ndarray:
+        """source_file of each row (object array, None where unknown)"""
+        return self.source_file_table()[np.asarray(self.source_ids)[rows]]
+
+    def count_by_source(self, rows: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Number of rows per source_file, optionally among some rows"""
+        source_ids = np.asarray(self.source_ids if rows is None else self.source_ids[rows])
+        counts = np.bincount(source_ids[source_ids >= 0], minlength=len(self.sources))
+        totals = {}
+        for (_, name), count in zip(self.sources, counts.tolist()):
+            if name is not None and count:
+                totals[name] = totals.get(name, 0) + count
+        return totals
+
+    def source_files(self, rows: Optional[np.ndarray] = None) -> List[str]:
+        """Distinct source files, optionally restricted to some rows"""
+        return sorted(self.count_by_source(rows))
+
+
+class MetadataBuilder(MetadataColumns):
+    """Growable in-memory MetadataColumns, for rows not yet written to disk"""
+
+    DTYPES = {'source_ids': np.int32, 'language_ids': np.int8, 'pages': np.int32, 'start_indices': np.int32}
+
+    def __init__(self, metadatas: Iterable[dict] = ()):
+        self._size = 0
+        self._arrays = {name: np.empty(0, dtype=dtype) for name, dtype in self.DTYPES.items()}
+        self.sources = []
+        self.languages = []
+        self._source_index = {}
+        self._language_index = {}
+        self.extras = []   # dict of the remaining keys per row, None when there are none
+        self.extend(metadatas)
+
+    @property
+    def source_ids(self) -> np.ndarray:
+        return self._arrays['source_ids'][:self._size]
+
+    @property
+    def language_ids(self) -> np.ndarray:
+        return self._arrays['language_ids'][:self._size]
+
+    @property
+    def pages(self) -> np.ndarray:
+        return self._arrays['pages'][:self._size]
+
+    @property
+    def start_indices(self) -> np.ndarray:
+        return self._arrays['start_indices'][:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _extra(self, row: int) -> Optional[dict]:
+        return self.extras[row]
+
+    def _grow(self, needed: int):
+        """Double the column capacity until `needed` rows fit"""
+        capacity = len(self._arrays['source_ids'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[name] = grown
+
+    def append(self, metadata: dict):
+        """Encode one metadata dict as a new row"""
+        self.extend([metadata])
+
+    def extend(self, metadatas: Iterable[dict]):
+        """Encode metadata dicts as new rows"""
+        for metadata in metadatas:
+            self._grow(self._size + 1)
+            row = self._size
+            metadata = dict(metadata)
+
+            for key, column in INT_COLUMNS.items():
+                value = metadata.pop(key, None)
+                if isinstance(value, (int, np.integer)) and not isinstance(value, bool) and 0 <= value < 2 ** 31:
+                    self._arrays[column][row] = value
+                else:
+                    self._arrays[column][row] = -1
+                    if value is not None:
+                        metadata[key] = value
+
+            language = metadata.pop('language', None)
+            if isinstance(language, str):
+                self._arrays['language_ids'][row] = self._code(self._language_index, self.languages, language)
+            else:
+                self._arrays['language_ids'][row] = -1
+                if language is not None:
+                    metadata['language'] = language
+
+            key = (metadata.pop('source', None), metadata.pop('source_file', None))
+            self._arrays['source_ids'][row] = -1 if key == (None, None) else \
+                self._code(self._source_index, self.sources, key)
+
+            self.extras.append(metadata or None)
+            self._size += 1
+
+    @staticmethod
+    def _code(index: dict, values: list, value) -> int:
+        """Dictionary code of a value, adding it on first sight"""
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        return code
+
+    def take(self, rows: Iterable[int]) -> "MetadataBuilder":
+        """New builder with only the given rows, in order"""
+        return MetadataBuilder(self.metadata(row) for row in rows)
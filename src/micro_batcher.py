@@ -0,0 +1,102 @@
+"""
+Micro-Batcher Module
+Coalesce concurrent requests into batched calls
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+from src.config import config
+
+
+class MicroBatcher:
+    """
+    Run a batch function over requests submitted concurrently from many threads
+
+    A worker thread takes the first waiting request, then keeps collecting
+    for up to max_wait_ms (or until max_batch_size requests) and calls
+    batch_fn once with the whole list. Each caller blocks only on its own
+    result, so latency is bounded by max_wait_ms plus one batch call.
+
+    batch_fn may return an exception in place of a result to fail only
+    that request; an exception raised by batch_fn fails the whole batch.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = config.MICRO_BATCH_MAX_SIZE,
+                 max_wait_ms: float = config.MICRO_BATCH_MAX_WAIT_MS,
+                 name: str = "micro-batcher"):
+        """
+        Args:
+            batch_fn: Maps a list of requests to a list of results or exceptions (same order)
+            max_batch_size: Most requests per batch_fn call
+            max_wait_ms: How long to wait for more requests after the first one
+            name: Worker thread name
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self.batches = 0
+        self.requests = 0
+        self.batch_seconds = 0.0
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, request: Any) -> Future:
+        """Queue a request; the future resolves to its result"""
+        future = Future()
+        self._queue.put((request, future))
+        return future
+
+    def __call__(self, request: Any) -> Any:
+        """Submit a request and wait for its result"""
+        return self.submit(request).result()
+
+    def stats(self) -> dict:
+        """Return batching statistics"""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "mean_batch_ms": self.batch_seconds / self.batches * 1000 if self.batches else 0.0,
+        }
+
+    def _collect(self) -> list:
+        """Block for one request, then gather more until the wait or size limit"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            requests = [request for request, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = self.batch_fn(requests)
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                self.batch_seconds += time.perf_counter() - start
+                self.batches += 1
+                self.requests += len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,107 @@
+"""
+Page Cache Module
+Persistent cache of extracted PDF page text
+"""
+
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class PageTextCache:
+    """
+    SQLite cache of page text keyed by (file content hash, page, extractor)
+
+    Text is stored zlib-compressed. The page count of each cached document
+    is recorded too, so a fully cached PDF never has to be opened. The
+    extractor key names the backend and its version; changing either
+    simply misses the old entries.
+    """
+
+    DB_FILE = "pages.sqlite"
+
+    def __init__(self, path: str, compression_level: int = 6):
+        """
+        Open (or create) a cache directory
+
+        Args:
+            path: Directory holding the cache database
+            compression_level: zlib level for stored text
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.compression_level = compression_level
+
+        self.hits = 0
+        self.misses = 0
+
+        # Extraction is consumed on the ingestion producer thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path / self.DB_FILE), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " content_hash TEXT, extractor TEXT, num_pages INTEGER,"
+                " PRIMARY KEY (content_hash, extractor)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " content_hash TEXT, extractor TEXT, page INTEGER, text BLOB,"
+                " PRIMARY KEY (content_hash, extractor, page)) WITHOUT ROWID"
+            )
+
+    def num_pages(self, content_hash: str, extractor: str) -> Optional[int]:
+        """Recorded page count of a document, or None if never seen"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT num_pages FROM documents WHERE content_hash = ? AND extractor = ?",
+                (content_hash, extractor)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_pages(self, content_hash: str, extractor: str) -> Dict[int, str]:
+        """All cached pages of a document, as page number -> text"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page, text FROM pages WHERE content_hash = ? AND extractor = ?",
+                (content_hash, extractor)
+            ).fetchall()
+        return {page: zlib.decompress(text).decode("utf-8") for page, text in rows}
+
+    def put_pages(self, content_hash: str, extractor: str, num_pages: int,
+                  pages: List[Tuple[int, str]]):
+        """Store extracted (page number, text) pairs of a document"""
+        rows = [
+            (content_hash, extractor, page,
+             zlib.compress((text or "").encode("utf-8"), self.compression_level))
+            for page, text in pages
+        ]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?)",
+                (content_hash, extractor, num_pages)
+            )
+            self._conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", rows)
+
+    def record(self, hits: int, misses: int):
+        """Count pages served from the cache and pages extracted"""
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self) -> dict:
+        """Page hit/miss counts and on-disk size"""
+        total = self.hits + self.misses
+        size = sum(f.stat().st_size for f in self.path.glob(f"{self.DB_FILE}*"))
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size_mb': size / 1e6,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,128 @@
+"""
+Query Service Module
+Retrieval and answering over shared, once-loaded resources
+"""
+
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import config
+from src.micro_batcher import MicroBatcher
+from src.vector_store import validate_filters
+
+
+def check_request(k, filters: Optional[Dict], chat_history: Optional[List[Dict]] = None):
+    """Raise ValueError unless k is a positive integer and filters and chat history are well formed"""
+    if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+        raise ValueError(f"k must be a positive integer, got {k!r}")
+    validate_filters(filters)
+    if chat_history is None:
+        return
+    if not isinstance(chat_history, list):
+        raise ValueError(f"chat_history must be a list of messages, got {type(chat_history).__name__}")
+    for message in chat_history:
+        if not (isinstance(message, dict) and isinstance(message.get("role"), str)
+                and isinstance(message.get("content"), str)):
+            raise ValueError(f"chat_history messages need string 'role' and 'content', got {message!r}")
+
+
+class QueryService:
+    """
+    Serve retrieve/answer requests from many threads with one set of resources
+
+    Concurrent retrievals are coalesced by a MicroBatcher: queries arriving
+    within a few milliseconds of each other are embedded in one encode
+    batch and searched with one search_batch (or hybrid_search_batch) call
+    per distinct combination of search mode and filters. Requests are
+    validated before they are queued, and a group whose search still
+    fails is retried request by request, so one bad request cannot fail
+    the others batched with it.
+    """
+
+    def __init__(self, vector_store, embedder, generator=None,
+                 max_batch_size: int = config.MICRO_BATCH_MAX_SIZE,
+                 max_wait_ms: float = config.MICRO_BATCH_MAX_WAIT_MS):
+        """
+        Args:
+            vector_store: Loaded VectorStore
+            embedder: EmbeddingGenerator for queries
+            generator: ResponseGenerator (None disables answering)
+            max_batch_size: Most queries per encode/search batch
+            max_wait_ms: How long a batch waits for more queries
+        """
+        self.vector_store = vector_store
+        self.embedder = embedder
+        self.generator = generator
+        self.batcher = MicroBatcher(self._retrieve_batch, max_batch_size, max_wait_ms,
+                                    name="query-batcher")
+
+    def retrieve(self, query: str, k: int = config.TOP_K_RESULTS,
+                 hybrid: bool = config.HYBRID_SEARCH,
+                 filters: Optional[Dict] = None) -> Tuple[List[Dict], np.ndarray]:
+        """Top-k chunks for a query (see VectorStore.search_batch for filters), plus the query embedding"""
+        check_request(k, filters)
+        return self.batcher((query, k, hybrid, filters))
+
+    def answer_stream(self, query: str, k: int = config.TOP_K_RESULTS,
+                      hybrid: bool = config.HYBRID_SEARCH,
+                      chat_history: Optional[List[Dict]] = None,
+                      filters: Optional[Dict] = None) -> Tuple[Iterator[str], List[Dict]]:
+        """Retrieve, then stream an answer; returns (text pieces, sources)"""
+        if self.generator is None:
+            raise RuntimeError("Answering is disabled (no generator loaded)")
+        check_request(k, filters, chat_history)
+        results, query_embedding = self.retrieve(query, k, hybrid, filters)
+        stream = self.generator.generate_stream(
+            query, results, chat_history=chat_history,
+            query_embedding=query_embedding, index_version=self.vector_store.version
+        )
+        return stream, results
+
+    def stats(self) -> dict:
+        """Batching and cache statistics"""
+        stats = {"batching": self.batcher.stats(), "query_cache": self.embedder.query_cache_stats()}
+        if self.generator is not None and self.generator.answer_cache is not None:
+            stats["answer_cache"] = self.generator.answer_cache.stats()
+        return stats
+
+    def _search(self, queries: List[str], embeddings: np.ndarray, k: int, hybrid: bool,
+                filters: Optional[Dict]) -> List[List[Dict]]:
+        if hybrid:
+            return self.vector_store.hybrid_search_batch(queries, embeddings, k=k, filters=filters)
+        return self.vector_store.search_batch(embeddings, k=k, filters=filters)
+
+    def _retrieve_batch(self, requests: List[Tuple[str, int, bool, Optional[Dict]]]) -> List:
+        """Embed all queries at once, then search each (mode, filters) group in one call
+
+        A request whose search fails gets the exception as its result.
+        """
+        queries = [request[0] for request in requests]
+        embeddings = self.embedder.generate_query_embeddings(queries)
+        results = [None] * len(requests)
+
+        groups = {}
+        for i, (_, _, hybrid, filters) in enumerate(requests):
+            groups.setdefault((hybrid, json.dumps(filters, sort_keys=True)), []).append(i)
+
+        for (hybrid, _), rows in groups.items():
+            filters = requests[rows[0]][3]
+            k = max(requests[i][1] for i in rows)
+            try:
+                found = self._search([queries[i] for i in rows], embeddings[rows], k, hybrid, filters)
+                for i, hits in zip(rows, found):
+                    results[i] = (hits[:requests[i][1]], embeddings[i])
+            except Exception as e:
+                if len(rows) == 1:
+                    results[rows[0]] = e
+                    continue
+                # Find the failing request(s) instead of failing the group
+                for i in rows:
+                    try:
+                        hits = self._search([queries[i]], embeddings[[i]], requests[i][1], hybrid, filters)[0]
+                        results[i] = (hits, embeddings[i])
+                    except Exception as e:
+                        results[i] = e
+
+        return results
@@ -0,0 +1,138 @@
+"""
+Reranker Module
+Rerank retrieved chunks with a multilingual cross-encoder
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sentence_transformers import CrossEncoder
+
+from src.config import config
+from src.text_utils import normalize_query
+
+
+class Reranker:
+    """
+    Score (query, chunk) pairs with a cross-encoder and keep the best ones
+
+    All uncached pairs of a query are scored in one batched forward pass.
+    Scores are cached per (normalised query, chunk ID); chunk IDs change
+    whenever a chunk is replaced, so cached scores never go stale.
+
+    A latency budget caps how many uncached candidates are scored: the
+    cost per pair is tracked as a moving average and candidates beyond
+    what fits in the budget are dropped (in retrieval order). The first
+    query is scored in full and seeds the estimate.
+    """
+
+    def __init__(self, model_name: str = config.RERANKER_MODEL,
+                 max_length: int = config.RERANKER_MAX_LENGTH,
+                 budget_ms: Optional[float] = config.RERANK_BUDGET_MS,
+                 cache_size: int = config.RERANK_CACHE_SIZE):
+        """
+        Args:
+            model_name: CrossEncoder model to load
+            max_length: Token limit per (query, chunk) pair
+            budget_ms: Latency budget per rerank call (None for no limit)
+            cache_size: (query, chunk ID) scores kept in the LRU cache
+        """
+        print(f"📥 Loading reranker: {model_name}")
+        self.model = CrossEncoder(model_name, max_length=max_length)
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+
+        self.hits = 0
+        self.misses = 0
+        self.truncated = 0
+        self.seconds_per_pair = None
+
+        self._cache = OrderedDict()   # (normalised query, chunk ID) -> score
+        self._lock = threading.Lock()
+
+        # Warm up lazy initialisation; a cold call's timing would overstate the per-pair cost
+        self.model.predict([("warm-up", "warm-up passage " * 32)] * 8, show_progress_bar=False)
+        print("✅ Reranker loaded")
+
+    def rerank(self, query: str, results: List[Dict], top_n: int = config.TOP_K_RESULTS) -> List[Dict]:
+        """
+        Reorder retrieval results by cross-encoder score
+
+        Args:
+            query: User question
+            results: Candidates from VectorStore.search / hybrid_search, best first
+            top_n: Number of results to keep
+
+        Returns:
+            The top_n results, each with an added 'rerank_score'
+        """
+        if not results:
+            return []
+
+        key = normalize_query(query)
+        scores = {}
+        pending = []
+        with self._lock:
+            for result in results:
+                score = self._cache.get((key, result['id']))
+                if score is None:
+                    pending.append(result)
+                else:
+                    self._cache.move_to_end((key, result['id']))
+                    scores[result['id']] = score
+            self.hits += len(scores)
+            self.misses += len(pending)
+
+        # Drop the lowest-ranked uncached candidates that don't fit the budget
+        limit = self._pair_limit()
+        if limit is not None and len(pending) > limit:
+            self.truncated += len(pending) - limit
+            pending = pending[:limit]
+
+        if pending:
+            predicted = self._predict([(query, result['text']) for result in pending])
+            with self._lock:
+                for result, score in zip(pending, predicted):
+                    scores[result['id']] = score
+                    self._cache[(key, result['id'])] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        ranked = sorted((r for r in results if r['id'] in scores), key=lambda r: scores[r['id']], reverse=True)
+        return [{**result, 'rerank_score': scores[result['id']]} for result in ranked[:top_n]]
+
+    def stats(self) -> dict:
+        """Return cache and budget statistics"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "truncated": self.truncated,
+            "ms_per_pair": self.seconds_per_pair * 1000 if self.seconds_per_pair else None,
+        }
+
+    def _predict(self, pairs: List[tuple]) -> List[float]:
+        """Score pairs in one batch, updating the moving per-pair cost
+
+        The model is loaded in __init__, so concurrent calls run their
+        forward passes in parallel; the lock only guards the estimate.
+        """
+        start = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        per_pair = (time.perf_counter() - start) / len(pairs)
+        with self._lock:
+            self.seconds_per_pair = per_pair if self.seconds_per_pair is None \
+                else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+        return scores.tolist()
+
+    def _pair_limit(self) -> Optional[int]:
+        """Uncached pairs that fit in the latency budget (None = no limit yet)"""
+        if self.budget_ms is None or self.seconds_per_pair is None:
+            return None
+        return max(1, int(self.budget_ms / 1000 / self.seconds_per_pair))
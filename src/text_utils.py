@@ -0,0 +1,63 @@
+"""
+Text Utilities Module
+Normalisation helpers shared by caching and retrieval
+"""
+
+import re
+import unicodedata
+
+# Arabic harakat (fathatan .. sukun) and the superscript alef
+ARABIC_DIACRITICS = re.compile("[\u064B-\u0652\u0670]")
+TATWEEL = "\u0640"
+WHITESPACE = re.compile(r"\s+")
+
+# Letters used to tell Arabic from Latin-script (English) text
+ARABIC_LETTERS = re.compile("[\u0620-\u064A\u0671-\u06D3\uFB50-\uFDFF\uFE70-\uFEFC]")
+LATIN_LETTERS = re.compile("[A-Za-z\u00C0-\u024F]")
+
+# Letter variants folded for matching: alef forms, alef maqsura, ta marbuta
+ARABIC_LETTER_FOLDS = str.maketrans({
+    "\u0623": "\u0627", "\u0625": "\u0627", "\u0622": "\u0627", "\u0671": "\u0627",
+    "\u0649": "\u064A", "\u0629": "\u0647",
+})
+
+
+def strip_arabic_marks(text: str) -> str:
+    """Remove Arabic diacritics and tatweel"""
+    return ARABIC_DIACRITICS.sub("", text).replace(TATWEEL, "")
+
+
+def normalize_for_matching(text: str) -> str:
+    """
+    Normalise text for lexical matching
+
+    NFKC, Arabic diacritics/tatweel removed, alef/ya/ta marbuta variants
+    folded and casefolded. Whitespace is left alone.
+    """
+    text = strip_arabic_marks(unicodedata.normalize("NFKC", text))
+    return text.translate(ARABIC_LETTER_FOLDS).casefold()
+
+
+def normalize_query(text: str) -> str:
+    """
+    Fold a query to the form used as a cache key
+
+    Applies NFKC, strips Arabic diacritics and tatweel, collapses
+    whitespace and casefolds, so "What is RAG?" and "  what is  rag? ",
+    or the same Arabic word with and without harakat, map to the same key.
+    """
+    text = strip_arabic_marks(unicodedata.normalize("NFKC", text))
+    text = WHITESPACE.sub(" ", text).strip()
+    return text.casefold()
+
+
+def detect_language(text: str) -> str:
+    """
+    Guess the language of a chunk from its script: "ar" or "en"
+
+    Chunks with more Arabic than Latin letters are "ar"; anything else
+    (Latin script, or no letters at all) is "en", the corpus' other language.
+    """
+    arabic = len(ARABIC_LETTERS.findall(text))
+    latin = len(LATIN_LETTERS.findall(text))
+    return "ar" if arabic > latin else "en"
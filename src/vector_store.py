@@ -6,89 +6,1179 @@ Store and retrieve document embeddings using FAISS
 import warnings
 warnings.filterwarnings('ignore')
 
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
 import numpy as np
 import faiss
 import pickle
-from typing import List, Tuple
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
+from src.chunk_store import ChunkStore
+from src.config import config
+from src.deduplication import ChunkDeduplicator, MinHashColumns
+from src.lexical_index import LexicalIndex
+from src.metadata_columns import MetadataBuilder
+from src.text_utils import detect_language
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq", "sq8", "fp16", "binary")
+# Index types holding compressed codes; their float vectors stay on disk for rescoring
+COMPRESSED_INDEX_TYPES = ("sq8", "fp16", "binary")
+STORE_FILE = "store.json"
+CURRENT_FILE = "CURRENT"           # names the version directory readers should load
+DUPLICATES_FILE = "duplicates.json"
+# Files a store saved before versions kept directly in its directory
+LEGACY_FILES = ("index.faiss", STORE_FILE, DUPLICATES_FILE, "data.pkl",
+                *ChunkStore.FILES, *LexicalIndex.FILES, *MinHashColumns.FILES)
+STORE_FORMAT_VERSION = 2
+FILTER_KEYS = ("source_file", "language", "page_range")
+
+
+def default_index_params() -> dict:
+    """Index build and search parameters from the config"""
+    return {
+        'nlist': config.IVF_NLIST,
+        'nprobe': config.IVF_NPROBE,
+        'hnsw_m': config.HNSW_M,
+        'ef_construction': config.HNSW_EF_CONSTRUCTION,
+        'ef_search': config.HNSW_EF_SEARCH,
+        'pq_m': config.PQ_M,
+        'pq_nbits': config.PQ_NBITS,
+        'rescore_factor': config.RESCORE_FACTOR,
+        'pca_dim': config.PCA_DIM,
+    }
+
+
+def _filter_key(filters: Optional[dict]) -> Optional[tuple]:
+    """Canonical, hashable form of a filters dict (None if it filters nothing)"""
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unsupported filters: {sorted(unknown)} (expected any of {FILTER_KEYS})")
+
+    def values(name):
+        value = filters.get(name)
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"Filter {name} must be a string or a list of strings")
+        return tuple(sorted(value))
+
+    page_range = filters.get('page_range')
+    if page_range is not None:
+        if (not isinstance(page_range, (list, tuple)) or len(page_range) != 2
+                or not all(p is None or (isinstance(p, int) and not isinstance(p, bool)) for p in page_range)):
+            raise ValueError("Filter page_range must be [first, last] with integer or null bounds")
+        page_range = tuple(page_range)
+    key = (values('source_file'), values('language'), page_range)
+    return None if key == (None, None, None) else key
+
+
+def validate_filters(filters: Optional[dict]):
+    """Raise ValueError if filters has unknown keys or malformed values"""
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError(f"filters must be an object with keys among {FILTER_KEYS}")
+    _filter_key(filters)
+
+
+class _RowView(Sequence):
+    """Read-only list-like view over store rows, decoded on access"""
+
+    def __init__(self, count: Callable[[], int], getter: Callable[[int], object]):
+        self._count = count
+        self._getter = getter
+
+    def __len__(self) -> int:
+        return self._count()
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._getter(row) for row in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("row index out of range")
+        return self._getter(item)
+
 
 class VectorStore:
-    """FAISS-based vector store for document embeddings"""
-    
-    def __init__(self, dimension: int = 1024):
-        """Initialize vector store"""
+    """FAISS-based vector store for document embeddings
+
+    Every chunk gets a stable integer ID (FAISS IndexIDMap2), so the chunks
+    of one source file can be removed or replaced without rebuilding the
+    rest of the store. A manifest records the content hash of each
+    ingested file.
+
+    The underlying index is chosen by index_type:
+        flat:  exact search (IndexFlatL2)
+        ivf:   inverted lists over k-means cells, tuned by nprobe
+        hnsw:  graph search, tuned by ef_search
+        ivfpq: inverted lists with product-quantized codes, tuned by nprobe
+        sq8, fp16, binary: compressed codes, rescored (see below)
+    IVF indexes need training; vectors are buffered until enough have been
+    added (or until the first search/save) and the index is trained on them.
+
+    index_params['pca_dim'] > 0 puts a PCA projection to that many
+    dimensions in front of the index (not binary). It is fitted when the
+    index trains, saved inside index.faiss and applied to queries by FAISS.
+
+    Chunk texts and metadata of a loaded store stay on disk in a
+    memory-mapped ChunkStore and are decoded only for returned hits; rows
+    added since the last load/save are held in memory until save(), their
+    metadata in the same dictionary-encoded columns (MetadataBuilder).
+    load(path, mmap=True) also maps the FAISS index instead of reading it,
+    giving a read-only store that processes can share through the page cache.
+
+    A BM25 LexicalIndex over the chunk texts is kept alongside the FAISS
+    index; hybrid_search_batch() fuses both rankings.
+
+    Searches take optional metadata filters, applied inside FAISS so a
+    filtered query still returns k hits when k exist (see search_batch).
+
+    The compressed index types (sq8, fp16, binary) keep only 1 byte, 2 bytes
+    or 1 bit per dimension in memory. Their float vectors are written to a
+    memory-mapped vectors.npy and each query's top k * rescore_factor
+    candidates are re-ranked by exact L2 distance on them.
+
+    Chunks dropped as duplicates at ingestion are recorded as back-references
+    on the copy that was kept (add_duplicates) and returned with its hits
+    under metadata['duplicates'].
+    """
+
+    def __init__(self, dimension: int = 1024, index_type: str = config.INDEX_TYPE,
+                 index_params: Optional[dict] = None):
+        """Initialize vector store
+
+        Args:
+            dimension: Embedding dimension
+            index_type: One of INDEX_TYPES
+            index_params: Overrides for default_index_params()
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported index type: {index_type} (expected one of {INDEX_TYPES})")
+
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
-        self.texts = []
-        self.metadatas = []
-        print(f"✅ Vector store initialized (dimension: {dimension})")
-    
-    def add_documents(self, texts: List[str], embeddings: List[List[float]], metadatas: List[dict]):
-        """Add documents to the vector store"""
-        print(f"\n📥 Adding {len(texts)} documents to vector store...")
-        
+        self.index_type = index_type
+        self.index_params = {**default_index_params(), **(index_params or {})}
+        if index_type == "binary" and 'rescore_factor' not in (index_params or {}):
+            # 1 bit per dimension ranks coarsely; a longer shortlist makes up for it
+            self.index_params['rescore_factor'] = config.BINARY_RESCORE_FACTOR
+        if index_type == "binary" and self._reduces():
+            raise ValueError("PCA can't be combined with binary codes")
+        self.index = None if self._needs_training() else self._create_index()
+        self.manifest = {}
+        self.duplicates: Dict[int, List[dict]] = {}   # chunk ID -> metadata of dropped copies
+        self.next_id = 0
+        self.version = uuid.uuid4().hex   # changes whenever the contents do
+        self.read_only = False
+        self._base = None
+        self._minhashes = None       # MinHashColumns of the base rows, when saved with them
+        self._reset_rows()
+        self.lexical = LexicalIndex()
+        self._pending_vectors = []
+        self._pending_ids = []
+        self._removed_ids = set()
+        self._filter_cache = OrderedDict()   # filter key -> (chunk IDs, selector, bitmap)
+        self._filter_cache_version = None
+        self._filter_lock = threading.Lock()
+        print(f"✅ Vector store initialized (dimension: {dimension}, index: {index_type})")
+
+    def __len__(self) -> int:
+        """Number of live chunks"""
+        return self._num_rows() - len(self._deleted)
+
+    # ------------------------------------------------------------------
+    # Row storage
+    # ------------------------------------------------------------------
+
+    def _reset_rows(self):
+        """Forget in-memory rows and tombstones (the mapped base is kept)"""
+        self._tail_ids = []
+        self._tail_texts = []
+        self._tail_columns = MetadataBuilder()   # metadata of in-memory rows
+        self._tail_vectors = []       # float32 blocks of in-memory rows (compressed index types)
+        self._tail_rows = {}          # chunk ID -> row, for in-memory rows
+        self._deleted = set()         # tombstoned rows
+
+    def _num_base(self) -> int:
+        return len(self._base) if self._base is not None else 0
+
+    def _num_rows(self) -> int:
+        return self._num_base() + len(self._tail_ids)
+
+    def _chunk_id(self, row: int) -> int:
+        num_base = self._num_base()
+        return int(self._base.ids[row]) if row < num_base else self._tail_ids[row - num_base]
+
+    def _text(self, row: int) -> Optional[str]:
+        if row in self._deleted:
+            return None
+        num_base = self._num_base()
+        return self._base.text(row) if row < num_base else self._tail_texts[row - num_base]
+
+    def _tail_matrix(self) -> np.ndarray:
+        """Float vectors of the in-memory rows as one matrix"""
+        if len(self._tail_vectors) != 1:
+            blocks = self._tail_vectors or [np.zeros((0, self.dimension), dtype='float32')]
+            self._tail_vectors = [np.concatenate(blocks)]
+        return self._tail_vectors[0]
+
+    def _row_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Float vectors of rows, from vectors.npy or memory"""
+        rows = np.asarray(rows, dtype=np.int64)
+        num_base = self._num_base()
+        vectors = np.empty((len(rows), self.dimension), dtype='float32')
+        in_base = rows < num_base
+        if in_base.any():
+            vectors[in_base] = self._base.vectors[rows[in_base]]
+        if not in_base.all():
+            vectors[~in_base] = self._tail_matrix()[rows[~in_base] - num_base]
+        return vectors
+
+    def _metadata(self, row: int) -> Optional[dict]:
+        if row in self._deleted:
+            return None
+        num_base = self._num_base()
+        return self._base.metadata(row) if row < num_base else self._tail_columns.metadata(row - num_base)
+
+    def _result_metadata(self, row: int) -> dict:
+        """Metadata of a returned hit, with back-references to its duplicates"""
+        metadata = self._metadata(row)
+        refs = self.duplicates.get(self._chunk_id(row))
+        if refs:
+            metadata['duplicates'] = [dict(ref) for ref in refs]
+        return metadata
+
+    @property
+    def ids(self) -> Sequence:
+        """Chunk ID per row"""
+        return _RowView(self._num_rows, self._chunk_id)
+
+    @property
+    def texts(self) -> Sequence:
+        """Chunk text per row (None for removed rows)"""
+        return _RowView(self._num_rows, self._text)
+
+    @property
+    def metadatas(self) -> Sequence:
+        """Chunk metadata per row (None for removed rows)"""
+        return _RowView(self._num_rows, self._metadata)
+
+    def _rows_for_ids(self, ids: np.ndarray) -> np.ndarray:
+        """Live rows holding the given chunk IDs (-1 where absent)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self._base is not None:
+            rows = self._base.find_rows(ids)
+        else:
+            rows = np.full(len(ids), -1, dtype=np.int64)
+        for i in np.flatnonzero(rows < 0).tolist():
+            rows[i] = self._tail_rows.get(int(ids[i]), -1)
+        if self._deleted:
+            rows[np.isin(rows, list(self._deleted))] = -1
+        return rows
+
+    def _rows_for_source(self, source_file: str) -> np.ndarray:
+        """Live rows of a source file"""
+        parts = []
+        if self._base is not None:
+            parts.append(self._base.rows_for_source(source_file))
+        parts.append(self._tail_columns.rows_for_source(source_file) + self._num_base())
+        rows = np.concatenate(parts)
+        if self._deleted:
+            rows = rows[~np.isin(rows, list(self._deleted))]
+        return rows
+
+    def stored_minhashes(self, params: dict) -> Optional[Tuple[MinHashColumns, np.ndarray]]:
+        """MinHash columns of the saved rows and their chunk IDs, if made with these parameters"""
+        if self._minhashes is None or self._minhashes.params != params:
+            return None
+        return self._minhashes, np.asarray(self._base.ids)
+
+    def _write_minhashes(self, path: Path, live: List[int]):
+        """Save MinHash columns for the live rows, hashing only rows without one"""
+        deduplicator = ChunkDeduplicator()
+        stored = self.stored_minhashes(deduplicator.params())
+        rows = np.array(live, dtype=np.int64)
+        signatures = np.empty((len(rows), deduplicator.num_perm), dtype=np.uint32)
+        digests = np.empty(len(rows), dtype='S16')
+
+        carried = rows < (len(stored[0]) if stored is not None else 0)
+        if carried.any():
+            signatures[carried] = stored[0].signatures[rows[carried]]
+            digests[carried] = stored[0].digests()[rows[carried]]
+        for i in np.flatnonzero(~carried).tolist():
+            digests[i], signatures[i] = deduplicator.fingerprint(self._text(int(rows[i])))
+        MinHashColumns.write(path, signatures, digests, deduplicator.params())
+
+    def live_ids(self) -> np.ndarray:
+        """Chunk IDs of all live rows, ascending"""
+        ids = np.concatenate([
+            np.asarray(self._base.ids) if self._base is not None else np.zeros(0, dtype=np.int64),
+            np.array(self._tail_ids, dtype=np.int64)
+        ])
+        if self._deleted:
+            keep = np.ones(len(ids), dtype=bool)
+            keep[list(self._deleted)] = False
+            ids = ids[keep]
+        return ids
+
+    def _live_mask(self, start: int, stop: int) -> Optional[np.ndarray]:
+        """Mask of live rows in [start, stop), or None when none were removed"""
+        if not self._deleted:
+            return None
+        mask = np.ones(stop - start, dtype=bool)
+        mask[[row - start for row in self._deleted if start <= row < stop]] = False
+        return mask
+
+    def source_files_of(self, ids) -> np.ndarray:
+        """source_file of each chunk ID (object array of the same shape, None if absent)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = self._rows_for_ids(ids.ravel())
+        names = np.full(len(rows), None, dtype=object)
+        num_base = self._num_base()
+        in_base = (rows >= 0) & (rows < num_base)
+        if in_base.any():
+            names[in_base] = self._base.source_files_of(rows[in_base])
+        in_tail = rows >= num_base
+        if in_tail.any():
+            names[in_tail] = self._tail_columns.source_files_of(rows[in_tail] - num_base)
+        return names.reshape(ids.shape)
+
+    def count_by_source(self) -> Dict[str, int]:
+        """Number of live chunks per source file"""
+        num_base = self._num_base()
+        counts = {}
+        parts = [(self._tail_columns, self._live_mask(num_base, self._num_rows()))]
+        if self._base is not None:
+            parts.append((self._base, self._live_mask(0, num_base)))
+        for columns, mask in parts:
+            rows = np.flatnonzero(mask) if mask is not None else None
+            for name, count in columns.count_by_source(rows).items():
+                counts[name] = counts.get(name, 0) + count
+        return counts
+
+    @property
+    def index_spec(self) -> dict:
+        """Index type and parameters, as persisted with the store"""
+        return {'type': self.index_type, 'params': dict(self.index_params)}
+
+    # ------------------------------------------------------------------
+    # Index construction
+    # ------------------------------------------------------------------
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Vector store was loaded memory-mapped and is read-only; "
+                               "load it with mmap=False to modify it")
+
+    def _is_ivf(self) -> bool:
+        return self.index_type in ("ivf", "ivfpq")
+
+    def _reduces(self) -> bool:
+        """Whether a PCA projection is configured"""
+        return 0 < self.index_params['pca_dim'] < self.dimension
+
+    def _needs_training(self) -> bool:
+        return self._is_ivf() or self.index_type == "sq8" or self._reduces()
+
+    def _pca(self):
+        """The index's fitted PCA transform, or None"""
+        index = self.index
+        if isinstance(index, faiss.IndexIDMap2):
+            index = faiss.downcast_index(index.index)
+        if isinstance(index, faiss.IndexPreTransform):
+            return faiss.downcast_VectorTransform(index.chain.at(0))
+        return None
+
+    def _search_space(self, vectors: np.ndarray) -> np.ndarray:
+        """Vectors in the space search distances are measured in
+
+        That is the PCA space when the index projects, unless the hits are
+        rescored on the full vectors.
+        """
+        pca = self._pca()
+        if pca is None or self._rescores():
+            return vectors
+        return pca.apply(np.ascontiguousarray(vectors, dtype='float32'))
+
+    def _keeps_vectors(self) -> bool:
+        """Whether float vectors are stored next to the index, for rescoring"""
+        return self.index_type in COMPRESSED_INDEX_TYPES
+
+    def _rescores(self) -> bool:
+        return self._keeps_vectors() and (self._base is None or self._base.vectors is not None)
+
+    def _index_input(self, vectors: np.ndarray) -> np.ndarray:
+        """Vectors as the index takes them: sign bits, packed, for binary codes"""
+        if self.index_type == "binary":
+            return np.packbits(vectors > 0, axis=1)
+        return vectors
+
+    def _factory_string(self, num_train: int = 0) -> str:
+        """FAISS index_factory description for the configured index type
+
+        Flat and HNSW are wrapped in IndexIDMap2 for stable chunk IDs; IVF
+        indexes store IDs natively in their inverted lists.
+        """
+        params = self.index_params
+        pca = ""
+        if self._reduces():
+            if num_train >= params['pca_dim']:
+                pca = f"PCA{params['pca_dim']},"
+            else:
+                print(f"⚠️ Only {num_train} vectors: too few to fit PCA to {params['pca_dim']} "
+                      f"dimensions, keeping all {self.dimension} until rebuild()")
+
+        if self.index_type == "flat":
+            return f"IDMap2,{pca}Flat"
+        if self.index_type == "sq8":
+            return f"IDMap2,{pca}SQ8"
+        if self.index_type == "fp16":
+            return f"IDMap2,{pca}SQfp16"
+        if self.index_type == "hnsw":
+            return f"IDMap2,{pca}HNSW{params['hnsw_m']},Flat"
+
+        # Keep ~39 training points per centroid, as FAISS recommends
+        nlist = max(1, min(params['nlist'], num_train // 39))
+        if self.index_type == "ivf":
+            return f"{pca}IVF{nlist},Flat"
+
+        if num_train < 2 ** params['pq_nbits']:
+            print(f"⚠️ Only {num_train} vectors: too few to train PQ codebooks, "
+                  f"using IVF-Flat until rebuild()")
+            return f"{pca}IVF{nlist},Flat"
+        return f"{pca}IVF{nlist},PQ{params['pq_m']}x{params['pq_nbits']}"
+
+    def _create_index(self, num_train: int = 0):
+        if self.index_type == "binary":
+            if self.dimension % 8:
+                raise ValueError(f"Binary codes need a dimension divisible by 8, got {self.dimension}")
+            return faiss.IndexBinaryIDMap2(faiss.IndexBinaryFlat(self.dimension))
+
+        index = faiss.index_factory(self.dimension, self._factory_string(num_train))
+        if self.index_type == "hnsw":
+            self._hnsw(index).efConstruction = self.index_params['ef_construction']
+        elif self._is_ivf():
+            # Allow reconstruct() and remove_ids() by chunk ID
+            faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+
+    @staticmethod
+    def _hnsw(index):
+        """HNSW graph of an IDMap2-wrapped index, under the PCA transform if there is one"""
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexPreTransform):
+            inner = faiss.downcast_index(inner.index)
+        return inner.hnsw
+
+    def _apply_search_params(self):
+        """Set search-time knobs on the index itself"""
+        if self.index is None:
+            return
+        if self._is_ivf():
+            faiss.extract_index_ivf(self.index).nprobe = self.index_params['nprobe']
+        elif self.index_type == "hnsw":
+            self._hnsw(self.index).efSearch = self.index_params['ef_search']
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                          rescore_factor: Optional[int] = None):
+        """Change search-time parameters (persisted by save)"""
+        if nprobe is not None:
+            self.index_params['nprobe'] = nprobe
+        if ef_search is not None:
+            self.index_params['ef_search'] = ef_search
+        if rescore_factor is not None:
+            self.index_params['rescore_factor'] = max(1, rescore_factor)
+        self._apply_search_params()
+
+    def train(self):
+        """Train the index on the buffered vectors and index them"""
+        if self.index is not None or not self._pending_ids:
+            return
+
+        vectors = np.concatenate(self._pending_vectors)
+        ids = np.concatenate(self._pending_ids)
+        self._pending_vectors, self._pending_ids = [], []
+
+        print(f"🎯 Training {self.index_type} index on {len(vectors)} vectors...")
+        self.index = self._create_index(num_train=len(vectors))
+        self.index.train(vectors)
+        self.index.add_with_ids(self._index_input(vectors), ids)
+        self._apply_search_params()
+
+    def rebuild(self, vectors: Optional[np.ndarray] = None):
+        """Rebuild (and retrain) the index from the vectors it currently holds
+
+        Useful once an IVF index trained on an early, small corpus has grown,
+        or to drop deletions an HNSW graph can only mask. Vectors are
+        reconstructed from the index, which is lossy for ivfpq and under a
+        PCA projection; compressed index types retrain from their stored
+        float vectors. Pass `vectors` (one per live_ids(), in order) to
+        rebuild from exact embeddings instead.
+        """
+        self._check_writable()
+        self.train()
+        ids = self.live_ids()
+        if vectors is not None:
+            vectors = np.ascontiguousarray(vectors, dtype='float32')
+            if vectors.shape != (len(ids), self.dimension):
+                raise ValueError(f"Expected {len(ids)} x {self.dimension} vectors, got {vectors.shape}")
+        elif len(ids):
+            vectors = self.vectors_for_ids(ids)
+        else:
+            vectors = np.zeros((0, self.dimension), 'float32')
+
+        self._removed_ids = set()
+        if self._needs_training():
+            self.index = None
+            self._pending_vectors, self._pending_ids = [vectors], [ids]
+            self.train()
+        else:
+            print(f"🔨 Rebuilding {self.index_type} index with {len(ids)} vectors...")
+            self.index = self._create_index()
+            self.index.add_with_ids(self._index_input(vectors), ids)
+            self._apply_search_params()
+
+    def _train_size(self) -> int:
+        """Buffered vectors needed before training automatically"""
+        if self._is_ivf():
+            return self.index_params['nlist'] * 39
+        if self._reduces():
+            return config.PCA_TRAIN_SIZE
+        return config.SQ_TRAIN_SIZE
+
+    def _search_params(self, sel=None):
+        """Per-query FAISS search parameters"""
+        if self._is_ivf():
+            return faiss.SearchParametersIVF(nprobe=self.index_params['nprobe'], sel=sel)
+        if self.index_type == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=self.index_params['ef_search'], sel=sel)
+        return faiss.SearchParameters(sel=sel) if sel is not None else None
+
+    # ------------------------------------------------------------------
+    # Adding and removing documents
+    # ------------------------------------------------------------------
+
+    def add_documents(self, texts: List[str], embeddings, metadatas: List[dict],
+                      verbose: bool = True) -> List[int]:
+        """Add documents to the vector store, returning their chunk IDs
+
+        Embeddings may be a list of lists or a numpy matrix; float32
+        matrices are indexed without copying.
+        """
+        self._check_writable()
+        if verbose:
+            print(f"\n📥 Adding {len(texts)} documents to vector store...")
+
         # Convert embeddings to numpy array
-        embeddings_array = np.array(embeddings).astype('float32')
-        
-        # Add to FAISS index
-        self.index.add(embeddings_array)
-        
+        embeddings_array = np.ascontiguousarray(embeddings, dtype='float32')
+
+        # Assign stable IDs and add to FAISS index (or buffer until trained)
+        ids = np.arange(self.next_id, self.next_id + len(texts), dtype='int64')
+        self.next_id += len(texts)
+        self.version = uuid.uuid4().hex
+        if self._keeps_vectors():
+            self._tail_vectors.append(embeddings_array.copy())
+        if self.index is not None:
+            self.index.add_with_ids(self._index_input(embeddings_array), ids)
+        else:
+            self._pending_vectors.append(embeddings_array.copy())
+            self._pending_ids.append(ids)
+            if sum(len(p) for p in self._pending_ids) >= self._train_size():
+                self.train()
+
+        self._lexical_index().add(ids.tolist(), texts)
+
         # Store texts and metadata
-        self.texts.extend(texts)
-        self.metadatas.extend(metadatas)
-        
-        print(f"✅ Total documents in store: {self.index.ntotal}")
-    
-    def search(self, query_embedding: List[float], k: int = 5) -> List[Tuple[str, dict, float]]:
+        for chunk_id, text in zip(ids.tolist(), texts):
+            self._tail_rows[chunk_id] = self._num_rows()
+            self._tail_ids.append(chunk_id)
+            self._tail_texts.append(text)
+        self._tail_columns.extend(metadatas)
+
+        if verbose:
+            print(f"✅ Total documents in store: {len(self)}")
+        return ids.tolist()
+
+    def add_duplicates(self, chunk_id: int, metadatas: List[dict]):
+        """Record chunks dropped as duplicates of a stored chunk"""
+        self._check_writable()
+        self.duplicates.setdefault(int(chunk_id), []).extend(dict(m) for m in metadatas)
+
+    def vectors_for_ids(self, ids: np.ndarray) -> np.ndarray:
+        """Vectors of live chunk IDs: the stored float vectors, else the pending buffers or the index"""
+        ids = np.asarray(ids, dtype='int64')
+        if self._rescores():
+            return self._row_vectors(self._rows_for_ids(ids))
+        vectors = np.zeros((len(ids), self.dimension), dtype='float32')
+        found = np.zeros(len(ids), dtype=bool)
+        for pending_vectors, pending_ids in zip(self._pending_vectors, self._pending_ids):
+            hits = np.isin(ids, pending_ids)
+            if hits.any():
+                positions = {chunk_id: i for i, chunk_id in enumerate(pending_ids.tolist())}
+                vectors[hits] = pending_vectors[[positions[chunk_id] for chunk_id in ids[hits].tolist()]]
+                found |= hits
+        if not found.all():
+            vectors[~found] = self.index.reconstruct_batch(ids[~found])
+        return vectors
+
+    def lossless_vectors(self) -> bool:
+        """Whether vectors_for_ids() returns the embeddings exactly as added"""
+        return self._rescores() or (self._pca() is None and self.index_type != "ivfpq")
+
+    def texts_for_ids(self, ids) -> List[str]:
+        """Texts of live chunk IDs"""
+        return [self._text(row) for row in self._rows_for_ids(np.asarray(ids, dtype='int64')).tolist()]
+
+    def detach_duplicates(self, source_file: str) -> Dict[int, List[dict]]:
+        """Remove and return the back-references of a source file's dropped duplicates, by chunk ID"""
+        detached = {}
+        for chunk_id in list(self.duplicates):
+            refs = []
+            for ref in self.duplicates[chunk_id]:
+                if ref.get('source_file') == source_file:
+                    detached.setdefault(chunk_id, []).append(ref)
+                else:
+                    refs.append(ref)
+            if refs:
+                self.duplicates[chunk_id] = refs
+            else:
+                del self.duplicates[chunk_id]
+        return detached
+
+    def attach_duplicates(self, refs: Dict[int, List[dict]]):
+        """Put back references returned by detach_duplicates()"""
+        for chunk_id, chunk_refs in refs.items():
+            self.add_duplicates(chunk_id, chunk_refs)
+
+    def _rehome_duplicates(self, texts: List[str], vectors: np.ndarray, refs: List[List[dict]]):
+        """Add removed chunks back under their first back-reference, which takes the rest"""
+        ids = self.add_documents(texts, vectors, [chunk_refs[0] for chunk_refs in refs], verbose=False)
+        for chunk_id, chunk_refs in zip(ids, refs):
+            if len(chunk_refs) > 1:
+                self.duplicates[chunk_id] = chunk_refs[1:]
+            entry = self.manifest.get(chunk_refs[0].get('source_file'))
+            if entry is not None:
+                entry['num_chunks'] += 1
+        print(f"♻️ Kept {len(ids)} chunks still repeated by other sources")
+
+    def is_current(self, source_file: str, content_hash: str) -> bool:
+        """Check whether a file was already ingested with this content hash"""
+        entry = self.manifest.get(source_file)
+        return entry is not None and entry['content_hash'] == content_hash
+
+    def upsert_documents(self, source_file: str, content_hash: str, texts: List[str],
+                         embeddings, metadatas: List[dict]) -> List[int]:
+        """Replace all chunks of a source file and record it in the manifest"""
+        self.remove_source(source_file)
+        ids = self.add_documents(texts, embeddings, metadatas) if texts else []
+        self.record_source(source_file, content_hash)
+        return ids
+
+    def record_source(self, source_file: str, content_hash: str):
+        """Record a fully ingested source file in the manifest"""
+        self.manifest[source_file] = {
+            'content_hash': content_hash,
+            'num_chunks': len(self._rows_for_source(source_file)),
+            'ingested_at': time.time()
+        }
+
+    def source_ids(self, source_file: str) -> np.ndarray:
+        """Chunk IDs of a source file's live chunks"""
+        rows = self._rows_for_source(source_file)
+        return np.array([self._chunk_id(row) for row in rows.tolist()], dtype='int64')
+
+    def remove_source(self, source_file: str) -> int:
+        """Remove all chunks of a source file, returning how many were removed"""
+        self._check_writable()
+        self.manifest.pop(source_file, None)
+        if self.duplicates:
+            self.detach_duplicates(source_file)
+        removed = self.remove_chunks(self.source_ids(source_file))
+        if removed:
+            print(f"🗑️ Removed {removed} chunks of {source_file}")
+        return removed
+
+    def remove_chunks(self, ids) -> int:
+        """Remove chunks by ID, returning how many were removed
+
+        The manifest is left alone. Removed chunks that other sources were
+        deduplicated against are added back under their first back-reference.
+        """
+        self._check_writable()
+        ids = np.asarray(ids, dtype='int64')
+        rows = self._rows_for_ids(ids)
+        ids_array, rows = ids[rows >= 0], rows[rows >= 0]
+        if not len(rows):
+            return 0
+
+        rehome = None
+        orphans = np.array([chunk_id for chunk_id in ids_array.tolist() if chunk_id in self.duplicates],
+                           dtype='int64')
+        if len(orphans):
+            texts = [self._text(row) for row in self._rows_for_ids(orphans).tolist()]
+            rehome = (texts, self.vectors_for_ids(orphans),
+                      [self.duplicates.pop(chunk_id) for chunk_id in orphans.tolist()])
+
+        if self._pending_ids:
+            keep = [~np.isin(pending, ids_array) for pending in self._pending_ids]
+            self._pending_vectors = [v[m] for v, m in zip(self._pending_vectors, keep)]
+            self._pending_ids = [i[m] for i, m in zip(self._pending_ids, keep)]
+        if self.index is not None:
+            if self.index_type == "hnsw":
+                # HNSW graphs can't delete; mask the IDs until compact() rebuilds
+                self._removed_ids.update(ids_array.tolist())
+            else:
+                self.index.remove_ids(ids_array)
+        self._lexical_index().remove(ids_array.tolist())
+
+        # Tombstone the rows; compact() or save() reclaims them
+        self._deleted.update(rows.tolist())
+        self.version = uuid.uuid4().hex
+
+        if rehome is not None:
+            self._rehome_duplicates(*rehome)
+        return len(rows)
+
+    def compact(self):
+        """Reclaim rows left behind by removals, keeping chunk IDs unchanged
+
+        In-memory rows are dropped right away; rows of a memory-mapped store
+        are dropped when save() rewrites the chunk files.
+        """
+        if self._removed_ids:
+            # Rebuild indexes that can only mask deletions
+            self.rebuild()
+
+        if not self._deleted or self._base is not None:
+            return
+
+        removed = len(self._deleted)
+        live = [row for row in range(len(self._tail_ids)) if row not in self._deleted]
+        ids = [self._tail_ids[row] for row in live]
+        texts = [self._tail_texts[row] for row in live]
+        columns = self._tail_columns.take(live)
+        vectors = [self._tail_matrix()[live]] if self._keeps_vectors() else []
+
+        self._reset_rows()
+        self._tail_rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self._tail_ids, self._tail_texts, self._tail_columns = ids, texts, columns
+        self._tail_vectors = vectors
+
+        print(f"🧹 Compacted {removed} removed chunks")
+
+    def sources(self) -> List[str]:
+        """Source files currently in the store"""
+        return sorted(self.count_by_source())
+
+    # ------------------------------------------------------------------
+    # Metadata filters
+    # ------------------------------------------------------------------
+
+    def _filtered_ids(self, key: tuple) -> np.ndarray:
+        """Chunk IDs of live rows passing a filter key, ascending"""
+        num_base = self._num_base()
+        parts = []
+        if self._base is not None:
+            mask = self._base.filter_rows(*key)
+            live = self._live_mask(0, num_base)
+            if live is not None:
+                mask &= live
+            parts.append(np.asarray(self._base.ids)[mask])
+        mask = self._tail_columns.filter_rows(*key)
+        live = self._live_mask(num_base, self._num_rows())
+        if live is not None:
+            mask &= live
+        parts.append(np.array(self._tail_ids, dtype=np.int64)[mask])
+        return np.concatenate(parts)
+
+    @staticmethod
+    def _id_selector(ids: np.ndarray):
+        """FAISS selector for sorted chunk IDs, plus the bitmap backing it
+
+        A source file's chunks are added together and get one contiguous ID
+        range, so a range check usually suffices; anything else gets a
+        bitmap over the ID space (one bit per ID).
+        """
+        if ids[-1] - ids[0] + 1 == len(ids):
+            return faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1), None
+        mask = np.zeros(int(ids[-1]) + 1, dtype=bool)
+        mask[ids] = True
+        bitmap = np.packbits(mask, bitorder='little')
+        return faiss.IDSelectorBitmap(bitmap), bitmap
+
+    def _filter(self, filters: Optional[dict]) -> Optional[tuple]:
+        """(chunk IDs, selector) for filters, cached until the contents change"""
+        key = _filter_key(filters)
+        if key is None:
+            return None
+        with self._filter_lock:
+            if self._filter_cache_version != self.version:
+                self._filter_cache.clear()
+                self._filter_cache_version = self.version
+            cached = self._filter_cache.get(key)
+            if cached is not None:
+                self._filter_cache.move_to_end(key)
+                return cached[:2]
+
+        ids = self._filtered_ids(key)
+        selector, bitmap = self._id_selector(ids) if len(ids) else (None, None)
+        with self._filter_lock:
+            self._filter_cache[key] = (ids, selector, bitmap)
+            while len(self._filter_cache) > config.FILTER_CACHE_SIZE:
+                self._filter_cache.popitem(last=False)
+        return ids, selector
+
+    def _exact_search(self, query_array: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force search over a few chunks, using their stored or reconstructed vectors"""
+        vectors = self._search_space(self.vectors_for_ids(ids))
+        distances, positions = faiss.knn(self._search_space(query_array), vectors, min(k, len(ids)))
+        return distances, np.where(positions >= 0, ids[positions], -1)
+
+    def _index_search(self, query_array: np.ndarray, k: int, sel=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the index; compressed codes give a shortlist rescored on the float vectors"""
+        if not self._rescores():
+            return self.index.search(self._index_input(query_array), k, params=self._search_params(sel))
+
+        shortlist = k * self.index_params['rescore_factor']
+        _, candidates = self.index.search(self._index_input(query_array), shortlist, params=self._search_params(sel))
+        rows = self._rows_for_ids(candidates.ravel()).reshape(candidates.shape)
+
+        distances = np.full((len(query_array), k), np.inf, dtype='float32')
+        indices = np.full((len(query_array), k), -1, dtype='int64')
+        for i, (query, query_candidates, query_rows) in enumerate(zip(query_array, candidates, rows)):
+            valid = query_rows >= 0
+            exact = np.sum((self._row_vectors(query_rows[valid]) - query) ** 2, axis=1)
+            best = np.argsort(exact, kind='stable')[:k]
+            distances[i, :len(best)] = exact[best]
+            indices[i, :len(best)] = query_candidates[valid][best]
+        return distances, indices
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query_embedding: List[float], k: int = 5,
+               filters: Optional[dict] = None) -> List[Tuple[str, dict, float]]:
         """Search for similar documents"""
-        query_array = np.array([query_embedding]).astype('float32')
-        
-        # Search FAISS index
-        distances, indices = self.index.search(query_array, k)
-        
-        # Prepare results
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.texts):
-                results.append({
-                    'text': self.texts[idx],
-                    'metadata': self.metadatas[idx],
-                    'distance': float(distances[0][i])
-                })
-        
-        return results
-    
-    def save(self, path: str):
-        """Save vector store to disk"""
+        return self.search_batch([query_embedding], k=k, filters=filters)[0]
+
+    def search_batch(self, query_embeddings, k: int = 5, filters: Optional[dict] = None) -> List[List[dict]]:
+        """Search for several queries in one FAISS call
+
+        Filters restrict results to matching chunks inside FAISS: an ID
+        selector skips every other vector, so no over-fetching is needed.
+        Subsets of at most FILTER_EXACT_MAX chunks are searched exactly on
+        their reconstructed vectors instead, because an ANN index probing
+        only part of the data could find fewer than k of them.
+
+        Args:
+            query_embeddings: (n, dimension) matrix or list of query vectors
+            k: Results per query
+            filters: Optional dict with any of
+                source_file: file name or list of file names
+                language: language code or list of codes (e.g. "ar", "en")
+                page_range: (first, last) pages, inclusive; either may be None
+
+        Returns:
+            One result list per query, in the same format as search()
+        """
+        self.train()
+        query_array = np.ascontiguousarray(query_embeddings, dtype='float32').reshape(-1, self.dimension)
+        if self.index is None:
+            return [[] for _ in range(len(query_array))]
+
+        allowed = self._filter(filters)
+        if allowed is not None:
+            # Filtered IDs are live rows only, so deletions are excluded too
+            ids, sel = allowed
+            if not len(ids):
+                return [[] for _ in range(len(query_array))]
+            if self.index_type != "flat" and len(ids) <= config.FILTER_EXACT_MAX:
+                distances, indices = self._exact_search(query_array, ids, k)
+            else:
+                distances, indices = self._index_search(query_array, k, sel)
+        else:
+            # Mask deletions that the index couldn't apply
+            sel = None
+            if self._removed_ids:
+                sel = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.array(list(self._removed_ids), dtype='int64')))
+
+            # Search FAISS index
+            distances, indices = self._index_search(query_array, k, sel)
+
+        # Prepare results, decoding only the rows that were hit
+        rows = self._rows_for_ids(indices.ravel()).reshape(indices.shape)
+        all_results = []
+        for query_distances, query_indices, query_rows in zip(distances, indices, rows):
+            results = []
+            for distance, chunk_id, row in zip(query_distances.tolist(), query_indices.tolist(), query_rows.tolist()):
+                if row >= 0:
+                    results.append({
+                        'id': chunk_id,
+                        'text': self._text(row),
+                        'metadata': self._result_metadata(row),
+                        'distance': distance
+                    })
+            all_results.append(results)
+
+        return all_results
+
+    def _lexical_index(self) -> LexicalIndex:
+        """The BM25 index, built from the stored texts for stores saved without one"""
+        if self.lexical is None:
+            print("🔤 Building lexical index...")
+            self.lexical = LexicalIndex()
+            live = [row for row in range(self._num_rows()) if row not in self._deleted]
+            self.lexical.add((self._chunk_id(row) for row in live), (self._text(row) for row in live))
+        return self.lexical
+
+    def hybrid_search(self, query: str, query_embedding: List[float], k: int = 5,
+                      filters: Optional[dict] = None) -> List[dict]:
+        """Search with BM25 and the vector index, fusing the rankings"""
+        return self.hybrid_search_batch([query], [query_embedding], k=k, filters=filters)[0]
+
+    def hybrid_search_batch(self, queries: List[str], query_embeddings, k: int = 5,
+                            candidates: int = config.HYBRID_CANDIDATES,
+                            rrf_k: int = config.RRF_K,
+                            filters: Optional[dict] = None) -> List[List[dict]]:
+        """Hybrid lexical + dense search using reciprocal rank fusion
+
+        Each query takes the top `candidates` of the vector index and of the
+        BM25 index; a chunk scores sum(1 / (rrf_k + rank)) over the rankings
+        it appears in. Results carry the usual 'distance' (computed from the
+        stored vector for lexical-only hits) plus the fused 'score'.
+        Filters (see search_batch) apply to both rankings.
+        """
+        query_array = np.ascontiguousarray(query_embeddings, dtype='float32').reshape(-1, self.dimension)
+        dense = self.search_batch(query_array, k=max(k, candidates), filters=filters)
+        lexical = self._lexical_index()
+        allowed = self._filter(filters)
+        allowed_ids = allowed[0] if allowed is not None else None
+
+        all_results = []
+        for query, query_vector, dense_results in zip(queries, query_array, dense):
+            fused = {}
+            by_id = {}
+            for rank, result in enumerate(dense_results):
+                fused[result['id']] = 1.0 / (rrf_k + rank + 1)
+                by_id[result['id']] = result
+
+            lexical_ids, _ = lexical.search(query, k=max(k, candidates), allowed_ids=allowed_ids)
+            for rank, chunk_id in enumerate(lexical_ids.tolist()):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+            top = sorted(fused, key=fused.get, reverse=True)[:k]
+
+            # Distances for chunks only the lexical ranking found
+            missing = np.array([chunk_id for chunk_id in top if chunk_id not in by_id], dtype='int64')
+            if len(missing):
+                rows = self._rows_for_ids(missing)
+                vectors = self._search_space(self.vectors_for_ids(missing))
+                distances = np.sum((vectors - self._search_space(query_vector[None, :])) ** 2, axis=1)
+                for chunk_id, row, distance in zip(missing.tolist(), rows.tolist(), distances.tolist()):
+                    if row >= 0:
+                        by_id[chunk_id] = {
+                            'id': chunk_id,
+                            'text': self._text(row),
+                            'metadata': self._result_metadata(row),
+                            'distance': distance
+                        }
+
+            all_results.append([
+                {**by_id[chunk_id], 'score': fused[chunk_id]} for chunk_id in top if chunk_id in by_id
+            ])
+
+        return all_results
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Whether a store was saved at path"""
+        path = Path(path)
+        return (path / CURRENT_FILE).exists() or (path / "index.faiss").exists()
+
+    @staticmethod
+    def _current_path(path: Path) -> Path:
+        """Directory of the version CURRENT points at (path itself for stores saved before versions)"""
+        current = path / CURRENT_FILE
+        if current.exists():
+            return path / current.read_text(encoding="utf-8").strip()
+        return path
+
+    def save(self, path: str) -> Path:
+        """Save vector store to disk, returning the directory written
+
+        Each save writes a new version directory inside `path` and then
+        atomically replaces the CURRENT pointer file, so `path` always
+        holds a complete store. Readers that loaded the previous version
+        keep working: it is only deleted by the save after this one.
+        """
+        self._check_writable()
         path = Path(path)
+        self.train()
+        if self._removed_ids:
+            self.rebuild()
+        if self.index is None:
+            self.index = self._create_index()
+
         path.mkdir(parents=True, exist_ok=True)
-        
+        previous = self._current_path(path)
+        version_path = path / f"v-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        version_path.mkdir()
+
         # Save FAISS index
-        faiss.write_index(self.index, str(path / "index.faiss"))
-        
-        # Save texts and metadata
-        with open(path / "data.pkl", "wb") as f:
-            pickle.dump({
-                'texts': self.texts,
-                'metadatas': self.metadatas,
-                'dimension': self.dimension
-            }, f)
-        
-        print(f"✅ Vector store saved to {path}")
-    
-    def load(self, path: str):
-        """Load vector store from disk"""
-        path = Path(path)
-        
-        # Load FAISS index
-        self.index = faiss.read_index(str(path / "index.faiss"))
-        
-        # Load texts and metadata
-        with open(path / "data.pkl", "rb") as f:
-            data = pickle.load(f)
-            self.texts = data['texts']
-            self.metadatas = data['metadatas']
+        if self.index_type == "binary":
+            faiss.write_index_binary(self.index, str(version_path / "index.faiss"))
+        else:
+            faiss.write_index(self.index, str(version_path / "index.faiss"))
+
+        # Save texts and metadata (live rows only)
+        self._lexical_index().save(version_path)
+        live = [row for row in range(self._num_rows()) if row not in self._deleted]
+        ChunkStore.write(
+            version_path,
+            (self._chunk_id(row) for row in live),
+            (self._text(row) for row in live),
+            (self._metadata(row) for row in live)
+        )
+        if self._keeps_vectors():
+            live_rows = np.array(live, dtype=np.int64)
+            ChunkStore.write_vectors(
+                version_path,
+                (self._row_vectors(block) for block in np.array_split(live_rows, max(1, len(live_rows) // 65536))),
+                len(live_rows), self.dimension
+            )
+        if config.DEDUP:
+            self._write_minhashes(version_path, live)
+        with open(version_path / STORE_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                'format_version': STORE_FORMAT_VERSION,
+                'dimension': self.dimension,
+                'next_id': self.next_id,
+                'version': self.version,
+                'manifest': self.manifest,
+                'index_spec': self.index_spec
+            }, f, ensure_ascii=False, indent=2)
+        with open(version_path / DUPLICATES_FILE, "w", encoding="utf-8") as f:
+            json.dump({str(chunk_id): refs for chunk_id, refs in self.duplicates.items()}, f, ensure_ascii=False)
+
+        # Swap the new version in with one atomic rename
+        pointer = path / (CURRENT_FILE + ".tmp")
+        pointer.write_text(version_path.name, encoding="utf-8")
+        os.replace(pointer, path / CURRENT_FILE)
+
+        # Keep the previous version for readers still loading it; drop older ones
+        for entry in path.iterdir():
+            if entry.is_dir() and entry.name.startswith("v-") and entry not in (version_path, previous):
+                shutil.rmtree(entry, ignore_errors=True)
+            elif entry.is_file() and entry.name in LEGACY_FILES and previous != path:
+                entry.unlink()   # files of a store saved before versions
+
+        # Serve rows from the files just written instead of memory
+        self._base = ChunkStore(version_path)
+        self._minhashes = MinHashColumns(version_path) if MinHashColumns.exists(version_path) else None
+        self._reset_rows()
+        self.lexical = LexicalIndex.load(version_path)
+
+        print(f"✅ Vector store saved to {path} ({version_path.name})")
+        return version_path
+
+    def _read_index(self, index_file: Path, mmap: bool):
+        """Read index.faiss, memory-mapping it when the index type allows"""
+        read = faiss.read_index_binary if self.index_type == "binary" else faiss.read_index
+        if mmap:
+            # IVF inverted lists map with IO_FLAG_MMAP; flat codes (Flat, SQ,
+            # binary and the HNSW storage) with IO_FLAG_MMAP_IFC on recent FAISS builds
+            flag = faiss.IO_FLAG_MMAP if self._is_ivf() else getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+            if flag is not None:
+                try:
+                    return read(str(index_file), flag), True
+                except RuntimeError as e:
+                    print(f"⚠️ Could not memory-map {index_file}, reading it into memory: {e}")
+        return read(str(index_file)), False
+
+    def load(self, path: str, mmap: bool = False):
+        """Load vector store from disk
+
+        Only the index is read; chunk texts and metadata are memory-mapped.
+        With mmap=True the index is mapped too and the store is read-only.
+        Stores written by older versions (data.pkl) are loaded into memory.
+        """
+        path = self._current_path(Path(path))
+
+        self._base = None
+        self._minhashes = None
+        self._reset_rows()
+
+        if (path / STORE_FILE).exists():
+            with open(path / STORE_FILE, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dimension = meta['dimension']
+            self.next_id = meta['next_id']
+            self.version = meta.get('version', uuid.uuid4().hex)
+            self.manifest = meta['manifest']
+            index_spec = meta['index_spec']
+            self._base = ChunkStore(path)
+            self._minhashes = MinHashColumns(path) if MinHashColumns.exists(path) else None
+            self.lexical = LexicalIndex.load(path) if LexicalIndex.exists(path) else None
+            self.duplicates = {}
+            if (path / DUPLICATES_FILE).exists():
+                with open(path / DUPLICATES_FILE, encoding="utf-8") as f:
+                    self.duplicates = {int(chunk_id): refs for chunk_id, refs in json.load(f).items()}
+        else:
+            # Load texts and metadata
+            with open(path / "data.pkl", "rb") as f:
+                data = pickle.load(f)
             self.dimension = data['dimension']
-        
-        print(f"✅ Loaded {self.index.ntotal} documents from {path}")
\ No newline at end of file
+            self.next_id = data.get('next_id', len(data['texts']))
+            self.version = uuid.uuid4().hex
+            self.manifest = data.get('manifest', {})
+            index_spec = data.get('index_spec', {'type': 'flat', 'params': {}})
+
+            ids = data.get('ids', list(range(len(data['texts']))))
+            self._tail_rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+            self._tail_ids, self._tail_texts = list(ids), data['texts']
+            self._tail_columns = MetadataBuilder(
+                # Older stores have no language metadata; detect it as ingestion does
+                {'language': detect_language(text), **metadata}
+                for text, metadata in zip(data['texts'], data['metadatas'])
+            )
+            self.lexical = None
+            self.duplicates = {}
+            mmap = False
+
+        self.index_type = index_spec['type']
+        self.index_params = {**default_index_params(), **index_spec['params']}
+
+        # Load FAISS index
+        self.index, self.read_only = self._read_index(path / "index.faiss", mmap)
+
+        # Stores saved before chunk IDs existed hold a bare IndexFlatL2
+        if isinstance(self.index, faiss.IndexFlat):
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(self.dimension))
+            self.index.add_with_ids(vectors, np.array(self._tail_ids, dtype='int64'))
+        if not self.index.is_trained:
+            self.index = None  # saved empty; trained on the first vectors added
+        self._apply_search_params()
+
+        self._pending_vectors = []
+        self._pending_ids = []
+        self._removed_ids = set()
+        self._filter_cache_version = None
+
+        mode = ", memory-mapped" if self.read_only else ""
+        print(f"✅ Loaded {len(self)} documents from {path} (index: {self.index_type}{mode})")
@@ -31,32 +31,54 @@ class RAGEvaluator:
         self.embedder = EmbeddingGenerator(model_name="intfloat/multilingual-e5-large")
         
         print("\n✅ System loaded successfully")
-        print(f"   Documents in store: {len(self.vector_store.texts)}")
+        print(f"   Documents in store: {len(self.vector_store)}")
         print(f"   Embedding dimension: {self.embedder.dimension}")
     
-        
-    def calculate_precision_at_k(self, results: List[Dict], expected_source: str, k: int = 5) -> float:
-        """Calculate Precision@K"""
-        if expected_source is None:
-            return None  # Can't calculate without ground truth
-        
-        relevant_count = 0
-        for result in results[:k]:
-            if expected_source in result['metadata'].get('source_file', ''):
-                relevant_count += 1
-        
-        return relevant_count / k
+    def retrieve_batch(self, queries: List[str], k: int) -> Tuple[List[List[Dict]], float]:
+        """Embed and search all queries in one batch, returning results and elapsed time"""
+        if not queries:
+            return [], 0.0
+        
+        start_time = time.time()
+        query_embeddings = self.embedder.generate_query_embeddings(queries)
+        results = self.vector_store.search_batch(query_embeddings, k=k)
+        elapsed = time.time() - start_time
+        return results, elapsed
+        
+    def source_relevance(self, all_retrieved: List[List[Dict]], expected_sources: List[str], k: int) -> np.ndarray:
+        """(queries, k) boolean matrix: hit j of query i comes from its expected source
+        
+        Hit sources are read from the store's metadata columns by chunk ID, and
+        the substring test runs once per distinct source file, not per hit.
+        """
+        ids = np.full((len(all_retrieved), k), -1, dtype=np.int64)
+        for i, retrieved in enumerate(all_retrieved):
+            hits = [result['id'] for result in retrieved[:k]]
+            ids[i, :len(hits)] = hits
+        
+        names = self.vector_store.source_files_of(ids)
+        names = np.where(np.equal(names, None), "", names).astype(str)
+        distinct, codes = np.unique(names, return_inverse=True)
+        codes = codes.reshape(names.shape)
+        
+        relevance = np.zeros(ids.shape, dtype=bool)
+        expected_sources = np.array([e or "" for e in expected_sources], dtype=str)
+        for expected in set(expected_sources.tolist()) - {""}:
+            matches = np.array([bool(name) and expected in name for name in distinct.tolist()])
+            rows = expected_sources == expected
+            relevance[rows] = matches[codes[rows]]
+        return relevance
     
-    def calculate_mrr(self, results: List[Dict], expected_source: str) -> float:
-        """Calculate Mean Reciprocal Rank"""
-        if expected_source is None:
-            return None
-        
-        for rank, result in enumerate(results, 1):
-            if expected_source in result['metadata'].get('source_file', ''):
-                return 1.0 / rank
-        
-        return 0.0  # Not found
+    @staticmethod
+    def calculate_precision_at_k(relevance: np.ndarray, k: int = 5) -> np.ndarray:
+        """Precision@K per query, from a source_relevance matrix"""
+        return relevance[:, :k].sum(axis=1) / k
+    
+    @staticmethod
+    def calculate_mrr(relevance: np.ndarray) -> np.ndarray:
+        """Reciprocal rank of the first relevant hit per query (0 if none)"""
+        found = relevance.any(axis=1)
+        return np.where(found, 1.0 / (relevance.argmax(axis=1) + 1), 0.0)
     
     def test_retrieval_quality(self, test_cases: List[Dict], k: int = 3) -> Dict:
         """Test retrieval performance"""
@@ -71,29 +93,27 @@ class RAGEvaluator:
             'response_times': []
         }
         
-        for i, test_case in enumerate(test_cases, 1):
+        # Embed and search all queries in one batch, then score them together
+        all_retrieved, elapsed = self.retrieve_batch([tc['query'] for tc in test_cases], k=k)
+        relevance = self.source_relevance(all_retrieved, [tc['expected_source'] for tc in test_cases], k)
+        precisions = self.calculate_precision_at_k(relevance, k)
+        reciprocal_ranks = self.calculate_mrr(relevance)
+        
+        for i, (test_case, retrieved) in enumerate(zip(test_cases, all_retrieved), 1):
             query = test_case['query']
             expected_source = test_case['expected_source']
             
             print(f"\n[{i}/{len(test_cases)}] Testing: {query[:50]}...")
             
-            # Measure retrieval time
-            start_time = time.time()
-            query_embedding = self.embedder.generate_embedding(query)
-            retrieved = self.vector_store.search(query_embedding, k=k)
-            elapsed = time.time() - start_time
-            
-            results['response_times'].append(elapsed)
+            # Amortized retrieval time per query
+            results['response_times'].append(elapsed / len(test_cases))
             
             # Calculate metrics
             if expected_source:
-                precision = self.calculate_precision_at_k(retrieved, expected_source, k)
-                mrr = self.calculate_mrr(retrieved, expected_source)
-                
-                if precision is not None:
-                    results['precision_scores'].append(precision)
-                if mrr is not None:
-                    results['mrr_scores'].append(mrr)
+                precision = float(precisions[i - 1])
+                mrr = float(reciprocal_ranks[i - 1])
+                results['precision_scores'].append(precision)
+                results['mrr_scores'].append(mrr)
             
             # Store best distance
             if retrieved:
@@ -138,10 +158,8 @@ class RAGEvaluator:
         false_positives = 0  # Unanswerable but passes threshold
         
         print(f"\nTesting {len(answerable_queries)} answerable queries...")
-        for test_case in answerable_queries:
-            query_embedding = self.embedder.generate_embedding(test_case['query'])
-            results = self.vector_store.search(query_embedding, k=1)
-            
+        answerable_results, _ = self.retrieve_batch([tc['query'] for tc in answerable_queries], k=1)
+        for test_case, results in zip(answerable_queries, answerable_results):
             if results:
                 distance = results[0]['distance']
                 if distance < threshold:
@@ -151,10 +169,8 @@ class RAGEvaluator:
                     print(f"   ❌ False Negative: '{test_case['query'][:40]}...' (distance: {distance:.4f})")
         
         print(f"\nTesting {len(unanswerable_queries)} unanswerable queries...")
-        for test_case in unanswerable_queries:
-            query_embedding = self.embedder.generate_embedding(test_case['query'])
-            results = self.vector_store.search(query_embedding, k=1)
-            
+        unanswerable_results, _ = self.retrieve_batch([tc['query'] for tc in unanswerable_queries], k=1)
+        for test_case, results in zip(unanswerable_queries, unanswerable_results):
             if results:
                 distance = results[0]['distance']
                 if distance >= threshold:
@@ -219,17 +235,15 @@ class RAGEvaluator:
         
         # Test same-language
         same_lang_distances = []
-        for test_case in same_language:
-            query_embedding = self.embedder.generate_embedding(test_case['query'])
-            results = self.vector_store.search(query_embedding, k=3)
+        same_lang_results, _ = self.retrieve_batch([tc['query'] for tc in same_language], k=3)
+        for results in same_lang_results:
             if results:
                 same_lang_distances.append(results[0]['distance'])
         
         # Test cross-lingual
         cross_lang_distances = []
-        for test_case in cross_language:
-            query_embedding = self.embedder.generate_embedding(test_case['query'])
-            results = self.vector_store.search(query_embedding, k=3)
+        cross_lang_results, _ = self.retrieve_batch([tc['query'] for tc in cross_language], k=3)
+        for test_case, results in zip(cross_language, cross_lang_results):
             if results:
                 cross_lang_distances.append(results[0]['distance'])
                 print(f"\n   Query: {test_case['query'][:50]}...")
@@ -263,9 +277,9 @@ class RAGEvaluator:
         
         print(f"\nGenerating embeddings for {num_texts} texts...")
         
-        # Single embedding
+        # Single embedding (bypassing the query cache to time the model)
         start = time.time()
-        self.embedder.generate_embedding(sample_texts[0])
+        self.embedder.generate_embedding(sample_texts[0], use_cache=False)
         single_time = time.time() - start
         
         # Batch embedding
@@ -319,6 +333,11 @@ class RAGEvaluator:
         print(f"   Avg Response Time: {np.mean(retrieval_results['response_times']):.3f}s")
         print(f"   Batch Speedup: {embedding_results['speedup']:.1f}x")
         
+        query_cache = self.embedder.query_cache_stats()
+        print(f"   Query Cache: {query_cache['hits']} hits, {query_cache['misses']} misses "
+              f"({query_cache['hit_rate']:.0%} hit rate)")
+        self.embedder.flush_cache()
+        
         print("\n✅ Evaluation complete!")
 
 
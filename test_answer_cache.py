@@ -0,0 +1,63 @@
+"""
+Answer Cache Tests
+Similarity lookup, context matching, expiry and invalidation
+"""
+
+import numpy as np
+
+from src.answer_cache import AnswerCache
+
+
+def _vector(*values) -> np.ndarray:
+    return np.array(values, dtype=np.float32)
+
+
+CHUNKS = [{'id': 3}, {'id': 1}]
+KEY = AnswerCache.context_key(CHUNKS)
+
+
+def test_similar_query_over_same_context_hits():
+    cache = AnswerCache(threshold=0.95)
+    cache.put(_vector(1, 0, 0), KEY, "v1", "answer")
+    assert cache.get(_vector(10, 0.5, 0), KEY, "v1") == "answer"   # cosine ~0.999
+    assert cache.get(_vector(1, 1, 0), KEY, "v1") is None          # cosine ~0.71
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_context_key_ignores_chunk_order_but_not_history():
+    assert AnswerCache.context_key(CHUNKS[::-1]) == KEY
+    history = [{"role": "user", "content": "earlier question"}]
+    assert AnswerCache.context_key(CHUNKS, history) != KEY
+    assert AnswerCache.context_key([{'id': 3}]) != KEY
+
+    cache = AnswerCache()
+    cache.put(_vector(1, 0), KEY, "v1", "answer")
+    assert cache.get(_vector(1, 0), AnswerCache.context_key(CHUNKS, history), "v1") is None
+
+
+def test_new_store_version_drops_everything():
+    cache = AnswerCache()
+    cache.put(_vector(1, 0), KEY, "v1", "answer")
+    assert cache.get(_vector(1, 0), KEY, "v2") is None
+    assert cache.get(_vector(1, 0), KEY, "v1") is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_expiry_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.answer_cache.time.time", lambda: now[0])
+    cache = AnswerCache(ttl_seconds=60, max_entries=2)
+    cache.put(_vector(1, 0, 0), KEY, "v1", "a")
+    cache.put(_vector(0, 1, 0), KEY, "v1", "b")
+    assert cache.get(_vector(1, 0, 0), KEY, "v1") == "a"   # "b" is now least recent
+    cache.put(_vector(0, 0, 1), KEY, "v1", "c")
+    assert cache.get(_vector(0, 1, 0), KEY, "v1") is None
+
+    now[0] += 61
+    assert cache.get(_vector(1, 0, 0), KEY, "v1") is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_replay_reassembles_the_answer():
+    answer = "  First line.\nالسطر الثاني   end "
+    assert "".join(AnswerCache.replay(answer)) == answer
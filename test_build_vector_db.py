@@ -0,0 +1,71 @@
+"""
+Build Script Tests
+Incremental builds keep or refit the stored PCA projection
+"""
+
+from argparse import Namespace
+
+import faiss
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import build_vector_db
+from src.vector_store import VectorStore
+
+
+DIM = 16
+
+
+def _args(**overrides) -> Namespace:
+    args = dict(rebuild=False, prune=False, workers=1, pdf_backend="pdfplumber", page_cache="",
+                embed_workers=1, embed_threads=None, batch_size=64, pca_dim=None, dedup=True)
+    args.update(overrides)
+    return Namespace(**args)
+
+
+@pytest.fixture
+def pca_store(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    texts = [f"chunk {i}" for i in range(400)]
+    vectors = rng.standard_normal((len(texts), DIM)).astype(np.float32)
+    store = VectorStore(dimension=DIM, index_params={'pca_dim': 4})
+    store.add_documents(texts, vectors, [{'source_file': "a.pdf"}] * len(texts), verbose=False)
+    store.save(str(tmp_path / "store"))
+
+    monkeypatch.setattr(build_vector_db, "SAVE_PATH", str(tmp_path / "store"))
+    monkeypatch.setattr(build_vector_db, "FILE_PATHS", [])
+    return dict(zip(texts, vectors))
+
+
+def _load(path) -> VectorStore:
+    store = VectorStore(dimension=DIM)
+    store.load(path)
+    return store
+
+
+def test_default_run_keeps_the_projection(pca_store):
+    before = _load(build_vector_db.SAVE_PATH)
+    query = np.ones(DIM, dtype=np.float32)
+    build_vector_db.main(_args())
+
+    after = _load(build_vector_db.SAVE_PATH)
+    assert after.index_params['pca_dim'] == 4 and after._pca() is not None
+    np.testing.assert_array_equal(faiss.vector_to_array(after._pca().A), faiss.vector_to_array(before._pca().A))
+    assert [h['id'] for h in after.search(query, k=5)] == [h['id'] for h in before.search(query, k=5)]
+
+
+def test_changing_the_flag_refits_from_cached_embeddings(pca_store, monkeypatch):
+    class CachedEmbedder:
+        def embed_passages(self, texts, verbose=True, flush_cache=True):
+            return np.stack([pca_store[text] for text in texts])
+
+    monkeypatch.setattr(build_vector_db, "EmbeddingGenerator", CachedEmbedder)
+    build_vector_db.main(_args(pca_dim=0))
+
+    after = _load(build_vector_db.SAVE_PATH)
+    assert after.index_params['pca_dim'] == 0 and after._pca() is None
+    ids = after.live_ids()
+    expected = np.stack([pca_store[text] for text in after.texts_for_ids(ids)])
+    np.testing.assert_allclose(after.vectors_for_ids(ids), expected, rtol=1e-6)
@@ -0,0 +1,67 @@
+"""
+Chunk Store Tests
+Writing and mapping the columnar chunk store
+"""
+
+import numpy as np
+
+from src.chunk_store import ChunkStore
+
+
+ROWS = [
+    (3, "First chunk", {'source': "docs/a.pdf", 'source_file': "a.pdf", 'page': 1, 'start_index': 0,
+                        'language': "en"}),
+    (7, "النص العربي للمقطع الثاني", {'source': "docs/b.pdf", 'source_file': "b.pdf", 'page': 4,
+                                      'language': "ar", 'section': "مقدمة"}),
+    (8, "", {'source_file': "a.pdf"}),
+    (12, "No metadata", {}),
+]
+
+
+def _write(path):
+    ids, texts, metadatas = zip(*ROWS)
+    ChunkStore.write(str(path), ids, texts, metadatas)
+    return ChunkStore(str(path))
+
+
+def test_roundtrip(tmp_path):
+    store = _write(tmp_path)
+    assert ChunkStore.exists(str(tmp_path)) and len(store) == len(ROWS)
+    for row, (chunk_id, text, metadata) in enumerate(ROWS):
+        assert int(store.ids[row]) == chunk_id
+        assert store.text(row) == text
+        assert store.metadata(row) == metadata
+    assert store.vectors is None
+
+
+def test_find_rows(tmp_path):
+    store = _write(tmp_path)
+    assert store.find_rows([12, 3, 5, 100, 7]).tolist() == [3, 0, -1, -1, 1]
+
+
+def test_empty_store(tmp_path):
+    ChunkStore.write(str(tmp_path), [], [], [])
+    store = ChunkStore(str(tmp_path))
+    assert len(store) == 0
+    assert store.find_rows([1]).tolist() == [-1]
+
+
+def test_store_without_newer_columns(tmp_path):
+    _write(tmp_path)
+    (tmp_path / ChunkStore.LANGUAGE_IDS_FILE).unlink()
+    (tmp_path / ChunkStore.LANGUAGES_FILE).unlink()
+    (tmp_path / ChunkStore.START_INDICES_FILE).unlink()
+    store = ChunkStore(str(tmp_path))
+    # The language column is backfilled from the texts and saved
+    assert store.metadata(0) == {'source': "docs/a.pdf", 'source_file': "a.pdf", 'page': 1, 'language': "en"}
+    assert store.metadata(1)['language'] == "ar"
+    assert (tmp_path / ChunkStore.LANGUAGE_IDS_FILE).exists()
+    assert ChunkStore(str(tmp_path)).language_ids.tolist() == store.language_ids.tolist()
+
+
+def test_vectors(tmp_path):
+    _write(tmp_path)
+    vectors = np.arange(len(ROWS) * 4, dtype=np.float32).reshape(len(ROWS), 4)
+    ChunkStore.write_vectors(str(tmp_path), [vectors[:1], vectors[1:]], len(ROWS), 4)
+    store = ChunkStore(str(tmp_path))
+    np.testing.assert_array_equal(store.vectors, vectors)
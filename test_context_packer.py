@@ -0,0 +1,63 @@
+"""
+Context Packer Tests
+Merging overlapping chunks and fitting the token budget
+"""
+
+from src.context_packer import ContextPacker, estimate_tokens, merge_overlapping
+
+
+PAGE = ("Jordan's family planning programme expanded access to modern methods across "
+        "governorates during the last decade, while regional disparities in uptake persisted.")
+
+
+def _chunk(chunk_id: int, text: str, distance: float, page: int = 1, start_index: int = 0,
+           source_file: str = "a.pdf") -> dict:
+    return {
+        'id': chunk_id,
+        'text': text,
+        'metadata': {'source_file': source_file, 'page': page, 'start_index': start_index},
+        'distance': distance,
+    }
+
+
+def test_merge_overlapping():
+    assert merge_overlapping(PAGE[:100], PAGE[70:]) == PAGE
+    assert merge_overlapping(PAGE, PAGE[10:50]) == PAGE
+    assert merge_overlapping(PAGE[:40], PAGE[60:]) is None
+
+
+def test_neighbouring_chunks_are_merged_in_reading_order():
+    chunks = [
+        _chunk(2, PAGE[70:], 0.3, start_index=70),
+        _chunk(9, "Unrelated passage from another page.", 0.5, page=2),
+        _chunk(1, PAGE[:100], 0.4, start_index=0),
+    ]
+    packed = ContextPacker(token_budget=1000).pack(chunks)
+    assert [p['text'] for p in packed] == [PAGE, "Unrelated passage from another page."]
+    assert packed[0]['ids'] == [1, 2] and packed[0]['distance'] == 0.3
+
+
+def test_budget_skips_passages_that_do_not_fit():
+    long_text = "word " * 200
+    chunks = [
+        _chunk(1, "best passage", 0.1, source_file="a.pdf"),
+        _chunk(2, long_text, 0.2, source_file="b.pdf"),
+        _chunk(3, "small but less relevant", 0.3, source_file="c.pdf"),
+    ]
+    packer = ContextPacker(token_budget=20)
+    packed = packer.pack(chunks)
+    assert [p['id'] for p in packed] == [1, 3]
+    assert sum(estimate_tokens(p['text']) for p in packed) <= 20
+    assert packer.stats()['saved_ratio'] > 0
+
+
+def test_best_passage_is_truncated_rather_than_dropped():
+    packed = ContextPacker(token_budget=10).pack([_chunk(1, "word " * 200, 0.1)])
+    assert len(packed) == 1
+    assert 0 < estimate_tokens(packed[0]['text']) <= 10
+
+
+def test_history_keeps_most_recent_messages_within_budget():
+    history = [{"role": "user", "content": f"message {i} " + "x" * 36} for i in range(8)]
+    kept = ContextPacker(history_budget=25).pack_history(history)
+    assert kept == history[-2:]
@@ -0,0 +1,101 @@
+"""
+Deduplication Tests
+Exact and MinHash near-duplicate detection of chunks
+"""
+
+import numpy as np
+import pytest
+
+from src.deduplication import ChunkDeduplicator, MinHashColumns, canonical_text, embedding_duplicates
+
+
+WORDS = ("the survey measured contraceptive use unmet need and fertility preferences among married "
+         "women aged fifteen to forty nine across all twelve governorates of jordan in two rounds").split()
+
+
+def _text(words) -> str:
+    return " ".join(words)
+
+
+def _shingles(words, size):
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a, b, size):
+    a, b = _shingles(a, size), _shingles(b, size)
+    return len(a & b) / len(a | b)
+
+
+def test_exact_duplicate_after_normalisation():
+    dedup = ChunkDeduplicator()
+    handle = dedup.register(_text(WORDS))
+    assert dedup.find("  " + _text(WORDS).upper().replace(" ", "\n ")) == (handle, "exact", None)
+    assert canonical_text("السَّلامُ   عليكم") == canonical_text("السلام عليكم")
+
+
+def test_near_duplicate_found_and_different_text_missed():
+    dedup = ChunkDeduplicator(threshold=0.8)
+    handle = dedup.register(_text(WORDS))
+
+    edited = WORDS[:-1] + ["three"]   # a re-issued paragraph, last word changed
+    assert _jaccard(WORDS, edited, dedup.shingle_size) > 0.9
+    found, kind, signature = dedup.find(_text(edited))
+    assert (found, kind) == (handle, "near") and signature is not None
+
+    other = ("labour force participation of young graduates remained low despite rising "
+             "enrolment in secondary and tertiary education programmes").split()
+    assert dedup.find(_text(other))[:2] == (None, None)
+    assert dedup.stats()['near_duplicates'] == 1 and dedup.stats()['checked'] == 2
+
+
+def test_signature_agreement_estimates_jaccard():
+    dedup = ChunkDeduplicator(num_perm=512, bands=128)
+    rng = np.random.default_rng(0)
+    for changes in (1, 2, 3, 4, 6):
+        edited = list(WORDS)
+        for i in rng.choice(len(WORDS), size=changes, replace=False):
+            edited[i] = f"changed{i}"
+        estimate = np.mean(dedup.signature(_text(WORDS)) == dedup.signature(_text(edited)))
+        assert estimate == pytest.approx(_jaccard(WORDS, edited, dedup.shingle_size), abs=0.08)
+
+
+def test_keys_and_aliases():
+    dedup = ChunkDeduplicator()
+    first = dedup.register("first chunk text", key=10)
+    second = dedup.register("second chunk text")
+    dedup.set_key(second, 20)
+    third = dedup.register("third chunk text", key=30)
+    dedup.alias(third, second)
+    dedup.alias(second, first)
+    assert dedup.resolve(third) == first
+    assert dedup.key(third) == 10
+    assert dedup.find("third chunk text")[0] == first
+
+
+def test_seeded_rows_match_like_registered_ones(tmp_path):
+    dedup = ChunkDeduplicator(threshold=0.8)
+    texts = [_text(WORDS), _text(WORDS[::-1]), "a removed chunk"]
+    digests, signatures = zip(*(dedup.fingerprint(text) for text in texts))
+    MinHashColumns.write(tmp_path, np.stack(signatures), np.array(digests, dtype='S16'), dedup.params())
+
+    dedup.seed_stored(MinHashColumns(tmp_path), np.array([10, 20, 30]), np.array([True, True, False]))
+    assert dedup.find(_text(WORDS[::-1]).upper()) == (1, "exact", None)
+    assert dedup.find(_text(WORDS[:-1] + ["three"]))[:2] == (0, "near")
+    assert dedup.find("a removed chunk")[0] is None
+    handle = dedup.register("a new chunk", key=40)
+    assert handle == 3 and dedup.key(handle) == 40 and dedup.key(1) == 20
+    dedup.alias(handle, 1)
+    assert dedup.key(handle) == 20
+
+    with pytest.raises(ValueError):
+        ChunkDeduplicator(seed=2).seed_stored(MinHashColumns(tmp_path), np.array([10, 20, 30]), np.ones(3, bool))
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        ChunkDeduplicator(num_perm=64, bands=10)
+
+
+def test_embedding_duplicates_point_at_first_of_chain():
+    vectors = np.array([[1, 0], [0, 1], [1, 0.001], [2, 0.002], [-1, 0]], dtype=np.float32)
+    assert embedding_duplicates(vectors, 0.999) == {2: 0, 3: 0}
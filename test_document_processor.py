@@ -0,0 +1,37 @@
+"""
+Document Processor Tests
+Page-level extraction, sequential and in a process pool
+"""
+
+from pathlib import Path
+
+import pytest
+
+from src.document_processor import DocumentProcessor
+
+SAMPLE_PDF = Path(__file__).parent / "sample_docs" / "RAND_RR487z1_english.pdf"
+
+pytestmark = pytest.mark.skipif(not SAMPLE_PDF.exists(), reason="sample PDF not available")
+
+
+def _summary(chunks):
+    return [(c.metadata['page'], c.metadata['start_index'], c.page_content) for c in chunks]
+
+
+def test_pool_extraction_matches_sequential():
+    processor = DocumentProcessor(pages_per_task=8, cache_path=None)
+    sequential = processor.load_documents([str(SAMPLE_PDF)], workers=1)
+    pooled = processor.load_documents([str(SAMPLE_PDF)], workers=2)
+    assert sequential
+    assert _summary(pooled) == _summary(sequential)
+    pages = [c.metadata['page'] for c in pooled]
+    assert pages == sorted(pages)
+
+
+def test_failed_file_is_reported_and_dropped(tmp_path):
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(b"%PDF-1.4 not really a pdf")
+    processor = DocumentProcessor(cache_path=None)
+    chunks = processor.load_documents([str(bad), str(SAMPLE_PDF)], workers=2)
+    assert processor.failed_files == [str(bad)]
+    assert chunks and all(c.metadata['source_file'] == SAMPLE_PDF.name for c in chunks)
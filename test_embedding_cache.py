@@ -0,0 +1,103 @@
+"""
+Embedding Cache Tests
+Eviction, reopening and concurrent access of the persistent embedding cache
+"""
+
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+
+DIM = 8
+
+
+def _texts(prefix: str, n: int):
+    return [f"{prefix} {i}" for i in range(n)]
+
+
+def _vectors(n: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def test_roundtrip_after_flush(tmp_path):
+    texts, vectors = _texts("a", 100), _vectors(100, 0)
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, dtype="float32")
+    cache.put_many(texts, vectors)
+    cache.close()
+
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, dtype="float32")
+    embeddings, missing = cache.get_many(texts)
+    assert missing == []
+    np.testing.assert_array_equal(embeddings, vectors)
+
+
+def test_eviction_without_flush_never_returns_wrong_vectors(tmp_path):
+    old, old_vectors = _texts("old", 1000), _vectors(1000, 1)
+    new, new_vectors = _texts("new", 500), _vectors(500, 2)
+
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=1000, dtype="float32")
+    cache.put_many(old, old_vectors)
+    cache.flush()
+    cache.put_many(new, new_vectors)   # evicts and reuses slots, index not flushed
+    cache._lock_file.close()           # simulate a crash: no flush, lock released
+
+    cache = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=1000, dtype="float32")
+    embeddings, missing = cache.get_many(old)
+    hits = [i for i in range(len(old)) if i not in set(missing)]
+    assert len(missing) >= 500
+    np.testing.assert_array_equal(embeddings[hits], old_vectors[hits])
+    assert len(cache) == len(old) - len(missing)
+
+
+def test_second_process_opens_read_only(tmp_path):
+    texts, vectors = _texts("a", 50), _vectors(50, 3)
+    writer = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=50, dtype="float32")
+    writer.put_many(texts, vectors)
+    writer.flush()
+
+    reader = EmbeddingCache(str(tmp_path), "model", DIM, max_entries=50, dtype="float32")
+    assert writer.writable and not reader.writable
+    reader.put_many(_texts("b", 10), _vectors(10, 4))   # ignored
+    assert len(reader) == 50
+
+    # The writer reuses every slot; the reader's stale index must not serve them
+    writer.put_many(_texts("c", 50), _vectors(50, 5))
+    embeddings, missing = reader.get_many(texts)
+    hits = [i for i in range(len(texts)) if i not in set(missing)]
+    np.testing.assert_array_equal(embeddings[hits], vectors[hits])
+    assert len(missing) == 50
+
+
+def test_other_model_resets(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model-a", DIM)
+    cache.put_many(["x"], _vectors(1, 6))
+    cache.close()
+
+    cache = EmbeddingCache(str(tmp_path), "model-b", DIM)
+    assert len(cache) == 0
+    assert cache.get_many(["x"])[1] == [0]
+
+
+def test_query_cache_normalises_and_persists(tmp_path):
+    path = tmp_path / "queries.npz"
+    cache = QueryEmbeddingCache("model", capacity=2, path=str(path))
+    cache.put("  Hello   World ", np.ones(DIM))
+    cache.put("second", np.zeros(DIM))
+    cache.put("third", np.zeros(DIM))   # evicts "hello world"
+    assert cache.get("hello world") is None
+    cache.save()
+
+    cache = QueryEmbeddingCache("model", capacity=2, path=str(path))
+    assert len(cache) == 2
+    assert cache.get("SECOND") is not None
+
+
+def test_query_cache_tracks_unsaved_changes(tmp_path):
+    cache = QueryEmbeddingCache("model", capacity=4, path=str(tmp_path / "queries.npz"))
+    assert not cache.changed
+    cache.put("question", np.ones(DIM))
+    assert cache.changed
+    cache.save()
+    assert not cache.changed
+    cache.get("question")
+    assert not cache.changed
@@ -0,0 +1,60 @@
+"""
+Embedding Batching Tests
+Token-budget batches and the fixed-size default
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from src.config import config
+from src.embeddings_hf import encode_batched, token_budget_batches
+
+
+class FakeModel:
+    """Embeds a text as its word count; records each encode call's size"""
+
+    max_seq_length = 512
+
+    def __init__(self):
+        self.calls = []
+
+    def tokenizer(self, texts, **kwargs):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size, **kwargs):
+        self.calls.append((len(texts), batch_size))
+        return np.array([[len(t.split()), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_batches_respect_budget_and_cover_every_text():
+    lengths = np.array([5, 100, 20, 20, 3, 100, 1])
+    batches = token_budget_batches(lengths, 200, max_batch_size=4)
+    assert sorted(np.concatenate(batches).tolist()) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 4
+        assert max(lengths[batch]) * len(batch) <= 200 or len(batch) == 1
+
+
+def test_fixed_batches_by_default(monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_TOKEN_BUDGET", 0)
+    model = FakeModel()
+    texts = [" ".join(["w"] * n) for n in (3, 1, 7)]
+    embeddings, lengths, padded = encode_batched(model, texts)
+    assert model.calls == [(3, config.EMBEDDING_BATCH_SIZE)]
+    assert embeddings[:, 0].tolist() == [3, 1, 7]
+    assert len(lengths) == 0 and padded == 0
+
+
+def test_token_budget_keeps_input_order(monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_TOKEN_BUDGET", 8)
+    model = FakeModel()
+    texts = [" ".join(["w"] * n) for n in (3, 1, 7, 2)]
+    embeddings, lengths, padded = encode_batched(model, texts)
+    assert embeddings[:, 0].tolist() == [3, 1, 7, 2]
+    assert lengths.tolist() == [3, 1, 7, 2]
+    assert padded >= int(lengths.sum())
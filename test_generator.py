@@ -0,0 +1,68 @@
+"""
+Generator Tests
+Relevance gate over results in fused or reranked order, cached streaming
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.answer_cache import AnswerCache
+from src.generator import ResponseGenerator
+
+
+def _chunks(distances):
+    return [{'id': i, 'text': f"chunk {i}", 'metadata': {}, 'distance': d} for i, d in enumerate(distances)]
+
+
+def test_relevance_uses_closest_chunk_in_any_position():
+    generator = ResponseGenerator(client=object())
+    # Fused/reranked order puts a farther chunk first
+    assert generator.check_relevance(_chunks([0.8, 0.3, 0.7]), threshold=0.39)
+    assert not generator.check_relevance(_chunks([0.8, 0.5, 0.7]), threshold=0.39)
+
+
+def test_relevance_without_chunks_or_distances():
+    generator = ResponseGenerator(client=object())
+    assert not generator.check_relevance([], threshold=0.6)
+    assert not generator.check_relevance([{'id': 0, 'text': "x", 'metadata': {}}], threshold=0.6)
+
+
+class FakeAsyncClient:
+    """Streams a fixed answer in pieces; counts the requests made"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.calls = 0
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content_stream=self._stream))
+
+    async def _stream(self, model, contents):
+        self.calls += 1
+
+        async def chunks():
+            for piece in self.pieces:
+                yield SimpleNamespace(text=piece)
+        return chunks()
+
+
+def _collect(stream) -> list:
+    async def collect():
+        return [piece async for piece in stream]
+    return asyncio.run(collect())
+
+
+def test_async_stream_uses_answer_cache():
+    client = FakeAsyncClient(["Fertility ", "fell ", "in 2017."])
+    generator = ResponseGenerator(client=client, answer_cache=AnswerCache())
+    chunks, embedding = _chunks([0.2, 0.5]), np.array([1.0, 0.0], dtype=np.float32)
+
+    first = _collect(generator.agenerate_stream("q", chunks, query_embedding=embedding, index_version="v1"))
+    assert "".join(first) == "Fertility fell in 2017." and client.calls == 1
+
+    again = _collect(generator.agenerate_stream("q", chunks, query_embedding=embedding, index_version="v1"))
+    assert "".join(again) == "Fertility fell in 2017." and client.calls == 1
+
+    # Without an embedding and version the cache doesn't apply
+    _collect(generator.agenerate_stream("q", chunks))
+    assert client.calls == 2
@@ -0,0 +1,137 @@
+"""
+Ingestion Pipeline Tests
+Replacing, failing and deduplicating files in the streaming pipeline
+"""
+
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.chunk_store import ChunkStore
+from src.deduplication import ChunkDeduplicator
+from src.ingestion import IngestionPipeline
+from src.vector_store import VectorStore
+
+
+DIM = 16
+
+
+class FakeProcessor:
+    """Yields one chunk per text; files in `fail_after` fail after that many chunks"""
+
+    def __init__(self, docs, fail_after=None):
+        self.docs = docs
+        self.fail_after = fail_after or {}
+        self.failed_files = []
+
+    def iter_chunks(self, file_paths, workers=None, content_hashes=None):
+        self.failed_files = []
+        for file_path in file_paths:
+            for page, text in enumerate(self.docs[file_path], 1):
+                if page > self.fail_after.get(file_path, len(self.docs[file_path])):
+                    self.failed_files.append(file_path)
+                    break
+                yield SimpleNamespace(page_content=text, metadata={'source_file': file_path, 'page': page})
+
+
+class FakeEmbedder:
+    dimension = DIM
+
+    def embed_documents(self, chunks, verbose=False, flush_cache=False):
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = [np.random.default_rng(int(hashlib.md5(t.encode()).hexdigest()[:8], 16)).standard_normal(DIM)
+                   for t in texts]
+        return texts, np.array(vectors, dtype=np.float32), [chunk.metadata for chunk in chunks]
+
+    def flush_cache(self):
+        pass
+
+
+def _text(seed: int) -> str:
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice([f"w{i}" for i in range(2000)], 60))
+
+
+def _run(store, docs, fail_after=None, dedup=False):
+    pipeline = IngestionPipeline(FakeProcessor(docs, fail_after), FakeEmbedder(), store, batch_size=4,
+                                 deduplicator=ChunkDeduplicator() if dedup else None)
+    return pipeline.run(list(docs), content_hashes={name: hashlib.md5(str(texts).encode()).hexdigest()
+                                                    for name, texts in docs.items()})
+
+
+def test_reingest_replaces_previous_version():
+    store = VectorStore(dimension=DIM)
+    _run(store, {"a.pdf": [_text(i) for i in range(10)], "b.pdf": [_text(100 + i) for i in range(5)]})
+    stats = _run(store, {"a.pdf": [_text(50 + i) for i in range(6)]})
+    assert stats['chunks'] == 6
+    assert store.count_by_source() == {"a.pdf": 6, "b.pdf": 5}
+    assert store.manifest["a.pdf"]['num_chunks'] == 6
+
+
+def test_failed_reingest_keeps_previous_version_and_manifest():
+    store = VectorStore(dimension=DIM)
+    old = {"a.pdf": [_text(i) for i in range(10)]}
+    _run(store, old)
+    entry = dict(store.manifest["a.pdf"])
+
+    stats = _run(store, {"a.pdf": [_text(50 + i) for i in range(10)]}, fail_after={"a.pdf": 6})
+    assert stats['failed_files'] == 1
+    assert store.count_by_source() == {"a.pdf": 10}
+    assert sorted(t for t in store.texts if t is not None) == sorted(old["a.pdf"])
+    assert store.manifest["a.pdf"] == entry
+
+
+def test_replacing_a_source_keeps_chunks_others_repeat():
+    store = VectorStore(dimension=DIM)
+    shared = _text(7)
+    _run(store, {"a.pdf": [shared] + [_text(i) for i in range(5)], "b.pdf": [_text(100), shared]}, dedup=True)
+    assert store.count_by_source() == {"a.pdf": 6, "b.pdf": 1}
+
+    _run(store, {"a.pdf": [_text(200)]}, dedup=True)
+    assert store.count_by_source() == {"a.pdf": 1, "b.pdf": 2}
+    assert shared in list(store.texts)
+    assert store.duplicates == {}
+
+
+def test_failed_reingest_keeps_back_references():
+    store = VectorStore(dimension=DIM)
+    shared = _text(7)
+    _run(store, {"a.pdf": [shared, _text(1)], "b.pdf": [_text(100), shared]}, dedup=True)
+    before = {k: list(v) for k, v in store.duplicates.items()}
+
+    _run(store, {"a.pdf": [shared, _text(300), _text(301)]}, fail_after={"a.pdf": 2}, dedup=True)
+    assert store.count_by_source() == {"a.pdf": 2, "b.pdf": 1}
+    assert store.duplicates == before
+
+
+def test_saved_store_seeds_deduplicator_without_decoding_texts(tmp_path, monkeypatch):
+    shared, original = _text(7), _text(8)
+    edited = original.rsplit(" ", 1)[0] + " changed"   # near duplicate of `original`
+    docs = {"a.pdf": [shared, original, _text(1)], "b.pdf": [_text(100)]}
+    saved = VectorStore(dimension=DIM)
+    _run(saved, docs, dedup=True)
+    saved.save(str(tmp_path / "store"))
+
+    def ingest(minhashes: bool):
+        store = VectorStore(dimension=DIM)
+        store.load(str(tmp_path / "store"))
+        if not minhashes:
+            store._minhashes = None   # as saved before MinHash columns existed
+        stats = _run(store, {"c.pdf": [shared, edited, _text(300)]}, dedup=True)
+        return store, stats
+
+    decoded = []
+    text = ChunkStore.text
+    monkeypatch.setattr(ChunkStore, "text", lambda self, row: decoded.append(row) or text(self, row))
+    store, stats = ingest(minhashes=True)
+    assert decoded == []
+    assert (stats['duplicates_exact'], stats['duplicates_near'], stats['chunks']) == (1, 1, 1)
+
+    _, legacy_stats = ingest(minhashes=False)
+    assert len(decoded) == len(saved)
+    assert {k: legacy_stats[k] for k in ('duplicates_exact', 'duplicates_near', 'chunks')} == \
+        {k: stats[k] for k in ('duplicates_exact', 'duplicates_near', 'chunks')}
+    ids = dict(zip(store.texts, store.ids))
+    assert store.duplicates[ids[shared]] == [{'source_file': "c.pdf", 'page': 1}]
+    assert store.duplicates[ids[original]] == [{'source_file': "c.pdf", 'page': 2}]
@@ -0,0 +1,96 @@
+"""
+Ingestion Job Tests
+Background ingestion of uploads into a store that readers keep serving
+"""
+
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import src.ingestion_jobs as ingestion_jobs
+from src.vector_store import VectorStore
+from test_ingestion import DIM, FakeEmbedder
+
+
+class LineProcessor:
+    """One chunk per line of an uploaded text file; files starting with BAD fail"""
+
+    def __init__(self, *args, **kwargs):
+        self.failed_files = []
+
+    def iter_chunks(self, file_paths, workers=None, content_hashes=None):
+        self.failed_files = []
+        for file_path in file_paths:
+            text = open(file_path, encoding="utf-8").read()
+            if text.startswith("BAD"):
+                self.failed_files.append(file_path)
+                continue
+            for page, line in enumerate(text.split("\n"), 1):
+                time.sleep(0.002)
+                yield SimpleNamespace(page_content=line, metadata={'source_file': file_path.split("/")[-1],
+                                                                  'page': page})
+
+
+def _doc(name: str, lines: int) -> bytes:
+    return "\n".join(f"{name} line {i} " + " ".join(f"{name}{i}w{j}" for j in range(12))
+                     for i in range(lines)).encode()
+
+
+def _wait(job, timeout=30):
+    deadline = time.time() + timeout
+    while job.active:
+        assert time.time() < deadline, job.describe()
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion_jobs, "DocumentProcessor", LineProcessor)
+    monkeypatch.setattr(ingestion_jobs.config, "DEDUP", False)
+    published = []
+    queue = ingestion_jobs.IngestionJobQueue(str(tmp_path / "store"), FakeEmbedder(),
+                                             on_publish=lambda: published.append(1), dimension=DIM,
+                                             upload_dir=str(tmp_path / "uploads"))
+    queue.published = published
+    return queue
+
+
+def _load(queue) -> VectorStore:
+    store = VectorStore(dimension=DIM)
+    store.load(str(queue.store_path))
+    return store
+
+
+def test_jobs_publish_and_skip_known_content(queue):
+    job = queue.submit([("a.txt", _doc("a", 40)), ("b.txt", _doc("b", 20)), ("a_copy.txt", _doc("a", 40))])
+    assert job.file_names == ["a.txt", "b.txt"]
+    assert queue.submit([("a.txt", _doc("a", 40))]) is None   # already queued
+    _wait(job)
+    assert job.status == "done" and job.published and queue.published == [1]
+    assert _load(queue).count_by_source() == {"a.txt": 40, "b.txt": 20}
+
+    again = queue.submit([("a_renamed.txt", _doc("a", 40))])
+    _wait(again)
+    assert again.status == "done" and not again.published and again.skipped == ["a_renamed.txt"]
+
+
+def test_readers_keep_serving_while_a_job_runs(queue):
+    _wait(queue.submit([("a.txt", _doc("a", 30))]))
+    reader = VectorStore(dimension=DIM)
+    reader.load(str(queue.store_path), mmap=True)
+
+    job = queue.submit([("c.txt", _doc("c", 60))])
+    while job.active:
+        assert len(reader.search(np.ones(DIM), k=3)) == 3
+        time.sleep(0.005)
+    assert job.status == "done"
+    assert len(reader) == 30 and len(_load(queue)) == 90
+
+
+def test_failed_job_is_reported(queue):
+    job = queue.submit([("bad.txt", b"BAD file")])
+    _wait(job)
+    assert job.status == "failed" and "no file could be extracted" in job.error
+    assert not queue.active()
@@ -0,0 +1,111 @@
+"""
+Lexical Index Tests
+BM25 scoring, persistence and hybrid fusion
+"""
+
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.lexical_index import LexicalIndex, light_stem, tokenize
+from src.vector_store import VectorStore
+
+
+DOCS = {
+    0: "Contraception policy in Jordan and family planning",
+    1: "تنظيم الأسرة في الأردن والسياسات الصحية",
+    2: "Family planning services for young women",
+    3: "Labour market data for women in Jordan",
+    4: "السياسات السكانية والمواليد",
+    5: "Data collection methods and survey design",
+}
+
+
+def _bm25(docs: dict, query: str, k1: float, b: float) -> dict:
+    """Reference BM25 over a dict of chunk ID -> text"""
+    tokens = {chunk_id: tokenize(text) for chunk_id, text in docs.items()}
+    avg_length = sum(len(t) for t in tokens.values()) / len(tokens)
+    scores = {}
+    for term in set(tokenize(query)):
+        matching = [chunk_id for chunk_id, t in tokens.items() if term in t]
+        idf = math.log(1 + (len(docs) - len(matching) + 0.5) / (len(matching) + 0.5))
+        for chunk_id in matching:
+            tf = Counter(tokens[chunk_id])[term]
+            norm = k1 * (1 - b + b * len(tokens[chunk_id]) / avg_length)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def _check(index: LexicalIndex, docs: dict, query: str):
+    ids, scores = index.search(query, k=len(docs))
+    expected = _bm25(docs, query, index.k1, index.b)
+    assert sorted(ids.tolist()) == sorted(expected)
+    for chunk_id, score in zip(ids.tolist(), scores.tolist()):
+        assert score == pytest.approx(expected[chunk_id], rel=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+QUERIES = ["family planning Jordan", "السياسات الأسرة", "women data", "nothing matches this"]
+
+
+def test_scores_match_reference_bm25():
+    index = LexicalIndex()
+    index.add(DOCS.keys(), DOCS.values())
+    for query in QUERIES:
+        _check(index, DOCS, query)
+
+
+def test_save_load_then_update(tmp_path):
+    index = LexicalIndex()
+    index.add(list(DOCS)[:4], list(DOCS.values())[:4])
+    index.save(str(tmp_path))
+
+    loaded = LexicalIndex.load(str(tmp_path))
+    assert LexicalIndex.exists(str(tmp_path)) and len(loaded) == 4
+    loaded.add(list(DOCS)[4:], list(DOCS.values())[4:])
+    loaded.remove([2])
+    docs = {chunk_id: text for chunk_id, text in DOCS.items() if chunk_id != 2}
+    for query in QUERIES:
+        _check(loaded, docs, query)
+
+    loaded.save(str(tmp_path / "merged"))
+    merged = LexicalIndex.load(str(tmp_path / "merged"))
+    assert len(merged) == len(docs)
+    for query in QUERIES:
+        _check(merged, docs, query)
+
+
+def test_allowed_ids():
+    index = LexicalIndex()
+    index.add(DOCS.keys(), DOCS.values())
+    ids, _ = index.search("family planning women", k=10, allowed_ids=np.array([2, 3]))
+    assert sorted(ids.tolist()) == [2, 3]
+
+
+def test_arabic_prefixes_and_suffixes_are_stripped():
+    assert light_stem("والسياسات") == "سياس"
+    assert tokenize("الأسرة") == tokenize("للأسرة") == tokenize("اسرة")
+    assert light_stem("family") == "family"
+
+
+def test_hybrid_search_adds_lexical_only_hits():
+    dim = 8
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((len(DOCS), dim)).astype(np.float32)
+    metadatas = [{'source_file': f"{i % 2}.pdf", 'language': "ar" if i in (1, 4) else "en"} for i in DOCS]
+    store = VectorStore(dimension=dim)
+    store.add_documents(list(DOCS.values()), vectors, metadatas, verbose=False)
+
+    # Chunk 1 is the farthest from the query vector, so only BM25 finds it
+    query_vector = -vectors[1] * 10
+    hits = store.hybrid_search_batch(["تنظيم الأسرة"], [query_vector], k=3, candidates=3)[0]
+    by_id = {hit['id']: hit for hit in hits}
+    assert 1 not in [hit['id'] for hit in store.search(query_vector, k=3)]
+    assert 1 in by_id
+    assert by_id[1]['distance'] == pytest.approx(float(((vectors[1] - query_vector) ** 2).sum()), rel=1e-5)
+    assert [hit['score'] for hit in hits] == sorted((hit['score'] for hit in hits), reverse=True)
+
+    filtered = store.hybrid_search("تنظيم الأسرة", query_vector, k=5, filters={'language': "en"})
+    assert filtered and all(hit['metadata']['language'] == "en" for hit in filtered)
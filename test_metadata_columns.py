@@ -0,0 +1,65 @@
+"""
+Metadata Columns Tests
+Dictionary encoding, predicates and group-bys over chunk metadata
+"""
+
+import numpy as np
+
+from src.metadata_columns import MetadataBuilder
+
+
+METADATAS = [
+    {'source': "docs/a.pdf", 'source_file': "a.pdf", 'page': 1, 'start_index': 0, 'language': "en"},
+    {'source': "docs/a.pdf", 'source_file': "a.pdf", 'page': 2, 'start_index': 850, 'language': "en"},
+    {'source': "docs/b.pdf", 'source_file': "b.pdf", 'page': 5, 'language': "ar", 'section': "مقدمة"},
+    {'source_file': "c.pdf"},
+    {},
+]
+
+
+def test_roundtrip_and_dictionary_codes():
+    columns = MetadataBuilder(METADATAS)
+    assert len(columns) == len(METADATAS)
+    assert [columns.metadata(row) for row in range(len(columns))] == METADATAS
+    assert columns.languages == ["en", "ar"]
+    assert columns.source_ids.tolist() == [0, 0, 1, 2, -1]
+
+
+def test_values_without_a_column_are_kept_as_extras():
+    odd = [
+        {'page': "iv", 'language': None, 'start_index': True},
+        {'page': 2 ** 40, 'language': 7},
+        {'page': np.int64(3)},
+    ]
+    columns = MetadataBuilder(odd)
+    assert columns.metadata(0) == {'page': "iv", 'start_index': True}
+    assert columns.metadata(1) == {'page': 2 ** 40, 'language': 7}
+    assert columns.metadata(2) == {'page': 3}
+    assert columns.pages.tolist() == [-1, -1, 3]
+
+
+def test_filter_rows():
+    columns = MetadataBuilder(METADATAS)
+    assert columns.filter_rows(source_files=["a.pdf", "c.pdf"]).tolist() == [True, True, False, True, False]
+    assert columns.filter_rows(languages=["ar"]).tolist() == [False, False, True, False, False]
+    assert columns.filter_rows(page_range=(2, None)).tolist() == [False, True, True, False, False]
+    assert columns.filter_rows(page_range=(None, 2)).tolist() == [True, True, False, False, False]
+    assert columns.filter_rows(source_files=["missing.pdf"]).sum() == 0
+
+
+def test_group_bys():
+    columns = MetadataBuilder(METADATAS)
+    assert columns.count_by_source() == {"a.pdf": 2, "b.pdf": 1, "c.pdf": 1}
+    assert columns.count_by_source(np.array([1, 2])) == {"a.pdf": 1, "b.pdf": 1}
+    assert columns.source_files() == ["a.pdf", "b.pdf", "c.pdf"]
+    assert columns.source_files_of(np.array([2, 4])).tolist() == ["b.pdf", None]
+    assert columns.rows_for_source("a.pdf").tolist() == [0, 1]
+
+
+def test_growth_and_take():
+    columns = MetadataBuilder()
+    for i in range(3000):
+        columns.append({'source_file': f"{i % 3}.pdf", 'page': i})
+    assert len(columns) == 3000 and columns.pages[-1] == 2999
+    taken = columns.take([2999, 0])
+    assert [taken.metadata(row) for row in range(2)] == [columns.metadata(2999), columns.metadata(0)]
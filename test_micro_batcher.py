@@ -0,0 +1,54 @@
+"""
+Micro-Batcher Tests
+Coalescing of concurrent requests and per-request failures
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.micro_batcher import MicroBatcher
+
+
+def test_concurrent_requests_share_batches():
+    sizes = []
+
+    def batch_fn(requests):
+        sizes.append(len(requests))
+        time.sleep(0.01)
+        return [request * 2 for request in requests]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(batcher, range(32)))
+
+    assert results == [i * 2 for i in range(32)]
+    assert max(sizes) <= 8
+    assert len(sizes) < 32
+    assert batcher.stats()["requests"] == 32
+
+
+def test_returned_exception_fails_only_its_request():
+    batcher = MicroBatcher(lambda requests: [ValueError(r) if r == "bad" else r for r in requests],
+                           max_wait_ms=50)
+    good, bad = batcher.submit("good"), batcher.submit("bad")
+    assert good.result(timeout=5) == "good"
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+
+def test_raised_exception_fails_the_batch_but_not_the_worker():
+    calls = threading.Event()
+
+    def batch_fn(requests):
+        if not calls.is_set():
+            calls.set()
+            raise RuntimeError("boom")
+        return requests
+
+    batcher = MicroBatcher(batch_fn, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher("first")
+    assert batcher("second") == "second"
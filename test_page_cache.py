@@ -0,0 +1,73 @@
+"""
+Page Cache Tests
+Extracted page text cache and its use by DocumentProcessor
+"""
+
+from pathlib import Path
+
+import pytest
+
+from src import document_processor
+from src.document_processor import DocumentProcessor
+from src.page_cache import PageTextCache
+
+SAMPLE_PDF = Path(__file__).parent / "sample_docs" / "RAND_RR487z1_english.pdf"
+
+
+def _summary(chunks):
+    return [(c.metadata['page'], c.metadata['start_index'], c.page_content) for c in chunks]
+
+
+def test_roundtrip_and_reopen(tmp_path):
+    cache = PageTextCache(str(tmp_path))
+    assert cache.num_pages("hash", "pypdfium2-5") is None
+    cache.put_pages("hash", "pypdfium2-5", 3, [(1, "first page"), (3, "النص العربي"), (2, None)])
+    cache.close()
+
+    cache = PageTextCache(str(tmp_path))
+    assert cache.num_pages("hash", "pypdfium2-5") == 3
+    assert cache.get_pages("hash", "pypdfium2-5") == {1: "first page", 2: "", 3: "النص العربي"}
+    # Another extractor (or version) misses the entries
+    assert cache.num_pages("hash", "pdfplumber-0.11") is None
+    assert cache.get_pages("hash", "pdfplumber-0.11") == {}
+
+
+def test_stats(tmp_path):
+    cache = PageTextCache(str(tmp_path))
+    cache.record(hits=3, misses=1)
+    stats = cache.stats()
+    assert stats['hit_rate'] == 0.75 and stats['size_mb'] > 0
+
+
+@pytest.mark.skipif(not SAMPLE_PDF.exists(), reason="sample PDF not available")
+def test_processor_reuses_cached_pages(tmp_path, monkeypatch):
+    processor = DocumentProcessor(workers=1, pages_per_task=8, cache_path=str(tmp_path))
+    first = processor.load_documents([str(SAMPLE_PDF)])
+    assert processor.cache_stats()['hits'] == 0 and processor.cache_stats()['misses'] > 0
+
+    # A fully cached PDF is never opened
+    def fail(*args, **kwargs):
+        raise AssertionError("PDF opened although every page is cached")
+    monkeypatch.setattr(document_processor, "_count_pdf_pages", fail)
+    monkeypatch.setattr(document_processor, "_extract_pdf_pages", fail)
+
+    processor = DocumentProcessor(workers=1, pages_per_task=8, cache_path=str(tmp_path))
+    second = processor.load_documents([str(SAMPLE_PDF)])
+    assert _summary(second) == _summary(first)
+    assert processor.cache_stats()['misses'] == 0
+
+
+@pytest.mark.skipif(not SAMPLE_PDF.exists(), reason="sample PDF not available")
+def test_processor_extracts_only_missing_pages(tmp_path):
+    processor = DocumentProcessor(workers=1, pages_per_task=8, cache_path=str(tmp_path))
+    first = processor.load_documents([str(SAMPLE_PDF)])
+    num_pages = processor.page_cache.num_pages(document_processor.compute_file_hash(str(SAMPLE_PDF)),
+                                               processor.extractor)
+    with processor.page_cache._conn:
+        processor.page_cache._conn.execute("DELETE FROM pages WHERE page <= 8")
+
+    processor = DocumentProcessor(workers=1, pages_per_task=8, cache_path=str(tmp_path))
+    second = processor.load_documents([str(SAMPLE_PDF)])
+    assert _summary(second) == _summary(first)
+    stats = processor.cache_stats()
+    assert stats['misses'] == 8 and stats['hits'] == num_pages - 8
@@ -0,0 +1,102 @@
+"""
+Query Service Tests
+Request validation and failure isolation of batched retrieval
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.query_service import QueryService, check_request
+from src.vector_store import VectorStore
+
+
+DIM = 16
+
+
+class FakeEmbedder:
+    """Deterministic query embeddings, without loading a model"""
+
+    def generate_query_embeddings(self, queries):
+        return np.stack([np.random.default_rng(abs(hash(q)) % 2**32).standard_normal(DIM)
+                         for q in queries]).astype(np.float32)
+
+    def query_cache_stats(self):
+        return {}
+
+
+@pytest.fixture
+def store():
+    rng = np.random.default_rng(0)
+    store = VectorStore(dimension=DIM)
+    for source_file, language in (("a.pdf", "en"), ("b.pdf", "ar")):
+        store.add_documents([f"{source_file} chunk {i}" for i in range(50)],
+                            rng.standard_normal((50, DIM)).astype(np.float32),
+                            [{'source_file': source_file, 'language': language, 'page': i // 5 + 1}
+                             for i in range(50)], verbose=False)
+    return store
+
+
+@pytest.mark.parametrize("k, filters", [
+    (0, None),
+    (True, None),
+    ("5", None),
+    (5, {"page_range": 5}),
+    (5, {"page_range": [1, 2, 3]}),
+    (5, {"source_file": 3}),
+    (5, {"unknown": "x"}),
+    (5, ["a.pdf"]),
+])
+def test_check_request_rejects_malformed(k, filters):
+    with pytest.raises(ValueError):
+        check_request(k, filters)
+
+
+@pytest.mark.parametrize("chat_history", [
+    "hello",
+    {"role": "user", "content": "hi"},
+    ["hi"],
+    [{"role": "user"}],
+    [{"role": "user", "content": None}],
+    [{"role": 1, "content": "hi"}],
+])
+def test_check_request_rejects_malformed_chat_history(chat_history):
+    with pytest.raises(ValueError):
+        check_request(5, None, chat_history)
+
+
+def test_check_request_accepts_valid():
+    check_request(3, {"source_file": ["a.pdf"], "language": "en", "page_range": [2, None]},
+                  [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+
+
+def test_bad_request_is_rejected_before_batching(store):
+    service = QueryService(store, FakeEmbedder(), max_wait_ms=50)
+    with pytest.raises(ValueError):
+        service.retrieve("q", k=0)
+    assert service.batcher.stats()["requests"] == 0
+
+
+def test_failing_search_does_not_fail_its_batch(store, monkeypatch):
+    service = QueryService(store, FakeEmbedder(), max_batch_size=16, max_wait_ms=50)
+    search_batch = store.search_batch
+
+    def flaky(query_embeddings, k=5, filters=None):
+        # Fails whenever the "poison" query is part of the call
+        poison = FakeEmbedder().generate_query_embeddings(["poison"])[0]
+        if any(np.array_equal(row, poison) for row in np.asarray(query_embeddings)):
+            raise RuntimeError("search failed")
+        return search_batch(query_embeddings, k=k, filters=filters)
+
+    monkeypatch.setattr(store, "search_batch", flaky)
+    queries = ["poison"] + [f"query {i}" for i in range(7)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(service.retrieve, q, 5, False, {"language": "en"}) for q in queries]
+        with pytest.raises(RuntimeError):
+            futures[0].result()
+        for future in futures[1:]:
+            results, _ = future.result()
+            assert len(results) == 5
+            assert all(r['metadata']['language'] == "en" for r in results)
+    assert service.batcher.stats()["mean_batch_size"] > 1
@@ -0,0 +1,71 @@
+"""
+Reranker Tests
+Score cache and latency budget, with a fake cross-encoder
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import src.reranker as reranker_module
+
+
+class FakeCrossEncoder:
+    """Scores by passage number; the first call is slow, like a cold model"""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+        self.pairs = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def predict(self, pairs, batch_size=None, show_progress_bar=False):
+        with self._lock:
+            self.calls += 1
+            self.pairs += len(pairs)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            calls = self.calls
+        time.sleep(0.5 if calls == 1 else 0.001 * len(pairs))
+        with self._lock:
+            self.active -= 1
+        return np.array([float(text.rsplit(" ", 1)[-1]) if text[-1].isdigit() else 0.0
+                         for _, text in pairs])
+
+
+@pytest.fixture
+def reranker(monkeypatch):
+    monkeypatch.setattr(reranker_module, "CrossEncoder", FakeCrossEncoder)
+    return reranker_module.Reranker(budget_ms=200, cache_size=100)
+
+
+def _results(n):
+    return [{'id': i, 'text': f"passage {i}", 'metadata': {}, 'distance': 0.1 * i} for i in range(n)]
+
+
+def test_cold_warm_up_does_not_truncate_first_query(reranker):
+    ranked = reranker.rerank("question", _results(20), top_n=3)
+    assert [r['id'] for r in ranked] == [19, 18, 17]
+    assert reranker.stats()["truncated"] == 0
+
+
+def test_scores_are_cached_per_query(reranker):
+    reranker.rerank("question", _results(10))
+    pairs = reranker.model.pairs
+    reranker.rerank("  QUESTION ", _results(10))
+    assert reranker.model.pairs == pairs
+    assert reranker.stats()["hits"] == 10
+
+
+def test_concurrent_queries_score_in_parallel(reranker):
+    queries = [f"question {i}" for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        ranked = list(pool.map(lambda q: reranker.rerank(q, _results(50), top_n=1), queries))
+    assert all(r[0]['id'] == 49 for r in ranked)
+    assert reranker.model.max_active > 1
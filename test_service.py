@@ -0,0 +1,77 @@
+"""
+Query Service HTTP Tests
+Request validation and streamed answers of the HTTP endpoints
+"""
+
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from service import QueryHandler
+from src.query_service import check_request
+
+
+class FakeService:
+    """Streams the given pieces; a piece that is an exception is raised instead"""
+
+    generator = object()
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def answer_stream(self, query, k, hybrid, chat_history, filters):
+        check_request(k, filters, chat_history)
+
+        def stream():
+            for piece in self.pieces:
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+        return stream(), []
+
+
+@pytest.fixture
+def post(monkeypatch):
+    servers = []
+
+    def post(pieces, body):
+        monkeypatch.setattr(QueryHandler, "service", FakeService(pieces))
+        server = ThreadingHTTPServer(("127.0.0.1", 0), QueryHandler)
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+        connection.request("POST", "/answer", json.dumps(body), {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, response.read().decode("utf-8")
+
+    yield post
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_malformed_chat_history_is_a_bad_request(post):
+    status, body = post(["never sent"], {"query": "q", "chat_history": [{"role": "user"}]})
+    assert status == 400 and "chat_history" in json.loads(body)["error"]
+
+
+def test_stream_failing_at_once_is_a_server_error(post):
+    status, body = post([RuntimeError("quota exceeded")], {"query": "q"})
+    assert status == 500 and "quota exceeded" in json.loads(body)["error"]
+
+
+def test_stream_failing_midway_ends_with_an_error_line(post):
+    status, body = post(["Jordan ", "reported ", RuntimeError("connection reset")], {"query": "q"})
+    assert status == 200
+    assert body.startswith("Jordan reported ")
+    assert body.endswith("[error: generation failed: connection reset]")
+
+
+def test_non_streamed_failure_is_a_server_error(post):
+    status, body = post(["partial", RuntimeError("connection reset")], {"query": "q", "stream": False})
+    assert status == 500 and "connection reset" in json.loads(body)["error"]
@@ -0,0 +1,26 @@
+"""
+Text Utilities Tests
+Query normalisation, matching folds and language detection
+"""
+
+from src.text_utils import detect_language, normalize_for_matching, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("What is RAG?") == normalize_query("  what   is\nrag? ")
+    assert normalize_query("السَّلامُ") == normalize_query("السلام")
+    assert normalize_query("مـــرحبا") == normalize_query("مرحبا")
+    assert normalize_query("ﷲ") == normalize_query("الله")   # NFKC ligature
+    assert normalize_query("أسرة") != normalize_query("اسرة")   # alef forms are kept apart here
+
+
+def test_normalize_for_matching_folds_letter_variants():
+    assert normalize_for_matching("أسرة") == normalize_for_matching("اسره")
+    assert normalize_for_matching("مستشفى") == normalize_for_matching("مستشفي")
+    assert normalize_for_matching("Hello  World") == "hello  world"
+
+
+def test_detect_language():
+    assert detect_language("Family planning in Jordan") == "en"
+    assert detect_language("تنظيم الأسرة في الأردن (Jordan)") == "ar"
+    assert detect_language("2015 – 2020") == "en"
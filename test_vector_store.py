@@ -0,0 +1,267 @@
+"""
+Vector Store Tests
+Persistence, removal and search of the FAISS-backed store
+"""
+
+import numpy as np
+import pytest
+
+from src.chunk_store import ChunkStore
+from src.deduplication import ChunkDeduplicator, MinHashColumns
+from src.vector_store import CURRENT_FILE, VectorStore
+
+
+DIM = 16
+
+
+def _docs(source_file: str, n: int, seed: int, language: str = "en"):
+    rng = np.random.default_rng(seed)
+    texts = [f"{source_file} chunk {i}" for i in range(n)]
+    metadatas = [{'source_file': source_file, 'language': language, 'page': i // 5 + 1} for i in range(n)]
+    return texts, rng.standard_normal((n, DIM)).astype(np.float32), metadatas
+
+
+def _store(index_type: str = "flat", **params) -> VectorStore:
+    store = VectorStore(dimension=DIM, index_type=index_type, index_params=params)
+    store.add_documents(*_docs("a.pdf", 300, 0), verbose=False)
+    store.add_documents(*_docs("b.pdf", 200, 1, "ar"), verbose=False)
+    return store
+
+
+def _versions(path):
+    return sorted(entry.name for entry in path.iterdir() if entry.is_dir())
+
+
+def test_save_swaps_versions_through_pointer(tmp_path):
+    path = tmp_path / "store"
+    store = _store()
+    first = store.save(str(path))
+    assert (path / CURRENT_FILE).read_text() == first.name
+
+    reader = VectorStore(dimension=DIM)
+    reader.load(str(path), mmap=True)
+
+    store.remove_source("b.pdf")
+    second = store.save(str(path))
+    assert _versions(path) == sorted([first.name, second.name])
+    # The reader still serves the version it loaded
+    assert len(reader) == 500 and len(reader.search(np.ones(DIM), k=3)) == 3
+
+    third = store.save(str(path))
+    assert _versions(path) == sorted([second.name, third.name])
+
+    loaded = VectorStore(dimension=DIM)
+    loaded.load(str(path))
+    assert len(loaded) == 300 and loaded.sources() == ["a.pdf"]
+
+
+def test_store_saved_before_versions_is_migrated(tmp_path):
+    path = tmp_path / "store"
+    version = _store().save(str(path))
+    # Recreate the old layout: files directly in the store directory
+    for entry in version.iterdir():
+        entry.rename(path / entry.name)
+    version.rmdir()
+    (path / CURRENT_FILE).unlink()
+    assert VectorStore.exists(str(path))
+
+    store = VectorStore(dimension=DIM)
+    store.load(str(path))
+    assert len(store) == 500
+    store.save(str(path))
+    assert (path / "store.json").exists()      # kept for readers of the old layout
+    (path / "notes.txt").write_text("kept")
+    store.save(str(path))
+    assert not (path / "store.json").exists()
+    # Only the old store's own files are removed
+    assert sorted(entry.name for entry in path.iterdir() if entry.is_file()) == [CURRENT_FILE, "notes.txt"]
+
+    reloaded = VectorStore(dimension=DIM)
+    reloaded.load(str(path))
+    assert len(reloaded) == 500
+
+
+def test_minhash_columns_are_carried_over_between_saves(tmp_path, monkeypatch):
+    path = tmp_path / "store"
+    store = _store()
+    store.save(str(path))
+
+    hashed = []
+    fingerprint = ChunkDeduplicator.fingerprint
+    monkeypatch.setattr(ChunkDeduplicator, "fingerprint",
+                        lambda self, text: hashed.append(text) or fingerprint(self, text))
+    store.remove_source("b.pdf")
+    store.add_documents(*_docs("c.pdf", 3, 2), verbose=False)
+    version = store.save(str(path))
+    assert sorted(hashed) == [f"c.pdf chunk {i}" for i in range(3)]
+
+    minhashes = MinHashColumns(version)
+    dedup = ChunkDeduplicator()
+    assert minhashes.params == dedup.params() and len(minhashes) == len(store) == 303
+    digests, signatures = zip(*(fingerprint(dedup, text) for text in store.texts))
+    np.testing.assert_array_equal(minhashes.digests(), np.array(digests, dtype='S16'))
+    np.testing.assert_array_equal(minhashes.signatures, np.stack(signatures))
+    for row, digest in enumerate(digests):
+        assert row in minhashes.exact_rows(digest)
+    assert minhashes.exact_rows(b"\x01" * 16).tolist() == []
+
+
+def test_remove_chunks_rehomes_duplicates():
+    store = _store()
+    chunk_id = int(store.source_ids("a.pdf")[0])
+    store.add_duplicates(chunk_id, [{'source_file': "b.pdf", 'page': 9}])
+    store.remove_source("a.pdf")
+
+    assert store.count_by_source() == {"b.pdf": 201}
+    hits = store.search(store.vectors_for_ids(store.source_ids("b.pdf")[-1:])[0], k=1)
+    assert hits[0]['text'] == "a.pdf chunk 0"
+    assert hits[0]['metadata']['page'] == 9
+
+
+def test_detach_and_attach_duplicates():
+    store = _store()
+    store.add_duplicates(0, [{'source_file': "b.pdf", 'page': 1}, {'source_file': "c.pdf", 'page': 2}])
+    detached = store.detach_duplicates("b.pdf")
+    assert detached == {0: [{'source_file': "b.pdf", 'page': 1}]}
+    assert store.duplicates == {0: [{'source_file': "c.pdf", 'page': 2}]}
+    store.attach_duplicates(detached)
+    assert len(store.duplicates[0]) == 2
+
+
+def _brute_force(store: VectorStore, queries: np.ndarray, k: int) -> list:
+    ids = store.live_ids()
+    vectors = store.vectors_for_ids(ids)
+    distances = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(-1)
+    return [ids[np.argsort(row, kind="stable")[:k]].tolist() for row in distances]
+
+
+def _hit_ids(store: VectorStore, hits: list) -> list:
+    return [[int(hit['id']) for hit in query_hits] for query_hits in hits]
+
+
+@pytest.mark.parametrize("index_type", ["sq8", "fp16", "binary"])
+def test_compressed_index_rescores_and_survives_mmap(tmp_path, index_type):
+    store = _store(index_type)
+    queries = np.random.default_rng(7).standard_normal((20, DIM)).astype(np.float32)
+    expected = _brute_force(store, queries, 5)
+
+    found = _hit_ids(store, store.search_batch(queries, k=5))
+    recall = np.mean([len(set(f) & set(e)) / 5 for f, e in zip(found, expected)])
+    assert recall >= 0.9
+
+    path = tmp_path / "store"
+    version = store.save(str(path))
+    assert (version / "vectors.npy").exists()
+
+    mapped = VectorStore(dimension=DIM, index_type=index_type)
+    mapped.load(str(path), mmap=True)
+    assert mapped.read_only and len(mapped) == 500
+    assert _hit_ids(mapped, mapped.search_batch(queries, k=5)) == _hit_ids(store, store.search_batch(queries, k=5))
+
+
+@pytest.mark.parametrize("index_type", ["flat", "fp16"])
+def test_pca_projection_survives_save_and_mmap(tmp_path, index_type):
+    store = _store(index_type, pca_dim=8)
+    queries = np.random.default_rng(8).standard_normal((10, DIM)).astype(np.float32)
+    before = _hit_ids(store, store.search_batch(queries, k=5))
+    assert store._pca() is not None and store._pca().d_out == 8
+
+    path = tmp_path / "store"
+    store.save(str(path))
+    for mmap in (False, True):
+        loaded = VectorStore(dimension=DIM, index_type=index_type)
+        loaded.load(str(path), mmap=mmap)
+        assert loaded.index_params['pca_dim'] == 8
+        assert loaded._pca() is not None
+        assert _hit_ids(loaded, loaded.search_batch(queries, k=5)) == before
+
+
+def test_pca_with_rescoring_matches_brute_force():
+    store = _store("fp16", pca_dim=8, rescore_factor=16)
+    queries = np.random.default_rng(9).standard_normal((20, DIM)).astype(np.float32)
+    found = _hit_ids(store, store.search_batch(queries, k=5))
+    expected = _brute_force(store, queries, 5)
+    recall = np.mean([len(set(f) & set(e)) / 5 for f, e in zip(found, expected)])
+    assert recall >= 0.9
+
+
+def _matching_ids(store: VectorStore, filters: dict) -> np.ndarray:
+    ids = store.live_ids()
+    by_id = {int(chunk_id): meta for chunk_id, meta in zip(store.ids, store.metadatas) if meta is not None}
+    first, last = filters.get('page_range') or (None, None)
+    keep = []
+    for chunk_id in ids.tolist():
+        meta = by_id[chunk_id]
+        if 'source_file' in filters and meta['source_file'] not in np.atleast_1d(filters['source_file']):
+            continue
+        if 'language' in filters and meta['language'] != filters['language']:
+            continue
+        if (first is not None and meta['page'] < first) or (last is not None and meta['page'] > last):
+            continue
+        keep.append(chunk_id)
+    return np.array(keep, dtype=np.int64)
+
+
+FILTERS = [
+    {'source_file': "b.pdf"},
+    {'language': "en", 'page_range': [3, 7]},
+    {'source_file': ["a.pdf", "b.pdf"], 'page_range': [None, 2]},
+    {'source_file': "missing.pdf"},
+]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "sq8"])
+def test_filtered_search_matches_brute_force(tmp_path, index_type):
+    store = _store(index_type)
+    store.remove_chunks(store.source_ids("a.pdf")[:40])
+    queries = np.random.default_rng(10).standard_normal((5, DIM)).astype(np.float32)
+
+    path = tmp_path / "store"
+    store.save(str(path))
+    loaded = VectorStore(dimension=DIM, index_type=index_type)
+    loaded.load(str(path))
+
+    for searched in (store, loaded):
+        for filters in FILTERS:
+            allowed = _matching_ids(searched, filters)
+            vectors = searched.vectors_for_ids(allowed)
+            for query, hits in zip(queries, searched.search_batch(queries, k=5, filters=filters)):
+                expected = allowed[np.argsort(((vectors - query) ** 2).sum(1), kind="stable")[:5]]
+                assert [hit['id'] for hit in hits] == expected.tolist()
+
+
+def test_malformed_filters_are_rejected():
+    store = _store()
+    for filters in ({'author': "x"}, {'language': 3}, {'page_range': 5}, {'page_range': [1, "2"]}):
+        with pytest.raises(ValueError):
+            store.search(np.ones(DIM), filters=filters)
+
+
+def _raise_oserror(*args):
+    raise OSError("read-only file system")
+
+
+def test_store_saved_without_language_column_is_backfilled(tmp_path, monkeypatch):
+    path = tmp_path / "store"
+    store = VectorStore(dimension=DIM)
+    texts, vectors, _ = _docs("a.pdf", 6, 11)
+    texts[3:] = ["تنظيم الأسرة في الأردن"] * 3
+    store.add_documents(texts, vectors, [{'source_file': "a.pdf"}] * 6, verbose=False)
+    version = store.save(str(path))
+    (version / ChunkStore.LANGUAGE_IDS_FILE).unlink()
+    (version / ChunkStore.LANGUAGES_FILE).unlink()
+
+    # Backfilled in memory when the directory can't be written
+    with monkeypatch.context() as patch:
+        patch.setattr("src.chunk_store.os.replace", _raise_oserror)
+        legacy = VectorStore(dimension=DIM)
+        legacy.load(str(path), mmap=True)
+        assert len(legacy.search(np.ones(DIM), k=6, filters={'language': "en"})) == 3
+        assert len(legacy.search(np.ones(DIM), k=6, filters={'language': "ar"})) == 3
+    assert sorted(entry.name for entry in version.iterdir() if "tmp" in entry.name) == []
+    assert not (version / ChunkStore.LANGUAGE_IDS_FILE).exists()
+
+    legacy = VectorStore(dimension=DIM)
+    legacy.load(str(path))
+    assert (version / ChunkStore.LANGUAGE_IDS_FILE).exists()
+    assert len(legacy.search(np.ones(DIM), k=6, filters={'language': "en"})) == 3